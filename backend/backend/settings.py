@@ -20,6 +20,7 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',          # runserver'ı ASGI (WebSocket) ile çalıştırır, en üstte olmalı
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
     'rest_framework',  # API yapısı için
     'rest_framework.authtoken',
     'corsheaders',     # React ile iletişim için güvenlik ayarı
+    'channels',        # Canlı olay yayını (core/push.py)
     'core',            # Az önce oluşturduğumuz uygulama
 ]
 
@@ -63,6 +65,16 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Push olayları için kanal katmanı. Tek süreçte in-memory yeterli;
+# birden fazla worker varsa channels_redis ile:
+# {'default': {'BACKEND': 'channels_redis.core.RedisChannelLayer', 'CONFIG': {'hosts': [('127.0.0.1', 6379)]}}}
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    }
+}
 
 
 # Database
@@ -135,7 +147,9 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
     'x-session-id',
+    'if-none-match',
 ]
+CORS_EXPOSE_HEADERS = ['ETag']
 
 # 2. GÜVENLİK VE ÇEREZ (COOKIE) AYARLARI (Sorunu çözen yer burası)
 # Çerezlerin "Lax" modunda çalışmasını sağla (Localhost için en uyumlusu)
@@ -160,5 +174,44 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Web sunucusunun süreç (worker) sayısı. 1'den büyükse ETag damgaları ve
+# presence için ortak bir cache zorunludur; aksi halde `manage.py check`
+# hata verir (core/checks.py).
+WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Polling ETag damgaları (core/etags.py) bu cache'te tutulur.
+# Birden fazla worker ile çalışırken Redis/Memcached gibi ortak bir backend kullanılmalı.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tasknetwork',
+    }
+}
+
+# Bildirimler (core/notifications.py) yanıt döndükten sonra arka planda yazılır.
+# Testlerde/komutlarda senkron çalıştırmak için False yapılabilir.
+NOTIFICATIONS_DEFERRED = True
+
+# ActivityLog tamponu (core/logging_utils.py). Testlerde ACTIVITY_LOG_SYNC=True.
+ACTIVITY_LOG_SYNC = False
+ACTIVITY_LOG_BUFFER_SIZE = 10000
+ACTIVITY_LOG_BATCH_SIZE = 200
+ACTIVITY_LOG_FLUSH_INTERVAL = 2.0
+
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Dışa aktarım işleri (core/export_jobs.py) web sürecindeki bir thread'de işlenir.
+# Ayrı bir worker (`manage.py process_export_jobs --loop`) kullanılacaksa False yapılabilir.
+EXPORT_JOBS_IN_PROCESS = True
+
+# Giriş sonrası kurulum (takma ad + pipeline görevleri, core/onboarding.py) web
+# sürecindeki bir thread'de yapılır. False ise commit sonrasında istek içinde yapılır.
+ONBOARDING_IN_PROCESS = True
+
+# Araştırma dışa aktarımlarının Parquet kopyası (core/columnar.py).
+# pyarrow kurulu değilse yalnızca CSV yazılır.
+RESEARCH_EXPORT_PARQUET = True
+
+# Çevrimiçi durum deposu (core/presence.py). Birden fazla worker ile
+# 'core.presence.CachePresenceBackend' ve ortak bir CACHES backend'i kullanılmalı.
+PRESENCE_BACKEND = 'core.presence.LocalPresenceBackend'
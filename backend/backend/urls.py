@@ -26,6 +26,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/register/', register_user, name='register'),
     path('api/research/export/', views.export_activity_logs, name='research-export'),
+    path('api/research/exports/<int:job_id>/', views.export_job_status, name='research-export-job'),
     path('api/users/deactivate_me/', UserViewSet.as_view({'post': 'deactivate_me'}), name='deactivate-me'),
     path('api/users/update_status/', UserViewSet.as_view({'post': 'update_status'}), name='update-status'),
     path('api/users/tutorial_status/', tutorial_status, name='tutorial-status'),
@@ -33,6 +34,11 @@ urlpatterns = [
     path('api/pipeline/qualitative_question/<int:stage_id>/', get_qualitative_question),
     path('api/pipeline/qualitative_response/', submit_qualitative_response),
     path('api/research/log_interaction/', views.log_interaction),
+    path('api/research/log_interaction/batch/', views.log_interaction_batch),
+    path('api/push/ticket/', views.push_ticket, name='push-ticket'),
+    path('api/graph/snapshot/', views.graph_snapshot, name='graph-snapshot'),
+    path('api/stats/poll_cache/', views.poll_cache_stats),
+    path('api/stats/activity_log/', views.activity_log_stats),
     path('api/', include(router.urls)),
 ]
 
@@ -6,6 +6,8 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
+        from . import checks, etags, push, deadlines, presence, onboarding, task_tree, counters, dependency_index  # noqa: F401  registers the signal receivers
+
         # We only want to start the scheduler once. 
         # Django's auto-reloader runs ready() twice, so we check for RUN_MAIN.
         if os.environ.get('RUN_MAIN') == 'true':
@@ -0,0 +1,151 @@
+import json
+import os
+import random
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from .models import ActivityLog, Tenant, UserProfile
+
+# benchmark_* komutlarının ortak yardımcıları. Komutlar yapılandırılmış
+# veritabanında değil, yanında oluşturulan ayrı bir veritabanında
+# (benchmark_database) çalışır; sentetik veri 'bench' önekli
+# kullanıcı/grup/oturumlarla oluşturulur ve veritabanıyla birlikte silinir.
+# Mevcut araştırma verisine ne okuma ne yazma için dokunulur.
+
+BENCH_PREFIX = 'bench'
+BENCH_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': BENCH_PREFIX}}
+SEED_BATCH_SIZE = 10000
+EVENT_TYPES = ['session_start', 'task_created', 'task_moved', 'task_completed', 'comment_sent', 'session_end']
+
+def benchmark_database_name(name):
+    if connection.vendor == 'sqlite':
+        head, tail = os.path.split(str(name))
+        return os.path.join(head, f'{BENCH_PREFIX}_{tail}')
+    return f'{BENCH_PREFIX}_{name}'
+
+@contextmanager
+def benchmark_database(keep=False):
+    """
+    Bloğu yapılandırılmış veritabanının yanında oluşturulan ve migrate edilen
+    ayrı bir veritabanında (bench_<NAME>) çalıştırır. Fork edilen alt süreçler
+    ve arka plan thread'leri ayarları devraldığı için onlar da buna bağlanır.
+    Cache süreç içi ayrı bir LocMem'dir; ETag damgaları ve kurulum planları
+    gerçek gruplarınkiyle (aynı id'lerle) çakışmaz. Çıkışta veritabanı silinir,
+    keep=True ise sonraki çalıştırma için bırakılır.
+    """
+    settings_dict = connection.settings_dict
+    old_name = settings_dict['NAME']
+    bench_name = benchmark_database_name(old_name)
+    if str(old_name) in ('', ':memory:') or bench_name == old_name:
+        raise CommandError(f"Refusing to run a benchmark: cannot derive a separate database from {old_name!r}.")
+
+    old_test_name = settings_dict['TEST'].get('NAME')
+    settings_dict['TEST']['NAME'] = bench_name
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keep)
+        try:
+            with override_settings(CACHES=BENCH_CACHES):
+                yield bench_name
+        finally:
+            if not keep and connection.vendor == 'postgresql':
+                # Arka plan thread'lerinin açık bağlantıları DROP DATABASE'i engeller
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                        "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                    )
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+    finally:
+        settings_dict['TEST']['NAME'] = old_test_name
+
+def peak_rss_mb():
+    """Sürecin en yüksek RSS'i, MB."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # Linux KB, macOS bayt döndürür
+    return usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+@contextmanager
+def timed(results, label):
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+def run_in_child(target, *args):
+    """
+    target'ı fork edilmiş bir alt süreçte çalıştırır ve (süre, alt sürecin en
+    yüksek RSS'i MB, target'ın dönüş değeri) döndürür; ölçüm çağıran sürecin
+    belleğinden etkilenmez. Dönüş değeri JSON'a çevrilebilir olmalıdır.
+    """
+    connections.close_all()
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        code = 0
+        try:
+            result = target(*args)
+            payload = {'rss': peak_rss_mb(), 'result': result}
+        except BaseException as e:
+            payload = {'error': str(e)}
+            code = 1
+        finally:
+            connections.close_all()
+            with os.fdopen(write_fd, 'w') as pipe:
+                pipe.write(json.dumps(payload, default=str))
+            os._exit(code)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        payload = json.loads(pipe.read() or '{}')
+    os.waitpid(pid, 0)
+    elapsed = time.perf_counter() - start
+    if 'error' in payload or 'rss' not in payload:
+        raise RuntimeError(f"Benchmark child process failed: {payload.get('error', 'no result')}")
+    return elapsed, payload['rss'], payload['result']
+
+def seed_activity_logs(rows, users=2000, tenants=8, days=7, stdout=None):
+    """'rows' kadar sentetik ActivityLog; kullanıcılar gruplara eşit dağıtılır."""
+    rng = random.Random(rows)
+    tenant_objs = [
+        Tenant.objects.get_or_create(tenant_id=f'{BENCH_PREFIX.upper()}{i}', defaults={'name': f'{BENCH_PREFIX} {i}'})[0]
+        for i in range(tenants)
+    ]
+    existing = set(User.objects.filter(username__startswith=f'{BENCH_PREFIX}_').values_list('username', flat=True))
+    User.objects.bulk_create([
+        User(username=f'{BENCH_PREFIX}_{i}') for i in range(users) if f'{BENCH_PREFIX}_{i}' not in existing
+    ], batch_size=SEED_BATCH_SIZE)
+    user_ids = list(User.objects.filter(username__startswith=f'{BENCH_PREFIX}_').order_by('id').values_list('id', flat=True))
+    with_profile = set(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+    UserProfile.objects.bulk_create([
+        UserProfile(user_id=user_id, tenant=tenant_objs[i % tenants])
+        for i, user_id in enumerate(user_ids) if user_id not in with_profile
+    ], batch_size=SEED_BATCH_SIZE)
+
+    start = timezone.now() - timedelta(days=days)
+    step = (days * 86400) / max(rows, 1)
+    written = 0
+    while written < rows:
+        batch = []
+        for i in range(written, min(rows, written + SEED_BATCH_SIZE)):
+            user_id = user_ids[rng.randrange(len(user_ids))]
+            batch.append(ActivityLog(
+                user_id=user_id,
+                session_id=f'{BENCH_PREFIX}-{user_id}-{i // 200}',
+                event_type=EVENT_TYPES[i % len(EVENT_TYPES)],
+                metadata={'task_id': i % 5000, 'word_count': i % 40, 'char_count': i % 300},
+                created_at=start + timedelta(seconds=i * step)
+            ))
+        ActivityLog.objects.bulk_create(batch)
+        written += len(batch)
+        if stdout is not None and written % (SEED_BATCH_SIZE * 50) == 0:
+            stdout.write(f"  seeded {written}/{rows} rows")
+
+def bench_tenants():
+    return Tenant.objects.filter(tenant_id__startswith=BENCH_PREFIX.upper())
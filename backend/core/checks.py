@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Birden fazla worker (WEB_WORKERS, ör. WEB_CONCURRENCY ortam değişkeni) ile
+# süreç içi depolar kullanılamaz: bir worker'daki ETag damgası artışını ya da
+# çevrimiçi durumu diğerleri görmez ve istemci değişmiş veri için 304 alır.
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+@register(Tags.caches)
+def shared_state_check(app_configs, **kwargs):
+    errors = []
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    workers = getattr(settings, 'WEB_WORKERS', 1)
+    if backend.endswith('DummyCache'):
+        errors.append(Error(
+            "DummyCache does not keep ETag stamps; list endpoints would answer 304 for changed data.",
+            hint="Use LocMemCache for a single worker or a shared backend (Redis/Memcached).",
+            id='core.E001',
+        ))
+    elif workers > 1 and backend in PROCESS_LOCAL_CACHES:
+        errors.append(Error(
+            f"WEB_WORKERS is {workers} but the default cache ({backend}) is per-process; "
+            "ETag stamps bumped in one worker are invisible to the others.",
+            hint="Point CACHES['default'] at a shared backend such as Redis or Memcached.",
+            id='core.E002',
+        ))
+    presence_backend = getattr(settings, 'PRESENCE_BACKEND', 'core.presence.LocalPresenceBackend')
+    if workers > 1 and presence_backend == 'core.presence.LocalPresenceBackend':
+        errors.append(Error(
+            f"WEB_WORKERS is {workers} but PRESENCE_BACKEND keeps online status per process.",
+            hint="Use 'core.presence.CachePresenceBackend' with a shared CACHES backend.",
+            id='core.E003',
+        ))
+    return errors
@@ -0,0 +1,139 @@
+import os
+from datetime import datetime
+from django.conf import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow isteğe bağlı; yoksa yalnızca CSV üretilir
+    pa = None
+    pq = None
+
+# Araştırma dışa aktarımlarının Parquet kopyası. CSV satırları sütun tiplerine
+# çevrilir, bölüm (period, group_code) başına tamponlanır ve ROW_GROUP_SIZE
+# satırda bir row group olarak yazılır. Dosyalar Hive tarzı dizinlere yazılır:
+#   <base>/period=<ad>/group_code=<kod>/part-<run_id>.parquet
+# Böylece pyarrow.dataset / pandas tüm dizini tek tablo olarak okuyabilir.
+# Bölüm anahtarı olan group_code dosyaların içine ayrıca yazılmaz; okuyucu
+# onu dizin adından üretir (partitioning='hive').
+
+ROW_GROUP_SIZE = 65536
+
+INT_COLUMNS = {
+    'task_id', 'word_count', 'char_count', 'hour_of_day', 'survey_suspicious_count'
+}
+FLOAT_COLUMNS = {'survey_avg_response_ms'}
+TIMESTAMP_COLUMNS = {'timestamp', 'created_at', 'survey_completed_at'}
+# Az sayıda farklı değer alan sütunlar sözlük kodlamasıyla saklanır
+DICTIONARY_COLUMNS = {'event_type', 'day_of_week'}
+PARTITION_COLUMNS = {'group_code'}
+
+def parquet_enabled():
+    return pq is not None and getattr(settings, 'RESEARCH_EXPORT_PARQUET', True)
+
+def _to_int(value):
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value):
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_str(value):
+    return None if value is None else str(value)
+
+def _field(name):
+    if name in INT_COLUMNS:
+        return pa.field(name, pa.int64())
+    if name in FLOAT_COLUMNS:
+        return pa.field(name, pa.float64())
+    if name in TIMESTAMP_COLUMNS:
+        return pa.field(name, pa.timestamp('us', tz='UTC'))
+    if name in DICTIONARY_COLUMNS:
+        return pa.field(name, pa.dictionary(pa.int32(), pa.string()))
+    return pa.field(name, pa.string())
+
+def _converter(name):
+    if name in INT_COLUMNS:
+        return _to_int
+    if name in FLOAT_COLUMNS:
+        return _to_float
+    if name in TIMESTAMP_COLUMNS:
+        return parse_timestamp
+    return _to_str
+
+class ParquetPartitionWriter:
+    """
+    CSV dışa aktarıcılarıyla aynı satır listelerini alır. Her bölüm için tek
+    bir ParquetWriter açılır; bellekte bölüm başına en fazla bir row group
+    kadar satır tutulur.
+    """
+    def __init__(self, base_dir, headers, run_id, row_group_size=ROW_GROUP_SIZE, compression='zstd'):
+        self.base_dir = base_dir
+        self._positions = [i for i, name in enumerate(headers) if name not in PARTITION_COLUMNS]
+        self.headers = [headers[i] for i in self._positions]
+        self.run_id = run_id
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.schema = pa.schema([_field(name) for name in self.headers])
+        self._converters = [_converter(name) for name in self.headers]
+        self._buffers = {} # (period, group_code) -> column lists
+        self._writers = {} # (period, group_code) -> pq.ParquetWriter
+
+    def partition_dir(self, period, group_code):
+        return os.path.join(self.base_dir, f"period={period}", f"group_code={group_code}")
+
+    def write(self, period, group_code, row):
+        key = (period, group_code)
+        columns = self._buffers.get(key)
+        if columns is None:
+            columns = self._buffers[key] = [[] for _ in self.headers]
+        for column, convert, position in zip(columns, self._converters, self._positions):
+            column.append(convert(row[position]))
+        if len(columns[0]) >= self.row_group_size:
+            self._flush(key)
+
+    def _flush(self, key):
+        columns = self._buffers.get(key)
+        if not columns or not columns[0]:
+            return
+        writer = self._writers.get(key)
+        if writer is None:
+            directory = self.partition_dir(*key)
+            os.makedirs(directory, exist_ok=True)
+            writer = self._writers[key] = pq.ParquetWriter(
+                os.path.join(directory, f"part-{self.run_id}.parquet"),
+                self.schema,
+                compression=self.compression
+            )
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+        self._buffers[key] = [[] for _ in self.headers]
+
+    def close(self):
+        for key in list(self._buffers):
+            self._flush(key)
+        for writer in self._writers.values():
+            writer.close()
+        self._buffers = {}
+        self._writers = {}
@@ -0,0 +1,51 @@
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.contrib.auth.models import User
+from .push import redeem_ticket, tenant_group, user_group
+
+class EventConsumer(AsyncJsonWebsocketConsumer):
+    """
+    /ws/events/?ticket=<ticket>  (POST /api/push/ticket/ ile alınır, tek kullanımlık)
+    Kullanıcıyı kendi kanalına ve tenant kanalına abone eder, push.py
+    üzerinden yayınlanan olayları {'event': ..., 'payload': ...} olarak iletir.
+    """
+
+    async def connect(self):
+        self.subscriptions = []
+        user, tenant_id = await self.authenticate()
+        if user is None:
+            await self.close(code=4401)
+            return
+
+        self.subscriptions = [user_group(user.id)]
+        if tenant_id is not None:
+            self.subscriptions.append(tenant_group(tenant_id))
+
+        for group in self.subscriptions:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in self.subscriptions:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') == 'ping':
+            await self.send_json({'event': 'pong'})
+
+    async def push_event(self, message):
+        await self.send_json({'event': message['event'], 'payload': message['payload']})
+
+    @database_sync_to_async
+    def authenticate(self):
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        ticket = (query.get('ticket') or [None])[0]
+        user_id = redeem_ticket(ticket) if ticket else None
+        if user_id is None:
+            return None, None
+        user = User.objects.select_related('profile').filter(id=user_id, is_active=True).first()
+        if user is None:
+            return None, None
+        profile = getattr(user, 'profile', None)
+        return user, (profile.tenant_id if profile else None)
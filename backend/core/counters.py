@@ -0,0 +1,197 @@
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import Comment, Task, TaskAssignment, TaskAttachment, next_change_version
+from . import etags
+from . import task_tree
+
+# Task üzerindeki sayaçlar: atama, tamamlanan, başarısız, yorum ve ek sayıları
+# ile alt ağaç toplamları (görev + tüm alt görevleri). Listeler ve tamamlanma
+# kontrolleri bu alanları okur; hiçbir yerde anlık COUNT yapılmaz.
+# Atama/yorum/ek sinyalleri farkları toplar ve tek bir UPDATE ile
+# (F + CASE, 0'ın altına inmeden) uygular. Atamanın önceki hali kayıttan önce
+# satır kilitlenerek veritabanından okunur; aynı atamayı eşzamanlı tamamlayan
+# iki istek sırayla çalışır ve ikincisi fark görmez. Atama ve tamamlanma farkları
+# tree_path'teki tüm üst görevlerin alt ağaç toplamlarına da eklenir.
+# queryset.update/bulk_create kullanan kod farkları apply_deltas ile bildirir.
+#
+# Kilit sırası her yolda aynıdır: önce Task satırları (görev + tüm üst
+# görevleri, id artan sırada, lock_tasks), sonra TaskAssignment satırları.
+# Atama kaydı/silinmesi, complete_my_part, yorum/ek sayaçları ve süre motoru
+# bu sırayı izler; eşzamanlı yazımlar birbirini kilitlenmeye (deadlock) sokmaz.
+
+ROLLUP_FIELDS = {
+    'assignment_count': 'subtree_assignment_count',
+    'completed_count': 'subtree_completed_count',
+}
+
+def lock_tasks(task_ids):
+    """
+    Görevleri ve üst görevlerini id sırasıyla kilitler (transaction içinde
+    çağrılmalı); {görev id: tree_path} döndürür. FOR NO KEY UPDATE: göreve
+    FK ile bağlanan satır eklemelerinin (KEY SHARE) kilidiyle çakışmaz. Yollar önce kilitsiz okunur,
+    kilitten sonra değiştiyse (eşzamanlı taşıma) eksik üst görevler de kilitlenir.
+    """
+    task_ids = set(task_ids)
+    if not task_ids:
+        return {}
+
+    def ancestors(paths):
+        return {ancestor_id for task_id in task_ids for ancestor_id in task_tree.path_ids(paths.get(task_id, ''))}
+
+    paths = dict(Task.objects.filter(id__in=task_ids).values_list('id', 'tree_path'))
+    wanted = task_ids | ancestors(paths)
+    requested, locked = set(), {}
+    while wanted - requested:
+        batch = wanted - requested
+        requested |= batch
+        locked.update(Task.objects.select_for_update(no_key=True).filter(id__in=batch).order_by('id').values_list('id', 'tree_path'))
+        wanted = task_ids | ancestors(locked)
+    return {task_id: locked[task_id] for task_id in task_ids if task_id in locked}
+
+def apply_deltas(deltas):
+    """deltas: {task_id: {alan: fark}}. Değişen görevlerin ETag'lerini de artırır."""
+    by_field = defaultdict(Counter)
+    for task_id, fields in deltas.items():
+        for field, delta in fields.items():
+            if delta:
+                by_field[field][task_id] += delta
+
+    with transaction.atomic():
+        # Güncellenecek tüm satırlar (üst görevler dahil) UPDATE'ten önce id sırasıyla kilitlenir
+        paths = lock_tasks({task_id for values in by_field.values() for task_id in values})
+        rollup_tasks = {task_id for field in ROLLUP_FIELDS for task_id in by_field.get(field, ())}
+        if rollup_tasks:
+            for field, rollup_field in ROLLUP_FIELDS.items():
+                for task_id, delta in list(by_field.get(field, {}).items()):
+                    # Yol henüz yoksa (ör. oluşturma sinyali sırası) yalnızca görevin kendisi
+                    for ancestor_id in task_tree.path_ids(paths.get(task_id, '')) or [task_id]:
+                        by_field[rollup_field][ancestor_id] += delta
+
+        by_field = {field: {k: v for k, v in values.items() if v} for field, values in by_field.items()}
+        task_ids = {task_id for values in by_field.values() for task_id in values}
+        if not task_ids:
+            return
+
+        Task.objects.filter(id__in=task_ids).update(
+            change_version=next_change_version(),
+            **{
+                field: Greatest(F(field) + Case(
+                    *[When(id=task_id, then=Value(delta)) for task_id, delta in values.items()],
+                    default=Value(0)
+                ), Value(0))
+                for field, values in by_field.items() if values
+            }
+        )
+        audience = set(Task.objects.filter(id__in=task_ids).values_list('created_by_id', flat=True))
+        audience.update(TaskAssignment.objects.filter(task_id__in=task_ids).values_list('user_id', flat=True))
+        etags.bump('tasks', *audience)
+
+def _assignment_values(assignment):
+    return {
+        'assignment_count': 1,
+        'completed_count': int(bool(assignment.is_completed)),
+        'failed_count': int(bool(assignment.is_failed)),
+    }
+
+def rebuild_counters(batch_size=500):
+    """Tüm sayaçları ilişkilerden yeniden hesaplar; değişen görev sayısını döndürür."""
+    counts = defaultdict(dict)
+    for row in TaskAssignment.objects.values('task_id').annotate(
+        assigned=Count('id'),
+        completed=Count('id', filter=Q(is_completed=True)),
+        failed=Count('id', filter=Q(is_failed=True))
+    ).order_by():
+        counts[row['task_id']].update(
+            assignment_count=row['assigned'], completed_count=row['completed'], failed_count=row['failed']
+        )
+    for model, field in ((Comment, 'comment_count'), (TaskAttachment, 'attachment_count')):
+        for task_id, total in model.objects.values_list('task_id').annotate(total=Count('id')).order_by():
+            counts[task_id][field] = total
+
+    paths = dict(Task.objects.values_list('id', 'tree_path'))
+    for task_id, path in paths.items():
+        own = counts.get(task_id, {})
+        for ancestor_id in task_tree.path_ids(path) or [task_id]:
+            target = counts[ancestor_id]
+            for field, rollup_field in ROLLUP_FIELDS.items():
+                target[rollup_field] = target.get(rollup_field, 0) + own.get(field, 0)
+
+    fields = [*ROLLUP_FIELDS, 'failed_count', 'comment_count', 'attachment_count', *ROLLUP_FIELDS.values()]
+    stale = []
+    for row in Task.objects.values('id', *fields):
+        expected = {field: counts.get(row['id'], {}).get(field, 0) for field in fields}
+        if any(row[field] != value for field, value in expected.items()):
+            stale.append(Task(id=row['id'], **expected))
+    Task.objects.bulk_update(stale, fields, batch_size=batch_size)
+    return len(stale)
+
+# --- SIGNALS ---
+@receiver(pre_save, sender=TaskAssignment)
+def assignment_counter_snapshot(sender, instance, **kwargs):
+    # Kayıt VersionedModel.save'in transaction'ı içinde; kilit commit'e kadar
+    # sürer, böylece önceki hal bellekteki kopyadan değil satırdan okunur
+    previous = None
+    if instance.pk is not None and not instance._state.adding:
+        # Önce görev zincirleri (eski ve yeni görev), sonra atama satırı
+        previous_task_id = TaskAssignment.objects.filter(pk=instance.pk).values_list('task_id', flat=True).first()
+        lock_tasks({instance.task_id, previous_task_id} - {None})
+        previous = TaskAssignment.objects.select_for_update().filter(pk=instance.pk).values_list(
+            'task_id', 'is_completed', 'is_failed'
+        ).first()
+        if previous and previous[0] != previous_task_id:
+            lock_tasks({previous[0]})
+    instance._counter_state = previous or (None, None, None)
+
+@receiver(post_save, sender=TaskAssignment)
+def assignment_counter_signal(sender, instance, created, update_fields=None, **kwargs):
+    previous_task_id, was_completed, was_failed = instance._counter_state
+    if update_fields is not None:
+        # Yazılmayan alanların bellekteki değeri satırı yansıtmayabilir
+        previous_task_id = previous_task_id if 'task' in update_fields else None
+        was_completed = was_completed if 'is_completed' in update_fields else None
+        was_failed = was_failed if 'is_failed' in update_fields else None
+    if created:
+        apply_deltas({instance.task_id: _assignment_values(instance)})
+        return
+
+    if previous_task_id is not None and previous_task_id != instance.task_id:
+        previous = {'assignment_count': 1, 'completed_count': int(bool(was_completed)), 'failed_count': int(bool(was_failed))}
+        apply_deltas({
+            previous_task_id: {field: -delta for field, delta in previous.items()},
+            instance.task_id: _assignment_values(instance),
+        })
+        return
+
+    deltas = {}
+    if was_completed is not None:
+        deltas['completed_count'] = int(bool(instance.is_completed)) - int(bool(was_completed))
+    if was_failed is not None:
+        deltas['failed_count'] = int(bool(instance.is_failed)) - int(bool(was_failed))
+    if any(deltas.values()):
+        apply_deltas({instance.task_id: deltas})
+
+@receiver(pre_delete, sender=TaskAssignment)
+def assignment_counter_delete_lock(sender, instance, **kwargs):
+    # Silme transaction'ı içinde; satır silinip kilitlenmeden önce görev zinciri kilitlenir
+    lock_tasks({instance.task_id})
+
+@receiver(post_delete, sender=TaskAssignment)
+def assignment_counter_delete_signal(sender, instance, **kwargs):
+    apply_deltas({instance.task_id: {field: -delta for field, delta in _assignment_values(instance).items()}})
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=TaskAttachment)
+def child_counter_signal(sender, instance, created, **kwargs):
+    if created:
+        field = 'comment_count' if sender is Comment else 'attachment_count'
+        apply_deltas({instance.task_id: {field: 1}})
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=TaskAttachment)
+def child_counter_delete_signal(sender, instance, **kwargs):
+    field = 'comment_count' if sender is Comment else 'attachment_count'
+    apply_deltas({instance.task_id: {field: -1}})
@@ -0,0 +1,171 @@
+from collections import Counter
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Task, TaskAssignment, next_change_version
+from . import etags
+from . import notifications
+from . import counters
+
+# Süre motoru: uyarı (son 1 saat) ve süre dolumu işlemlerini toplu yapar.
+# Görevler (status, bayrak, due_date) indeksiyle sıralı bir kuyruk gibi okunur;
+# scheduler bir sonraki sınır anında uyanır. Adaylar counters.lock_tasks ile
+# (üst görevleriyle birlikte, id sırasıyla; sayaç yollarıyla aynı kilit sırası)
+# kilitlenip koşul yeniden denetlenir; bayraklar aynı transaction'da set
+# edildiği için aynı anda çalışan worker'lar aynı görevi iki kez işlemez.
+
+WARNING_WINDOW = timedelta(hours=1)
+BATCH_SIZE = 200
+NEXT_WAKE_KEY = 'deadlines:next_wake'
+RUNNING_KEY = 'deadlines:running'
+
+def _claim(queryset):
+    """Sıradaki partiyi kilitler; aday yoksa None, adaylar başka worker'ca işlendiyse []."""
+    candidates = list(queryset.order_by('due_date').values_list('id', flat=True)[:BATCH_SIZE])
+    if not candidates:
+        return None
+    counters.lock_tasks(candidates)
+    return list(queryset.filter(id__in=candidates).order_by('due_date').only('id', 'title', 'created_by_id', 'tenant_id'))
+
+def _bump_task_etags(tasks):
+    task_ids = [t.id for t in tasks]
+    audience = {t.created_by_id for t in tasks}
+    audience.update(TaskAssignment.objects.filter(task_id__in=task_ids).values_list('user_id', flat=True))
+    etags.bump('tasks', *audience)
+
+def process_warnings(now):
+    processed = 0
+    while True:
+        with transaction.atomic():
+            tasks = _claim(Task.objects.filter(
+                status='active',
+                warning_sent=False,
+                due_date__gt=now,
+                due_date__lte=now + WARNING_WINDOW
+            ))
+            if tasks is None:
+                break
+            if not tasks:
+                continue
+            by_id = {t.id: t for t in tasks}
+            Task.objects.filter(id__in=by_id).update(warning_sent=True, change_version=next_change_version())
+
+            pending = TaskAssignment.objects.filter(task_id__in=by_id, is_completed=False).values_list('task_id', 'user_id')
+            notifications.deliver(
+                item
+                for task_id, user_id in pending
+                for item in notifications.pending(
+                    [user_id], 'deadline_warning',
+                    title="⏳ Son 1 Saat!",
+                    message=f"'{by_id[task_id].title}' görevi için son 1 saatin kaldı!",
+                    notification_type="deadline",
+                    task_id=task_id
+                )
+            )
+            _bump_task_etags(tasks)
+        processed += len(tasks)
+    return processed
+
+def process_expiries(now):
+    processed = 0
+    while True:
+        with transaction.atomic():
+            tasks = _claim(Task.objects.filter(
+                status='active',
+                expiry_processed=False,
+                due_date__lte=now
+            ))
+            if tasks is None:
+                break
+            if not tasks:
+                continue
+            by_id = {t.id: t for t in tasks}
+            version = next_change_version()
+            # Süresi dolan görev için ayrıca uyarı gönderilmez
+            Task.objects.filter(id__in=by_id).update(expiry_processed=True, warning_sent=True, change_version=version)
+
+            failing = list(TaskAssignment.objects.filter(
+                task_id__in=by_id, is_completed=False, is_failed=False
+            ).values_list('id', 'task_id', 'user_id'))
+            TaskAssignment.objects.filter(id__in=[a[0] for a in failing]).update(is_failed=True, change_version=version)
+            failed_counts = Counter(task_id for _, task_id, _ in failing)
+            counters.apply_deltas({task_id: {'failed_count': n} for task_id, n in failed_counts.items()})
+
+            notifications.deliver(
+                item
+                for _, task_id, user_id in failing
+                for item in notifications.pending(
+                    [user_id], 'deadline',
+                    title="❌ Süre Doldu",
+                    message=f"'{by_id[task_id].title}' görevinin süresi doldu ve erişim kapatıldı.",
+                    notification_type="deadline",
+                    task_id=task_id
+                )
+            )
+            _bump_task_etags(tasks)
+        processed += len(tasks)
+    return processed
+
+def next_boundary():
+    """Sıradaki uyarı ya da bitiş anı (yoksa None)."""
+    next_warning = Task.objects.filter(
+        status='active', warning_sent=False, due_date__isnull=False
+    ).order_by('due_date').values_list('due_date', flat=True).first()
+    next_expiry = Task.objects.filter(
+        status='active', expiry_processed=False, due_date__isnull=False
+    ).order_by('due_date').values_list('due_date', flat=True).first()
+
+    candidates = [b for b in (next_warning and next_warning - WARNING_WINDOW, next_expiry) if b]
+    return min(candidates) if candidates else None
+
+def process_due_deadlines(now=None):
+    """Vadesi gelen tüm uyarı ve bitişleri işler, bir sonraki uyanma anını döndürür."""
+    now = now or timezone.now()
+    process_expiries(now)
+    process_warnings(now)
+    wake = next_boundary()
+    cache.set(NEXT_WAKE_KEY, wake, timeout=None)
+    return wake
+
+def run_if_due():
+    """
+    check_deadlines uç noktasının ucuz yolu: sıradaki sınır henüz gelmediyse
+    yalnızca cache'ten okur. Scheduler'ın çalışmadığı süreçlerde de
+    süre motorunun ilerlemesini sağlar.
+    """
+    now = timezone.now()
+    wake = cache.get(NEXT_WAKE_KEY, now)
+    if wake is None or now < wake:
+        return wake
+    if not cache.add(RUNNING_KEY, True, timeout=30):
+        return wake
+    try:
+        return process_due_deadlines(now)
+    finally:
+        cache.delete(RUNNING_KEY)
+
+def task_boundary(task):
+    if task.status != 'active' or not task.due_date:
+        return None
+    if not task.warning_sent:
+        return task.due_date - WARNING_WINDOW
+    if not task.expiry_processed:
+        return task.due_date
+    return None
+
+# --- SIGNALS ---
+@receiver(post_save, sender=Task)
+def deadline_schedule_signal(sender, instance, **kwargs):
+    boundary = task_boundary(instance)
+    if boundary is None:
+        return
+    wake = cache.get(NEXT_WAKE_KEY)
+    if wake is not None and wake <= boundary:
+        return
+    cache.set(NEXT_WAKE_KEY, boundary, timeout=None)
+
+    from . import scheduler
+    transaction.on_commit(lambda: scheduler.schedule_deadline_wake(boundary))
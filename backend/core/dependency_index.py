@@ -0,0 +1,205 @@
+import threading
+from collections import deque
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from .models import Task, TaskDependency, Tenant, task_tombstone_tenant_id
+
+# Grup (tenant) başına bellekte tutulan bağlılık grafiği: görev -> sonraki
+# görevler / önceki görevler. İlk erişimde tek indeksli sorguyla kurulur,
+# sonra bu süreçteki ekleme/güncelleme/silmelerle (commit sonrasında) yerinde
+# güncellenir. Başka süreçlerin yaptığı değişiklikler (kenar sayısı, en büyük
+# id, en büyük change_version) parmak iziyle yakalanır; uçları değiştirilen
+# kenar change_version'ı artırdığı için o da görülür. Parmak izi tutmazsa
+# grup yeniden kurulur.
+#
+# Yeni kenar, hedeften kaynağa bir yol varsa döngü oluşturur; bu tek bir BFS
+# ile O(V+E) kontrol edilir; güncellenen kenarın eski hali kontrolde yok
+# sayılır. Aynı gruptaki yazmalar tenant satırı kilitlenerek sıraya sokulur,
+# böylece iki eşzamanlı yazma birlikte döngü oluşturamaz.
+
+class TenantGraph:
+    def __init__(self, edges):
+        self.edges = {} # dependency_id -> (source, target)
+        self.next = {} # task_id -> {dependency_id: target}
+        self.prev = {} # task_id -> {dependency_id: source}
+        self.versions = {} # dependency_id -> change_version
+        for dependency_id, source_id, target_id, version in edges:
+            self.add(dependency_id, source_id, target_id, version)
+
+    def fingerprint(self):
+        return (len(self.edges), max(self.edges, default=None), max(self.versions.values(), default=None))
+
+    def add(self, dependency_id, source_id, target_id, version):
+        self.remove(dependency_id)
+        self.versions[dependency_id] = version
+        self.edges[dependency_id] = (source_id, target_id)
+        self.next.setdefault(source_id, {})[dependency_id] = target_id
+        self.prev.setdefault(target_id, {})[dependency_id] = source_id
+
+    def remove(self, dependency_id):
+        edge = self.edges.pop(dependency_id, None)
+        self.versions.pop(dependency_id, None)
+        if edge is None:
+            return
+        source_id, target_id = edge
+        self.next.get(source_id, {}).pop(dependency_id, None)
+        self.prev.get(target_id, {}).pop(dependency_id, None)
+
+    def reaches(self, start_id, goal_id, exclude_id=None):
+        """
+        start'tan goal'e (sonraki görevler yönünde) yol var mı; BFS, O(V+E).
+        'exclude_id' kenarı yok sayılır.
+        """
+        if start_id == goal_id:
+            return True
+        seen = {start_id}
+        queue = deque([start_id])
+        while queue:
+            task_id = queue.popleft()
+            for dependency_id, next_id in self.next.get(task_id, {}).items():
+                if dependency_id == exclude_id:
+                    continue
+                if next_id == goal_id:
+                    return True
+                if next_id not in seen:
+                    seen.add(next_id)
+                    queue.append(next_id)
+        return False
+
+    def creates_cycle(self, source_id, target_id, exclude_id=None):
+        return self.reaches(target_id, source_id, exclude_id)
+
+    def topological_order(self):
+        """
+        Kahn algoritması (eşitlikte küçük id önce). Döngüye katılan (eski
+        veride kalmış) görevler sıralamaya girmez; ayrıca döndürülür.
+        """
+        nodes = set(self.next) | set(self.prev)
+        indegree = {task_id: len(self.prev.get(task_id, {})) for task_id in nodes}
+        queue = deque(sorted(task_id for task_id, degree in indegree.items() if degree == 0))
+        order = []
+        while queue:
+            task_id = queue.popleft()
+            order.append(task_id)
+            for next_id in sorted(self.next.get(task_id, {}).values()):
+                indegree[next_id] -= 1
+                if indegree[next_id] == 0:
+                    queue.append(next_id)
+        cyclic = sorted(task_id for task_id, degree in indegree.items() if degree > 0)
+        return order, cyclic
+
+class DependencyIndex:
+    def __init__(self):
+        self._graphs = {} # tenant_id -> TenantGraph
+        self._lock = threading.Lock()
+
+    def _edges(self, tenant_id):
+        return TaskDependency.objects.filter(tenant_id=tenant_id).values_list(
+            'id', 'source_task_id', 'target_task_id', 'change_version'
+        )
+
+    def _fingerprint(self, tenant_id):
+        row = TaskDependency.objects.filter(tenant_id=tenant_id).aggregate(
+            count=Count('id'), last=Max('id'), version=Max('change_version')
+        )
+        return (row['count'], row['last'], row['version'])
+
+    def get(self, tenant_id):
+        """Grubun güncel grafiği (gerekirse yeniden kurulur)."""
+        fingerprint = self._fingerprint(tenant_id)
+        with self._lock:
+            graph = self._graphs.get(tenant_id)
+            if graph is not None and graph.fingerprint() == fingerprint:
+                return graph
+        graph = TenantGraph(self._edges(tenant_id))
+        with self._lock:
+            self._graphs[tenant_id] = graph
+        return graph
+
+    def added(self, tenant_id, dependency_id, source_id, target_id, version):
+        with self._lock:
+            graph = self._graphs.get(tenant_id)
+            if graph is not None:
+                graph.add(dependency_id, source_id, target_id, version)
+
+    def removed(self, tenant_id, dependency_id):
+        with self._lock:
+            graph = self._graphs.get(tenant_id)
+            if graph is not None:
+                graph.remove(dependency_id)
+
+    def invalidate(self, tenant_id=None):
+        with self._lock:
+            if tenant_id is None:
+                self._graphs.clear()
+            else:
+                self._graphs.pop(tenant_id, None)
+
+index = DependencyIndex()
+
+class DependencyCycleError(ValueError):
+    pass
+
+def save_dependency(source_task, target_task, save, dependency=None):
+    """
+    Döngü kontrolüyle kenar ekler ya da ('dependency' verilirse) uçlarını
+    değiştirir. 'save(tenant_id)' kaydı yazıp döndürür (ör. serializer.save).
+    Döngü varsa DependencyCycleError.
+    """
+    tenant_id = task_tombstone_tenant_id(source_task)
+    with transaction.atomic():
+        if tenant_id is not None:
+            # Aynı gruptaki yazmalar sıraya girer; kontrol ile kayıt arasında yeni kenar eklenemez
+            Tenant.objects.select_for_update().filter(id=tenant_id).exists()
+        exclude_id = dependency.id if dependency is not None else None
+        if index.get(tenant_id).creates_cycle(source_task.id, target_task.id, exclude_id):
+            raise DependencyCycleError(f"Dependency {source_task.id} -> {target_task.id} would create a cycle.")
+        return save(tenant_id)
+
+def visible_task_ids(user):
+    return Task.objects.filter(Q(created_by=user) | Q(assignments__user=user)).values('id')
+
+def visible_dependencies(user):
+    """Kullanıcının görebildiği görevlere dokunan kenarlar (indeksli FK alt sorgusu)."""
+    task_ids = visible_task_ids(user)
+    return TaskDependency.objects.filter(Q(source_task__in=task_ids) | Q(target_task__in=task_ids))
+
+def topological_order(user, tenant_id):
+    """Grubun sıralaması, kullanıcının görebildiği görevlere indirgenmiş olarak."""
+    order, cyclic = index.get(tenant_id).topological_order()
+    visible = set(visible_task_ids(user).values_list('id', flat=True))
+    return [task_id for task_id in order if task_id in visible], [task_id for task_id in cyclic if task_id in visible]
+
+# --- SIGNALS ---
+@receiver(post_init, sender=TaskDependency)
+def dependency_index_snapshot(sender, instance, **kwargs):
+    # Ertelenmiş alanlara dokunmamak için __dict__ okunur
+    instance._index_tenant_id = instance.__dict__.get('tenant_id')
+    instance._index_source_id = instance.__dict__.get('source_task_id')
+
+@receiver(pre_save, sender=TaskDependency)
+def dependency_tenant_signal(sender, instance, **kwargs):
+    moved = instance.pk is not None and instance.source_task_id != instance._index_source_id
+    if instance.source_task_id and (instance.tenant_id is None or moved):
+        instance.tenant_id = task_tombstone_tenant_id(instance.source_task)
+
+@receiver(post_save, sender=TaskDependency)
+def dependency_index_signal(sender, instance, created, **kwargs):
+    previous_tenant_id, tenant_id = instance._index_tenant_id, instance.tenant_id
+    instance._index_tenant_id = tenant_id
+    instance._index_source_id = instance.source_task_id
+    values = (instance.id, instance.source_task_id, instance.target_task_id, instance.change_version)
+
+    def update_index():
+        if not created:
+            # Uç (veya grup) değişikliği: eski kenar çıkarılır, yenisi eklenir
+            index.removed(previous_tenant_id, instance.id)
+        index.added(tenant_id, *values)
+    transaction.on_commit(update_index)
+
+@receiver(post_delete, sender=TaskDependency)
+def dependency_index_delete_signal(sender, instance, **kwargs):
+    tenant_id, dependency_id = instance.tenant_id, instance.id
+    transaction.on_commit(lambda: index.removed(tenant_id, dependency_id))
@@ -0,0 +1,170 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.response import Response
+from .models import (
+    Task, TaskAssignment, TaskAttachment, TaskNode, TaskDependency,
+    Notification, UserProfile
+)
+
+# Polling yapılan uç noktalar için sürüm damgaları.
+# Damga değişmediyse liste yanıtı da değişmemiştir; 304 dönülür.
+# NOT: Birden fazla worker ile çalışırken CACHES ortak bir backend olmalı,
+# aksi halde bir worker'daki değişiklik diğerinin damgasını artırmaz.
+
+RESOURCES = ('tasks', 'users', 'notifications', 'dependencies')
+# Kullanıcı listelerinde serileştirilen User alanları; yalnızca bunlar değişince
+# 'users' damgası artar (ör. her girişteki last_login güncellemesi artırmaz)
+USER_LIST_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+def _stamp_key(resource, scope_id):
+    return f"etag:{resource}:{scope_id}"
+
+def get_stamp(resource, scope_id):
+    key = _stamp_key(resource, scope_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        # Cache'ten düşen bir damga eski bir ETag ile çakışmasın diye zamanla başlatılır
+        cache.add(key, time.time_ns(), timeout=None)
+        stamp = cache.get(key)
+    return stamp
+
+def _bump_now(resource, scope_ids):
+    for scope_id in scope_ids:
+        key = _stamp_key(resource, scope_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+def bump(resource, *scope_ids):
+    """
+    Damgayı commit sonrasında artırır; aksi halde commit'ten önce gelen bir
+    istek eski veriyi yeni damgayla eşleyip önbelleğe alabilir.
+    """
+    scope_ids = {scope_id for scope_id in scope_ids if scope_id is not None}
+    if scope_ids:
+        transaction.on_commit(lambda: _bump_now(resource, scope_ids))
+
+def _count(resource, outcome):
+    key = f"etag:stats:{resource}:{outcome}"
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+def hit_rate_stats():
+    stats = {}
+    for resource in RESOURCES:
+        hits = cache.get(f"etag:stats:{resource}:hit", 0)
+        misses = cache.get(f"etag:stats:{resource}:miss", 0)
+        total = hits + misses
+        stats[resource] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else 0.0
+        }
+    return stats
+
+def task_audience(task_id):
+    """Görevi (veya alt görev olarak içeren üst görevi) listesinde gören kullanıcılar."""
+    task = Task.objects.filter(id=task_id).values('created_by_id', 'parent_task_id').first()
+    if not task:
+        return set()
+    task_ids = [task_id]
+    users = {task['created_by_id']}
+    if task['parent_task_id']:
+        task_ids.append(task['parent_task_id'])
+        users.update(Task.objects.filter(id=task['parent_task_id']).values_list('created_by_id', flat=True))
+    users.update(TaskAssignment.objects.filter(task_id__in=task_ids).values_list('user_id', flat=True))
+    return users
+
+def user_tenant_id(user_id):
+    return UserProfile.objects.filter(user_id=user_id).values_list('tenant_id', flat=True).first()
+
+class ConditionalListMixin:
+    """
+    list() için If-None-Match desteği. Alt sınıf 'etag_resource' ve
+    'etag_scope_id(request)' tanımlar; damga eşleşirse serializer ve
+    ana sorgular hiç çalışmadan 304 döner.
+    """
+    etag_resource = None
+
+    def etag_scope_id(self, request):
+        return request.user.id
+
+    def etag_extra(self, request):
+        return ''
+
+    def compute_etag(self, request):
+        scope_id = self.etag_scope_id(request)
+        stamp = get_stamp(self.etag_resource, scope_id)
+        raw = f"{self.etag_resource}:{scope_id}:{stamp}:{request.user.id}:{request.get_full_path()}:{self.etag_extra(request)}"
+        return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        etag = self.compute_etag(request)
+        client_etags = [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]
+        if etag in client_etags:
+            _count(self.etag_resource, 'hit')
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        _count(self.etag_resource, 'miss')
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+# --- SIGNALS ---
+@receiver([post_save, post_delete], sender=Task)
+def task_etag_signal(sender, instance, **kwargs):
+    bump('tasks', *task_audience(instance.id), instance.created_by_id)
+    if instance.parent_task_id:
+        bump('tasks', *task_audience(instance.parent_task_id))
+
+@receiver([post_save, post_delete], sender=TaskAssignment)
+@receiver([post_save, post_delete], sender=TaskAttachment)
+def task_child_etag_signal(sender, instance, **kwargs):
+    users = task_audience(instance.task_id)
+    if sender is TaskAssignment:
+        users.add(instance.user_id)
+    bump('tasks', *users)
+
+@receiver([post_save, post_delete], sender=TaskNode)
+def task_node_etag_signal(sender, instance, **kwargs):
+    bump('tasks', instance.user_id)
+
+@receiver([post_save, post_delete], sender=TaskDependency)
+def dependency_etag_signal(sender, instance, **kwargs):
+    bump('dependencies', instance.tenant_id)
+
+@receiver([post_save, post_delete], sender=Notification)
+def notification_etag_signal(sender, instance, **kwargs):
+    bump('notifications', instance.user_id)
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def profile_etag_signal(sender, instance, **kwargs):
+    bump('users', instance.tenant_id)
+
+@receiver(post_init, sender=User)
+def user_etag_snapshot(sender, instance, **kwargs):
+    # Ertelenmiş alanlara dokunmamak için __dict__ okunur
+    instance._etag_fields = tuple(instance.__dict__.get(field) for field in USER_LIST_FIELDS)
+
+@receiver(post_save, sender=User)
+def user_etag_signal(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(USER_LIST_FIELDS):
+        return
+    current = tuple(instance.__dict__.get(field) for field in USER_LIST_FIELDS)
+    changed = created or current != instance._etag_fields
+    instance._etag_fields = current
+    if changed:
+        bump('users', user_tenant_id(instance.id))
@@ -0,0 +1,186 @@
+import os
+import threading
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import ExportJob
+
+# Dışa aktarımlar istek içinde çalışmaz; ExportJob olarak kuyruğa yazılır ve
+# worker tarafından sırayla işlenir. Aynı anahtarla bekleyen bir iş varsa yeni
+# istek ona eklenir (request_count artar); aynı anda gelen deaktivasyonlar tek
+# bir tam dışa aktarımda birleşir. Çalışmakta olan iş birleştirilmez: başladıktan
+# sonra gelen veriler için yeni bir iş kuyruğa girer ve öncekinin bitmesini bekler.
+# Kuyruk veritabanında olduğu için birden fazla süreç (web worker'ları,
+# `process_export_jobs` komutu) skip_locked ile aynı kuyruğu paylaşabilir.
+#
+# Çalışan iş claim_token ile kiralanır. İlerleme/heartbeat ve bitiş
+# güncellemeleri yalnızca token eşleşirse yazılır; zaman aşımıyla yeniden
+# kuyruğa alınan işin eski çalıştırıcısı ilk heartbeat'te durdurulur ve işi
+# 'done' olarak işaretleyemez.
+
+POLL_SECONDS = 60
+# Bu süre boyunca ilerleme/heartbeat bildirmeyen 'running' iş, worker'ı düşmüş sayılır
+STALE_AFTER = timedelta(minutes=30)
+# Uzun taramalar en az bu aralıkla heartbeat gönderir (STALE_AFTER'dan çok kısa)
+HEARTBEAT_SECONDS = 60
+MAX_ATTEMPTS = 3
+
+def dedupe_key(kind, user_id=None):
+    return kind if user_id is None else f"{kind}:{user_id}"
+
+def submit(kind, user=None, requested_by=None):
+    """İşi kuyruğa alır (ya da bekleyen aynı işe ekler) ve ExportJob döndürür."""
+    key = dedupe_key(kind, user.id if user else None)
+    job = None
+    while job is None:
+        queued = ExportJob.objects.filter(dedupe_key=key, status='queued').first()
+        if queued:
+            # Worker iki sorgu arasında işi almış olabilir; o durumda yeni iş açılır
+            if ExportJob.objects.filter(id=queued.id, status='queued').update(
+                request_count=F('request_count') + 1, updated_at=timezone.now()
+            ):
+                job = queued
+            continue
+        try:
+            with transaction.atomic():
+                job = ExportJob.objects.create(kind=kind, dedupe_key=key, user=user, requested_by=requested_by)
+        except IntegrityError:
+            continue
+
+    transaction.on_commit(worker.wake)
+    return job
+
+def _requeue_stale(now):
+    for job in ExportJob.objects.filter(status='running', updated_at__lt=now - STALE_AFTER):
+        if job.attempts < MAX_ATTEMPTS and not ExportJob.objects.filter(dedupe_key=job.dedupe_key, status='queued').exists():
+            try:
+                with transaction.atomic():
+                    ExportJob.objects.filter(id=job.id, status='running').update(
+                        status='queued', claim_token='', updated_at=now
+                    )
+                continue
+            except IntegrityError:
+                pass
+        ExportJob.objects.filter(id=job.id, status='running').update(
+            status='failed', claim_token='', error='Worker stopped responding.', finished_at=now
+        )
+
+def claim_next():
+    now = timezone.now()
+    _requeue_stale(now)
+    with transaction.atomic():
+        # Aynı anahtarlı bir iş çalışırken sıradaki beklemeye devam eder
+        running_keys = ExportJob.objects.filter(status='running').values('dedupe_key')
+        job = ExportJob.objects.select_for_update(skip_locked=True).filter(
+            status='queued'
+        ).exclude(dedupe_key__in=running_keys).order_by('created_at').first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = now
+        job.attempts += 1
+        job.progress = 0
+        job.progress_message = ''
+        job.claim_token = uuid.uuid4().hex
+        job.save(update_fields=[
+            'status', 'started_at', 'attempts', 'progress', 'progress_message', 'claim_token', 'updated_at'
+        ])
+    return job
+
+class JobLeaseLost(Exception):
+    pass
+
+def _claimed(job):
+    return ExportJob.objects.filter(id=job.id, status='running', claim_token=job.claim_token)
+
+def report_progress(job, done, total, message=''):
+    """İlerlemeyi yazar (heartbeat); iş başka bir çalıştırıcıya geçtiyse JobLeaseLost."""
+    if not _claimed(job).update(
+        progress=round(done / total, 4) if total else 0,
+        progress_message=message[:255],
+        updated_at=timezone.now()
+    ):
+        raise JobLeaseLost(f"Export job #{job.id} is no longer claimed by this worker.")
+
+def run_job(job):
+    try:
+        if job.kind == 'user_session':
+            from .services import export_user_session_csv
+            result_path = export_user_session_csv(job.user)
+        elif job.kind == 'auto_export':
+            # Kullanıcı isteği (ör. deaktivasyon) son olayı beklemeden içermeli; zamanlanmış iş bekler
+            options = {'settle_seconds': 0} if job.requested_by_id else {}
+            call_command(
+                'auto_export_logs',
+                progress=lambda done, total, message: report_progress(job, done, total, message),
+                **options
+            )
+            result_path = os.path.join(settings.BASE_DIR, 'research_exports')
+        else:
+            raise ValueError(f"Unknown export job kind: {job.kind}")
+    except Exception as e:
+        print(f"Export job #{job.id} error: {e}")
+        _claimed(job).update(status='failed', error=str(e), finished_at=timezone.now())
+        return False
+
+    if not _claimed(job).update(
+        status='done', progress=1, result_path=result_path, error='', finished_at=timezone.now()
+    ):
+        print(f"Export job #{job.id} finished after its lease was lost; status left to the new run.")
+        return False
+    return True
+
+def process_pending(limit=None):
+    """Kuyruktaki işleri bitene (ya da limit'e) kadar işler; işlenen iş sayısını döndürür."""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+class ExportWorker:
+    """Süreç içi worker thread'i; submit() sonrası commit'te uyandırılır."""
+    def __init__(self, poll_seconds=POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def enabled(self):
+        return getattr(settings, 'EXPORT_JOBS_IN_PROCESS', True)
+
+    def wake(self):
+        if not self.enabled():
+            return
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def _ensure_thread(self):
+        # fork sonrası (ör. gunicorn) thread çocuk sürece taşınmaz, yeniden başlatılır
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='export-worker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+            try:
+                process_pending()
+            except Exception as e:
+                print(f"Export worker error: {e}")
+            finally:
+                connection.close()
+
+worker = ExportWorker()
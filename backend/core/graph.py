@@ -0,0 +1,103 @@
+import hashlib
+from django.contrib.auth.models import User
+from django.db.models import Q
+from .models import Task, TaskAssignment, TaskDependency, TaskNode
+from . import etags
+from . import presence
+
+# Spiral tuvali için sıkıştırılmış ağ görüntüsü (/api/graph/snapshot/).
+# /api/tasks/ + /api/dependencies/ + /api/users/ yerine tek yanıt: her tablo
+# {'columns': [...], 'rows': [[...], ...]} biçimindedir ve kullanıcılar
+# yalnızca bir kez, 'users' tablosunda bulunur; görev, atama ve node satırları
+# kullanıcıya id ile başvurur. Model örneği oluşturulmaz (values_list) ve
+# toplam sorgu sayısı veri boyutundan bağımsızdır.
+
+USER_COLUMNS = ['id', 'username', 'display_name', 'avatar_id', 'rank', 'title', 'department', 'status']
+TASK_COLUMNS = [
+    'id', 'title', 'status', 'priority', 'due_date', 'created_at', 'created_by', 'parent_task',
+    'is_pipeline_task', 'assignment_count', 'completed_count', 'failed_count', 'comment_count',
+    'attachment_count', 'subtree_completion'
+]
+ASSIGNMENT_COLUMNS = ['task', 'user', 'is_completed', 'is_failed', 'is_read']
+NODE_COLUMNS = ['id', 'task', 'x', 'y', 'is_pinned']
+EDGE_COLUMNS = ['id', 'source', 'target']
+
+def _table(columns, rows):
+    return {'columns': columns, 'rows': rows}
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def _display_name(username, first_name, gender):
+    suffix = "Bey" if gender == 'male' else "Hanım" if gender == 'female' else ""
+    return f"{first_name or username} {suffix}".strip()
+
+def snapshot_etag(user, tenant_id):
+    raw = ':'.join(str(part) for part in (
+        user.id,
+        etags.get_stamp('tasks', user.id),
+        etags.get_stamp('dependencies', tenant_id),
+        etags.get_stamp('users', tenant_id) if tenant_id else '',
+        presence.tenant_cursor(tenant_id) if tenant_id else '',
+    ))
+    return '"graph-' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+def build_snapshot(user, tenant_id):
+    task_rows = list(Task.objects.filter(
+        Q(created_by=user) | Q(assignments__user=user)
+    ).distinct().order_by('id').values_list(
+        'id', 'title', 'status', 'priority', 'due_date', 'created_at', 'created_by_id', 'parent_task_id',
+        'is_pipeline_task', 'assignment_count', 'completed_count', 'failed_count', 'comment_count',
+        'attachment_count', 'subtree_assignment_count', 'subtree_completed_count'
+    ))
+    task_ids = [row[0] for row in task_rows]
+
+    assignments = list(TaskAssignment.objects.filter(task_id__in=task_ids).order_by('task_id', 'id').values_list(
+        'task_id', 'user_id', 'is_completed', 'is_failed', 'is_read'
+    ))
+    nodes = list(TaskNode.objects.filter(user=user, task_id__in=task_ids).order_by('task_id').values_list(
+        'id', 'task_id', 'position_x', 'position_y', 'is_pinned'
+    ))
+    edges = list(TaskDependency.objects.filter(
+        Q(source_task_id__in=task_ids) | Q(target_task_id__in=task_ids)
+    ).order_by('id').values_list('id', 'source_task_id', 'target_task_id'))
+
+    # Grup üyeleri + görevlerde adı geçen diğer kullanıcılar, tek sorgu
+    referenced = {row[6] for row in task_rows} | {row[1] for row in assignments}
+    user_filter = Q(id__in=referenced)
+    if tenant_id:
+        user_filter |= Q(profile__tenant_id=tenant_id)
+    statuses, _ = presence.current_statuses(tenant_id) if tenant_id else ({}, None)
+    users = [
+        [
+            user_id, username, _display_name(username, first_name, gender), avatar_id or 1, rank or 1,
+            title or '', department or "Genel", statuses.get(user_id, 'offline')
+        ]
+        for user_id, username, first_name, gender, avatar_id, rank, title, department in User.objects.filter(
+            user_filter
+        ).order_by('id').values_list(
+            'id', 'username', 'first_name', 'profile__gender', 'profile__avatar_id', 'profile__rank',
+            'profile__title', 'profile__department__name'
+        )
+    ]
+
+    tasks = [
+        [
+            task_id, title, status, priority, _iso(due_date), _iso(created_at), created_by_id, parent_task_id,
+            is_pipeline_task, assignment_count, completed_count, failed_count, comment_count, attachment_count,
+            round(subtree_completed / subtree_assigned, 4) if subtree_assigned else 0.0
+        ]
+        for (
+            task_id, title, status, priority, due_date, created_at, created_by_id, parent_task_id,
+            is_pipeline_task, assignment_count, completed_count, failed_count, comment_count, attachment_count,
+            subtree_assigned, subtree_completed
+        ) in task_rows
+    ]
+
+    return {
+        'users': _table(USER_COLUMNS, users),
+        'tasks': _table(TASK_COLUMNS, tasks),
+        'assignments': _table(ASSIGNMENT_COLUMNS, [list(row) for row in assignments]),
+        'nodes': _table(NODE_COLUMNS, [list(row) for row in nodes]),
+        'edges': _table(EDGE_COLUMNS, [list(row) for row in edges]),
+    }
@@ -1,23 +1,203 @@
+import atexit
+import os
+import threading
+from collections import deque
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
 from .models import ActivityLog
 
-def log_event(user, session_id, event_type, metadata=None):
+# Araştırma olayları istek sırasında veritabanına yazılmaz; süreç içi sınırlı
+# bir tampona alınır ve arka plan thread'i tarafından bulk_create ile yazılır.
+# Tek kuyruk + tek yazıcı olduğu için olaylar geliş sırasıyla (oturum içi
+# sıra korunarak) kaydedilir. ACTIVITY_LOG_SYNC=True iken doğrudan yazılır.
+# Yazılamayan parti kuyruğun başına geri konur ve artan aralıklarla yeniden
+# denenir; art arda MAX_RETRIES hatadan sonra kayıtlar tek tek yazılır ve
+# yalnızca yine de yazılamayanlar düşürülür.
+
+MAX_RETRIES = 5
+
+class ActivityLogBuffer:
+    def __init__(self, max_size=10000, batch_size=200, flush_interval=2.0):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.high_water = int(max_size * 0.8)
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._failures = 0
+
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'backpressure': 0,
+        }
+
+    def enqueue(self, log):
+        with self._lock:
+            if len(self._queue) >= self.max_size:
+                self.stats['dropped'] += 1
+                return False
+            self._queue.append(log)
+            self.stats['enqueued'] += 1
+            size = len(self._queue)
+            if size >= self.high_water:
+                self.stats['backpressure'] += 1
+
+        self._ensure_thread()
+        if size >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self, match=None):
+        """
+        Tampondaki olayları sırayla yazar; yazılan kayıt sayısını döndürür.
+        'match' verilirse yalnızca onu sağlayan olaylar yazılır (ör. tek bir
+        oturum), diğerleri kuyruktaki sıralarıyla arka plan yazıcısına kalır.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._take(match)
+                if not batch:
+                    return written
+                try:
+                    if self._failures >= MAX_RETRIES:
+                        saved = self._write_one_by_one(batch)
+                    else:
+                        ActivityLog.objects.bulk_create(batch)
+                        saved = len(batch)
+                except Exception as e:
+                    with self._lock:
+                        # Sıra bozulmasın diye parti kuyruğun başına geri konur
+                        self._queue.extendleft(reversed(batch))
+                        self.stats['failed_flushes'] += 1
+                    self._failures += 1
+                    print(f"Logging failed: {e}")
+                    if not connection.in_atomic_block:
+                        connection.close()
+                    return written
+                self._failures = 0
+                written += saved
+                with self._lock:
+                    self.stats['written'] += saved
+                    self.stats['dropped'] += len(batch) - saved
+                    self.stats['flushes'] += 1
+
+    def _take(self, match):
+        if match is None:
+            return [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        batch, rest = [], deque()
+        for log in self._queue:
+            (batch if len(batch) < self.batch_size and match(log) else rest).append(log)
+        if batch:
+            self._queue = rest
+        return batch
+
+    def _write_one_by_one(self, batch):
+        saved = 0
+        for log in batch:
+            try:
+                log.save()
+                saved += 1
+            except Exception as e:
+                print(f"Logging failed, dropping event: {e}")
+                if not connection.in_atomic_block:
+                    connection.close()
+        return saved
+
+    def pending(self):
+        with self._lock:
+            return len(self._queue)
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, 'pending': len(self._queue), 'max_size': self.max_size}
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+
+    def _ensure_thread(self):
+        # fork sonrası (ör. gunicorn) thread çocuk sürece taşınmaz, yeniden başlatılır
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._closed:
+                # Art arda hatalarda bekleme süresi katlanarak artar (en fazla 60 sn)
+                self._wakeup.wait(min(self.flush_interval * (2 ** self._failures), 60))
+                self._wakeup.clear()
+                self.flush()
+        finally:
+            connection.close()
+
+buffer = ActivityLogBuffer(
+    max_size=getattr(settings, 'ACTIVITY_LOG_BUFFER_SIZE', 10000),
+    batch_size=getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 200),
+    flush_interval=getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 2.0),
+)
+atexit.register(buffer.close)
+
+def flush_activity_logs(user_id=None, session_id=None):
+    """
+    Export gibi güncel veriye ihtiyaç duyan işlemlerden önce çağrılır.
+    user_id (ve session_id) verilirse yalnızca o kullanıcının (oturumun)
+    olayları yazılır; tüm tampon istek yolunda boşaltılmaz.
+    """
+    if user_id is None:
+        return buffer.flush()
+    return buffer.flush(lambda log: log.user_id == user_id and (session_id is None or log.session_id == session_id))
+
+def log_event(user, session_id, event_type, metadata=None, immediate=False):
     """
     Logs an event to the ActivityLog model silently.
+    immediate=True bypasses the buffer (e.g. when the caller reads the row back).
+    Inside a transaction only this row is written; the shared buffer (other
+    users' events) is flushed after commit so it cannot roll back with it.
     """
     if metadata is None:
         metadata = {}
-    
+
     try:
         # Ensure user is authenticated or None
         if user and not user.is_authenticated:
             user = None
-            
-        ActivityLog.objects.create(
+
+        log = ActivityLog(
             user=user,
             session_id=session_id,
             event_type=event_type,
-            metadata=metadata
+            metadata=metadata,
+            created_at=timezone.now()
         )
+        if immediate or getattr(settings, 'ACTIVITY_LOG_SYNC', False):
+            if connection.in_atomic_block:
+                log.save()
+                transaction.on_commit(buffer.flush)
+            else:
+                buffer.flush()
+                log.save()
+        else:
+            buffer.enqueue(log)
     except Exception as e:
         # Silent failure as per requirements
         print(f"Logging failed: {e}")
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core.models import PresentationPeriod
+from core.services import allocate_aliases
+
+class Command(BaseCommand):
+    help = 'Assigns research aliases (A/B) to a whole cohort in one transaction, in user id order.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant',
+            action='append',
+            default=[],
+            help='Group code (Tenant.tenant_id) to include. Can be repeated.'
+        )
+        parser.add_argument(
+            '--period',
+            type=int,
+            help='PresentationPeriod id; includes every group in that period.'
+        )
+        parser.add_argument(
+            '--include-inactive',
+            action='store_true',
+            help='Also alias users that are not active yet.'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(profile__tenant__isnull=False)
+        if not options['include_inactive']:
+            users = users.filter(is_active=True)
+        if options['tenant']:
+            users = users.filter(profile__tenant__tenant_id__in=options['tenant'])
+        if options['period'] is not None:
+            period = PresentationPeriod.objects.filter(id=options['period']).first()
+            if period is None:
+                raise CommandError(f"Presentation period {options['period']} does not exist.")
+            users = users.filter(profile__tenant__presentation_periods=period)
+
+        created = allocate_aliases(users.distinct())
+        self.stdout.write(f"Allocated {len(created)} research alias(es).")
+        for alias in created:
+            self.stdout.write(f"  user {alias.user_id} -> {alias.alias}")
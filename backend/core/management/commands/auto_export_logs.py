@@ -1,16 +1,229 @@
 import csv
-import hashlib
+import heapq
+import multiprocessing
 import os
+import shutil
+from collections import OrderedDict, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, time, timedelta
+from time import monotonic
 from django.core.management.base import BaseCommand
+from django.db import connections
 from django.utils import timezone
-from core.models import ActivityLog, PresentationPeriod, Tenant, SurveyResponse
+from core.models import ActivityLog, PresentationPeriod, Tenant, SurveyResponse, UserProfile, ExportWatermark
+from core.export_jobs import HEARTBEAT_SECONDS
+from core.logging_utils import flush_activity_logs
+from core.services import anonymous_id_for, export_period_folder_name, EXPORT_CHUNK_SIZE
+from core import columnar
 from django.conf import settings
 
+# Bu süreden yeni loglar bir sonraki çalıştırmaya bırakılır; id sırası ile
+# commit sırası farklı olabileceğinden, henüz commit edilmemiş daha küçük
+# id'li bir satırın watermark'ın altında kalması engellenir. Yalnızca
+# artımlı (watermark'lı) çalıştırmalarda uygulanır; --full ve deaktivasyon
+# sonrası kuyruğa giren iş (--settle-seconds 0) son olayları da içerir.
+# id sırası created_at sırası da değildir (geriye tarihli toplu olaylar,
+# tampondan sonradan yazılan loglar): bir grubun taramasında bekleme süresine
+# takılan ilk satırdan sonra o grubun satırları yazılmaz ve watermark o
+# satırın altında kalır; sonraki çalıştırma oradan devam eder.
+EXPORT_SETTLE_SECONDS = 60
+
+# Kullanıcı dosyaları için aynı anda açık tutulan en fazla dosya sayısı
+MAX_OPEN_FILES = 128
+# Diske yazılmadan bellekte bekleyen en fazla satır sayısı
+MAX_BUFFERED_ROWS = 20000
+
+MASTER_HEADERS = [
+    'anonymous_user_id', 'group_code', 'session_id', 'event_type',
+    'task_id', 'word_count', 'char_count', 'hour_of_day',
+    'day_of_week', 'timestamp', 'survey_completed_at'
+]
+
+class CsvWriterPool:
+    """
+    Satırları yollarına göre doğru CSV dosyasına yazar. Satırlar sınırlı bir
+    tamponda toplanır ve tampon dolunca dosya başına tek seferde yazılır; açık
+    dosyalar LRU sırasıyla tutulur, sınır aşılınca en eski kapatılır ve
+    gerekirse daha sonra ekleme kipinde yeniden açılır. Böylece bellek log
+    hacminden bağımsızdır ve iç içe geçmiş kullanıcı satırları her satırda
+    dosya açıp kapatmaya yol açmaz.
+    """
+    def __init__(self, headers, truncate, max_open=MAX_OPEN_FILES, max_buffered=MAX_BUFFERED_ROWS):
+        self.headers = headers
+        self.truncate = truncate
+        self.max_open = max_open
+        self.max_buffered = max_buffered
+        self._open = OrderedDict() # path -> (file, writer)
+        self._pending = {} # path -> rows
+        self._buffered = 0
+        self._touched = set()
+
+    def writerow(self, path, row):
+        rows = self._pending.get(path)
+        if rows is None:
+            rows = self._pending[path] = []
+        rows.append(row)
+        self._buffered += 1
+        if self._buffered >= self.max_buffered:
+            self.flush()
+
+    def flush(self):
+        for path, rows in self._pending.items():
+            entry = self._open.get(path)
+            if entry is None:
+                entry = self._open_file(path)
+            else:
+                self._open.move_to_end(path)
+            entry[1].writerows(rows)
+        self._pending = {}
+        self._buffered = 0
+
+    def _open_file(self, path):
+        if len(self._open) >= self.max_open:
+            _, (f, _) = self._open.popitem(last=False)
+            f.close()
+
+        # Tam yeniden oluşturmada dosya bu çalıştırmada ilk açılışta sıfırlanır
+        mode = 'w' if self.truncate and path not in self._touched else 'a'
+        self._touched.add(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        f = open(path, mode, newline='', encoding='utf-8')
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(self.headers)
+        self._open[path] = (f, writer)
+        return self._open[path]
+
+    def close(self):
+        self.flush()
+        while self._open:
+            _, (f, _) = self._open.popitem(last=False)
+            f.close()
+
+def period_bounds(period):
+    # __date yerine aralık karşılaştırması created_at indeksini kullanabilir
+    start = timezone.make_aware(datetime.combine(period.start_date, time.min))
+    end = timezone.make_aware(datetime.combine(period.end_date + timedelta(days=1), time.min))
+    return start, end
+
+def format_log_row(anon_id, group_code, user_id, session_id, event_type, metadata, created_at, survey_times):
+    meta = metadata if isinstance(metadata, dict) else {}
+    survey_done = survey_times.get((user_id, session_id), "")
+
+    return [
+        anon_id,
+        group_code,
+        session_id,
+        event_type,
+        meta.get('task_id', ''),
+        meta.get('word_count', ''),
+        meta.get('char_count', ''),
+        created_at.hour,
+        created_at.strftime('%A'),
+        created_at.isoformat(),
+        survey_done
+    ]
+
+# --- PARALLEL (--workers) ---
+# Her worker bir (period, tenant) bölümünü işler: kendi DB bağlantısıyla
+# yalnızca o tenant'ın loglarını tarar, kullanıcı dosyalarını doğrudan
+# yazar ve birleşik dosyalar için id'li bir ara dosya bırakır. Ana süreç bu
+# ara dosyaları id sırasıyla birleştirir; çıktı tek süreçli çalışmayla aynıdır.
+
+_worker_survey_times = {}
+
+def _init_worker(survey_times):
+    global _worker_survey_times
+    _worker_survey_times = survey_times
+    # fork ile devralınan bağlantılar kullanılmaz, her worker kendi bağlantısını açar
+    connections.close_all()
+
+def open_parquet_writer(parquet_dir, run_id):
+    if not parquet_dir:
+        return None
+    return columnar.ParquetPartitionWriter(parquet_dir, MASTER_HEADERS, run_id)
+
+def export_partition(job):
+    pool = CsvWriterPool(MASTER_HEADERS, truncate=job['full'], max_open=job['max_open'])
+    parquet = open_parquet_writer(job['parquet_dir'], job['run_id'])
+    last_log_id = job['last_log_id']
+    count = 0
+
+    logs = ActivityLog.objects.filter(
+        created_at__gte=job['start'],
+        created_at__lt=job['end'],
+        user__profile__tenant_id=job['tenant_pk'],
+        id__gt=last_log_id
+    ).order_by('id').values_list(
+        'id', 'user_id', 'session_id', 'event_type', 'metadata', 'created_at'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    try:
+        with open(job['part_path'], 'w', newline='', encoding='utf-8') as part:
+            part_writer = csv.writer(part)
+            for log_id, user_id, session_id, event_type, metadata, created_at in logs:
+                if created_at >= job['cutoff']:
+                    # Bekleme süresine takılan ilk satırda durulur; watermark bunun altında kalır
+                    break
+                anon_id = job['users'][user_id]
+                row = format_log_row(
+                    anon_id, job['group_code'], user_id, session_id, event_type, metadata, created_at,
+                    _worker_survey_times
+                )
+                part_writer.writerow([log_id] + row)
+                pool.writerow(os.path.join(job['group_dir'], f"user_{anon_id}.csv"), row)
+                if parquet:
+                    parquet.write(job['period_folder'], job['group_code'], row)
+                last_log_id = log_id
+                count += 1
+    finally:
+        pool.close()
+        if parquet:
+            parquet.close()
+        connections.close_all()
+
+    return job['period_id'], job['tenant_pk'], last_log_id, count
+
+def _read_part(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            yield int(row[0]), row[1:]
+
 class Command(BaseCommand):
     help = 'Automatically exports activity logs based on presentation periods and groups.'
+    # progress(done, total, message): export_jobs ilerlemeyi buradan izler
+    stealth_options = ('progress',)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the stored watermarks and rebuild every export file from scratch.'
+        )
+        parser.add_argument(
+            '--settle-seconds',
+            type=int,
+            default=EXPORT_SETTLE_SECONDS,
+            help='Leave logs newer than this many seconds for the next incremental run (0 exports up to now).'
+        )
+        parser.add_argument(
+            '--max-open-files',
+            type=int,
+            default=MAX_OPEN_FILES,
+            help='Upper bound on CSV files kept open at the same time (per process).'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Export period x tenant partitions in parallel with this many processes.'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write("Starting automated export...")
+        self.progress = options.get('progress')
+        self.last_heartbeat = monotonic()
+        flush_activity_logs()
 
         # 1. Base export dir
         backend_root = settings.BASE_DIR
@@ -18,26 +231,50 @@ class Command(BaseCommand):
         if not os.path.exists(research_exports_dir):
             os.makedirs(research_exports_dir)
 
-        master_csv_path = os.path.join(research_exports_dir, 'MASTER_all_groups.csv')
-        master_headers = [
-            'anonymous_user_id', 'group_code', 'session_id', 'event_type', 
-            'task_id', 'word_count', 'char_count', 'hour_of_day', 
-            'day_of_week', 'timestamp', 'survey_completed_at'
-        ]
+        self.research_exports_dir = research_exports_dir
+        self.master_csv_path = os.path.join(research_exports_dir, 'MASTER_all_groups.csv')
+        self.max_open = max(options['max_open_files'], 3)
+
+        periods = list(PresentationPeriod.objects.prefetch_related('tenants'))
+        all_tenants = list(Tenant.objects.all())
+        memberships = {period.id: list(period.tenants.all()) or all_tenants for period in periods}
+
+        # 2. Watermarks: (period_id, tenant_id) -> last exported ActivityLog id
+        watermarks = dict(
+            ((w.period_id, w.tenant_id), w.last_log_id) for w in ExportWatermark.objects.all()
+        )
+        full = options['full'] or any(
+            {t.id for t in memberships[period.id]} != {tid for (pid, tid) in watermarks if pid == period.id}
+            for period in periods
+        )
+        if full:
+            self.stdout.write("Tenant membership changed or no watermark found; rebuilding all files.")
+            watermarks = {}
+        self.full = full
+        settle_seconds = 0 if full else max(options['settle_seconds'], 0)
+        self.cutoff = timezone.now() - timedelta(seconds=settle_seconds)
 
-        periods = PresentationPeriod.objects.all()
+        # Parquet kopyası (pyarrow varsa): her çalıştırma bölüm başına yeni bir part dosyası ekler
+        self.parquet_dir = None
+        self.run_id = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+        if columnar.parquet_enabled():
+            self.parquet_dir = os.path.join(research_exports_dir, 'parquet', 'activity')
+            if full:
+                shutil.rmtree(self.parquet_dir, ignore_errors=True)
+        else:
+            self.stdout.write("pyarrow not installed or RESEARCH_EXPORT_PARQUET is off; writing CSV only.")
 
-        # 2. Pre-fetch survey completion times for this period to avoid N+1
+        # 3. Pre-fetch survey completion times for this period to avoid N+1
         # (user_id, session_id) -> submitted_at
         survey_times = {}
-        if periods.exists():
-            first_start = periods.order_by('start_date').first().start_date
-            last_end = periods.order_by('-end_date').first().end_date
+        if periods:
+            first_start = min(p.start_date for p in periods)
+            last_end = max(p.end_date for p in periods)
             period_surveys = SurveyResponse.objects.filter(
                 submitted_at__date__gte=first_start,
                 submitted_at__date__lte=last_end
             ).values('user_id', 'session_id', 'submitted_at')
-            
+
             for s in period_surveys:
                 key = (s['user_id'], s['session_id'])
                 if key not in survey_times: # Keep the first one assuming batch submit
@@ -45,99 +282,188 @@ class Command(BaseCommand):
 
         self.survey_times_cache = survey_times
 
-        all_master_rows = []
+        # 4. user_id -> (anonymous_id, tenant pk, group code); satır başına hash/JOIN yapılmaz
+        user_map = {
+            user_id: (anonymous_id_for(user_id), tenant_pk, group_code)
+            for user_id, tenant_pk, group_code in UserProfile.objects.filter(
+                tenant__isnull=False
+            ).values_list('user_id', 'tenant_id', 'tenant__tenant_id')
+        }
 
-        for period in periods:
-            self.stdout.write(f"Processing period: {period.name}")
-            
-            # Subfolder for period
-            period_folder_name = f"{period.name}_{period.start_date.strftime('%b%y')}"
-            period_dir = os.path.join(research_exports_dir, period_folder_name)
-            if not os.path.exists(period_dir):
-                os.makedirs(period_dir)
-            
-            period_combined_rows = []
-            
-            # Filter logs for this period
-            period_logs = ActivityLog.objects.filter(
-                created_at__date__gte=period.start_date,
-                created_at__date__lte=period.end_date
-            )
-
-            # Process by Tenant
-            tenants = period.tenants.all()
-            if not tenants.exists():
-                tenants = Tenant.objects.all()
-
-            for tenant in tenants:
-                tenant_logs = period_logs.filter(user__profile__tenant=tenant)
-                if not tenant_logs.exists():
-                    continue
+        if options['workers'] > 1:
+            new_watermarks, total_rows = self.export_parallel(periods, memberships, watermarks, user_map, options['workers'])
+        else:
+            new_watermarks, total_rows = self.export_sequential(periods, memberships, watermarks, user_map)
+
+        self.save_watermarks(new_watermarks)
+
+        self.report_progress(1, 1, 'completed')
+        self.stdout.write(self.style.SUCCESS(
+            f"Automated export completed successfully ({'full' if full else 'incremental'}, {total_rows} new rows)."
+        ))
+
+    def report_progress(self, done, total, message=''):
+        if self.progress:
+            self.progress(done, total, message)
+        self.last_heartbeat = monotonic()
+
+    def heartbeat(self, done, total, message=''):
+        # Uzun taramalarda işin canlı olduğu düzenli olarak bildirilir (export_jobs.STALE_AFTER)
+        if self.progress and monotonic() - self.last_heartbeat >= HEARTBEAT_SECONDS:
+            self.report_progress(done, total, message)
 
-                # Group subfolder
-                group_dir = os.path.join(period_dir, str(tenant.tenant_id))
-                if not os.path.exists(group_dir):
-                    os.makedirs(group_dir)
-
-                # Group by user
-                user_data_map = {} # anon_id -> list of rows
-                
-                for log in tenant_logs:
-                    row = self.format_log_row(log, tenant.tenant_id)
-                    anon_id = row[0] # anonymous_user_id is at index 0
-                    
-                    if anon_id not in user_data_map:
-                        user_data_map[anon_id] = []
-                    
-                    user_data_map[anon_id].append(row)
-                    period_combined_rows.append(row)
-                    all_master_rows.append(row)
-                
-                # Write individual User CSVs
-                for anon_id, rows in user_data_map.items():
-                    user_csv_path = os.path.join(group_dir, f"user_{anon_id}.csv")
-                    self.write_csv(user_csv_path, master_headers, rows)
-
-            # Write Period Combined CSV
-            if period_combined_rows:
+    def period_dir(self, period):
+        # Subfolder for period
+        period_dir = os.path.join(self.research_exports_dir, export_period_folder_name(period))
+        if not os.path.exists(period_dir):
+            os.makedirs(period_dir)
+        return period_dir
+
+    def export_sequential(self, periods, memberships, watermarks, user_map):
+        pool = CsvWriterPool(MASTER_HEADERS, truncate=self.full, max_open=self.max_open)
+        parquet = open_parquet_writer(self.parquet_dir, self.run_id)
+        new_watermarks = {}
+        total_rows = 0
+
+        try:
+            for index, period in enumerate(periods):
+                self.stdout.write(f"Processing period: {period.name}")
+                self.report_progress(index, len(periods), f"period {period.name}")
+                period_dir = self.period_dir(period)
                 combined_csv_path = os.path.join(period_dir, 'ALL_combined.csv')
-                self.write_csv(combined_csv_path, master_headers, period_combined_rows)
-
-        # Write MASTER CSV
-        if all_master_rows:
-            # Note: The request said MASTER_all_groups.csv in the root of research_exports/ combining everything.
-            # We overwrite it with latest state or append? I'll overwrite as it's an "export all" command.
-            self.write_csv(master_csv_path, master_headers, all_master_rows)
-
-        self.stdout.write(self.style.SUCCESS("Automated export completed successfully."))
-
-    def format_log_row(self, log, group_code):
-        anon_user_id = ""
-        if log.user:
-            hash_obj = hashlib.sha256(str(log.user.id).encode())
-            anon_user_id = hash_obj.hexdigest()[0:16]
-        
-        meta = log.metadata if isinstance(log.metadata, dict) else {}
-        survey_done = ""
-        if log.user:
-            survey_done = self.survey_times_cache.get((log.user.id, log.session_id), "")
-
-        return [
-            anon_user_id,
-            group_code,
-            log.session_id,
-            log.event_type,
-            meta.get('task_id', ''),
-            meta.get('word_count', ''),
-            meta.get('char_count', ''),
-            log.created_at.hour,
-            log.created_at.strftime('%A'),
-            log.created_at.isoformat(),
-            survey_done
-        ]
+                period_folder = export_period_folder_name(period)
+
+                period_marks = {
+                    tenant.id: watermarks.get((period.id, tenant.id), 0)
+                    for tenant in memberships[period.id]
+                }
+                if not period_marks:
+                    continue
+                latest = dict(period_marks)
+                held = set() # bekleme süresine takılan satırı olan tenant'lar
+                user_paths = {} # user_id -> per-user CSV path
+
+                # Period başına tek, id sıralı tarama; tüm tenant'lar birlikte okunur
+                start, end = period_bounds(period)
+                period_logs = ActivityLog.objects.filter(
+                    created_at__gte=start,
+                    created_at__lt=end,
+                    user__profile__tenant_id__in=list(period_marks),
+                    id__gt=min(period_marks.values())
+                ).order_by('id').values_list(
+                    'id', 'user_id', 'session_id', 'event_type', 'metadata', 'created_at'
+                ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
 
-    def write_csv(self, path, headers, rows):
-        with open(path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(headers)
-            writer.writerows(rows)
+                for log_id, user_id, session_id, event_type, metadata, created_at in period_logs:
+                    anon_id, tenant_pk, group_code = user_map[user_id]
+                    if log_id <= period_marks[tenant_pk] or tenant_pk in held:
+                        continue
+                    if created_at >= self.cutoff:
+                        held.add(tenant_pk)
+                        continue
+
+                    row = format_log_row(
+                        anon_id, group_code, user_id, session_id, event_type, metadata, created_at,
+                        self.survey_times_cache
+                    )
+                    pool.writerow(self.master_csv_path, row)
+                    pool.writerow(combined_csv_path, row)
+                    user_path = user_paths.get(user_id)
+                    if user_path is None:
+                        user_path = user_paths[user_id] = os.path.join(period_dir, str(group_code), f"user_{anon_id}.csv")
+                    pool.writerow(user_path, row)
+                    if parquet:
+                        parquet.write(period_folder, group_code, row)
+                    latest[tenant_pk] = log_id
+                    total_rows += 1
+                    self.heartbeat(index, len(periods), f"period {period.name}: {total_rows} rows")
+
+                for tenant_pk, log_id in latest.items():
+                    new_watermarks[(period.id, tenant_pk)] = log_id
+        finally:
+            pool.close()
+            if parquet:
+                parquet.close()
+
+        return new_watermarks, total_rows
+
+    def export_parallel(self, periods, memberships, watermarks, user_map, workers):
+        parts_dir = os.path.join(self.research_exports_dir, '.partitions')
+        os.makedirs(parts_dir, exist_ok=True)
+
+        tenant_users = defaultdict(dict)
+        for user_id, (anon_id, tenant_pk, _) in user_map.items():
+            tenant_users[tenant_pk][user_id] = anon_id
+
+        jobs = []
+        for period in periods:
+            period_dir = self.period_dir(period)
+            start, end = period_bounds(period)
+            for tenant in memberships[period.id]:
+                jobs.append({
+                    'period_id': period.id,
+                    'tenant_pk': tenant.id,
+                    'group_code': tenant.tenant_id,
+                    'period_folder': export_period_folder_name(period),
+                    'parquet_dir': self.parquet_dir,
+                    'run_id': self.run_id,
+                    'group_dir': os.path.join(period_dir, str(tenant.tenant_id)),
+                    'part_path': os.path.join(parts_dir, f"{period.id}_{tenant.id}.csv"),
+                    'last_log_id': watermarks.get((period.id, tenant.id), 0),
+                    'start': start,
+                    'end': end,
+                    'cutoff': self.cutoff,
+                    'users': tenant_users[tenant.id],
+                    'full': self.full,
+                    'max_open': self.max_open,
+                })
+
+        # Ana sürecin bağlantısı fork ile worker'lara taşınmasın
+        connections.close_all()
+        results = {}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker,
+            initargs=(self.survey_times_cache,)
+        ) as executor:
+            pending = {executor.submit(export_partition, job) for job in jobs}
+            while pending:
+                finished, pending = wait(pending, timeout=HEARTBEAT_SECONDS, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    period_id, tenant_pk, last_log_id, count = future.result()
+                    results[(period_id, tenant_pk)] = (last_log_id, count)
+                # Bölümler ilerlemenin %90'ı, birleştirme kalan %10'u sayılır; bölüm bitmese de heartbeat gider
+                self.report_progress(len(results) * 9, len(jobs) * 10, f"{len(results)}/{len(jobs)} partitions")
+
+        # Merge: period sırasıyla, her period içinde log id sırasıyla
+        pool = CsvWriterPool(MASTER_HEADERS, truncate=self.full, max_open=self.max_open)
+        try:
+            for period in periods:
+                self.stdout.write(f"Merging period: {period.name}")
+                combined_csv_path = os.path.join(self.period_dir(period), 'ALL_combined.csv')
+                part_paths = [job['part_path'] for job in jobs if job['period_id'] == period.id]
+                for _, row in heapq.merge(*(_read_part(path) for path in part_paths), key=lambda item: item[0]):
+                    pool.writerow(self.master_csv_path, row)
+                    pool.writerow(combined_csv_path, row)
+                    self.heartbeat(9, 10, f"merging period {period.name}")
+        finally:
+            pool.close()
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+        new_watermarks = {key: last_log_id for key, (last_log_id, _) in results.items()}
+        return new_watermarks, sum(count for _, count in results.values())
+
+    def save_watermarks(self, new_watermarks):
+        rows = [
+            ExportWatermark(period_id=period_id, tenant_id=tenant_id, last_log_id=last_log_id)
+            for (period_id, tenant_id), last_log_id in new_watermarks.items()
+        ]
+        if self.full:
+            ExportWatermark.objects.all().delete()
+        ExportWatermark.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['period', 'tenant'],
+            update_fields=['last_log_id', 'updated_at']
+        )
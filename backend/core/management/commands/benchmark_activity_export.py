@@ -0,0 +1,68 @@
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from core import benchmarks
+from core.services import (
+    GLOBAL_ACTIVITY_HEADERS, _copy_to, copy_export_supported, generate_global_activity_csv,
+    global_activity_copy_sql, iter_copy_chunks, iter_csv_lines, iter_global_activity_rows,
+)
+
+class _CountingSink:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+def orm_stream():
+    return sum(len(line.encode('utf-8')) for line in iter_csv_lines(GLOBAL_ACTIVITY_HEADERS, iter_global_activity_rows()))
+
+def copy_direct():
+    sink = _CountingSink()
+    _copy_to(global_activity_copy_sql(), sink)
+    return sink.size
+
+def copy_stream():
+    return sum(len(chunk) for chunk in iter_copy_chunks(global_activity_copy_sql()))
+
+def file_export(export_dir):
+    with override_settings(BASE_DIR=export_dir):
+        return generate_global_activity_csv()
+
+class Command(BaseCommand):
+    help = 'Compares the ORM streaming path and the PostgreSQL COPY path of the global activity export (runtime and peak RSS).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=0,
+            help='Seed this many synthetic ActivityLog rows first.'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the bench_<NAME> database and its rows for a later run instead of dropping it.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with benchmarks.benchmark_database(keep=options['keep']) as name:
+                self.stdout.write(f"Benchmark database: {name}")
+                if options['rows']:
+                    self.stdout.write(f"Seeding {options['rows']} rows...")
+                    # Ayrı süreçte; ölçülen süreçler tohum verisini bellekte devralmaz
+                    benchmarks.run_in_child(benchmarks.seed_activity_logs, options['rows'], 2000, 8, 7, self.stdout)
+                cases = [('ORM streaming', orm_stream)]
+                if copy_export_supported():
+                    cases += [('COPY direct', copy_direct), ('COPY streamed through the pipe', copy_stream)]
+                else:
+                    self.stdout.write("Not PostgreSQL; only the ORM path is measured.")
+                with tempfile.TemporaryDirectory() as export_dir:
+                    cases.append(('File export (generate_global_activity_csv)', lambda: file_export(export_dir)))
+                    for label, target in cases:
+                        elapsed, rss, result = benchmarks.run_in_child(target)
+                        detail = f"{result / 1024 / 1024:.1f} MB" if isinstance(result, int) else ''
+                        self.stdout.write(f"{label:<45} {elapsed:8.2f} s  peak RSS {rss:7.1f} MB  {detail}")
+        except RuntimeError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,51 @@
+import io
+import tempfile
+from datetime import timedelta
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from core import benchmarks
+from core.models import PresentationPeriod
+
+def run_export(export_dir, workers):
+    with override_settings(BASE_DIR=export_dir):
+        call_command('auto_export_logs', full=True, workers=workers, stdout=io.StringIO())
+
+class Command(BaseCommand):
+    help = (
+        'Measures runtime and peak RSS of a full auto_export_logs run over synthetic logs of the given sizes. '
+        'Runs in a separate bench_<NAME> database that is dropped afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            action='append',
+            help='Synthetic ActivityLog rows to export. Can be repeated (default: 1000000).'
+        )
+        parser.add_argument('--users', type=int, default=2000, help='Synthetic users spread over the groups.')
+        parser.add_argument('--tenants', type=int, default=8, help='Synthetic groups in the benchmark period.')
+        parser.add_argument('--workers', type=int, default=1, help='Passed to auto_export_logs --workers.')
+
+    def handle(self, *args, **options):
+        sizes = options['rows'] or [1000000]
+        try:
+            for rows in sizes:
+                # Her boyut kendi boş benchmark veritabanında; gerçek watermark'lara dokunulmaz
+                with benchmarks.benchmark_database():
+                    self.stdout.write(f"Seeding {rows} rows...")
+                    benchmarks.run_in_child(
+                        benchmarks.seed_activity_logs, rows, options['users'], options['tenants'], 7, self.stdout
+                    )
+                    today = timezone.localdate()
+                    period = PresentationPeriod.objects.create(
+                        name=f'{benchmarks.BENCH_PREFIX} period', start_date=today - timedelta(days=8), end_date=today
+                    )
+                    period.tenants.set(benchmarks.bench_tenants())
+                    with tempfile.TemporaryDirectory() as export_dir:
+                        elapsed, rss, _ = benchmarks.run_in_child(run_export, export_dir, options['workers'])
+                self.stdout.write(f"{rows:>10} rows: {elapsed:8.1f} s  peak RSS {rss:7.1f} MB  ({rows / elapsed:,.0f} rows/s)")
+        except RuntimeError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,111 @@
+import statistics
+import time
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core import benchmarks
+from core import onboarding
+from core.logging_utils import flush_activity_logs
+from core.models import PipelineStage, PipelineTemplate, PresentationPeriod, Tenant, UserProfile
+
+PASSWORD = 'bench-password'
+TENANT_CODE = f'{benchmarks.BENCH_PREFIX.upper()}LOGIN'
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+def seed_login_users(users, stages):
+    tenant = Tenant.objects.create(name=f'{benchmarks.BENCH_PREFIX} login', tenant_id=TENANT_CODE)
+    admin = User.objects.create(username=f'{benchmarks.BENCH_PREFIX}_admin', is_superuser=True)
+    UserProfile.objects.create(user=admin, tenant=tenant)
+    today = timezone.localdate()
+    period = PresentationPeriod.objects.create(
+        name=f'{benchmarks.BENCH_PREFIX} login period', start_date=today - timedelta(days=1), end_date=today + timedelta(days=1)
+    )
+    period.tenants.add(tenant)
+    template = PipelineTemplate.objects.create(name=f'{benchmarks.BENCH_PREFIX} template', presentation_period=period)
+    PipelineStage.objects.bulk_create([
+        PipelineStage(template=template, title=f'Aşama {i}', order=i) for i in range(stages)
+    ])
+    password = make_password(PASSWORD)
+    created = User.objects.bulk_create([
+        User(username=f'{benchmarks.BENCH_PREFIX}_login_{i}', password=password) for i in range(users)
+    ])
+    UserProfile.objects.bulk_create([UserProfile(user=user, tenant=tenant) for user in created])
+    onboarding.invalidate_plans()
+    return list(User.objects.filter(username__startswith=f'{benchmarks.BENCH_PREFIX}_login_').order_by('id'))
+
+def measure_logins(users):
+    """Her kullanıcı için bir giriş; (süreler ms, sorgu sayıları)."""
+    timings, queries = [], []
+    for user in users:
+        client = APIClient()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.post(
+                '/api/devices/login_user/',
+                {'username': user.username, 'password': PASSWORD, 'tenant_code': TENANT_CODE},
+                format='json',
+                HTTP_X_SESSION_ID=f'{benchmarks.BENCH_PREFIX}-login'
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise CommandError(f"Login failed for {user.username}: {response.status_code} {response.content[:200]}")
+        queries.append(len(captured.captured_queries))
+        client.logout()
+    return timings, queries
+
+class Command(BaseCommand):
+    help = (
+        'Measures login_user latency and queries per login for first (cold) and repeat (warm) logins of synthetic users. '
+        'Runs in a separate bench_<NAME> database that is dropped afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Synthetic users, each logs in once per phase.')
+        parser.add_argument('--stages', type=int, default=8, help='Pipeline stages in the benchmark template.')
+        parser.add_argument(
+            '--real-hasher',
+            action='store_true',
+            help='Use the configured PASSWORD_HASHERS instead of MD5 (the timing is then dominated by hashing).'
+        )
+        parser.add_argument('--timeout', type=float, default=120, help='Seconds to wait for background onboarding.')
+
+    def report(self, label, timings, queries):
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{label:<5} p50 {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms  "
+            f"queries/login {statistics.mean(queries):5.1f}"
+        )
+
+    def handle(self, *args, **options):
+        hashers = {} if options['real_hasher'] else {'PASSWORD_HASHERS': FAST_HASHERS}
+        # Ayrı benchmark veritabanında; 'güncel' benchmark dönemi gerçek grupların
+        # dönem aramasına düşemez
+        with benchmarks.benchmark_database(), override_settings(ALLOWED_HOSTS=['testserver'], **hashers):
+            try:
+                users = seed_login_users(options['users'], options['stages'])
+                timings, queries = measure_logins(users)
+                self.report('cold', timings, queries)
+
+                # İkinci tur, arka plan kurulumu (takma ad + görevler) bittikten sonra;
+                # hata veren kurulumlar bir sonraki girişteki gibi yeniden kuyruğa alınır
+                deadline = time.monotonic() + options['timeout']
+                while True:
+                    pending = [user.id for user in users if not onboarding.is_ready(user.id)]
+                    if not pending:
+                        break
+                    if time.monotonic() > deadline:
+                        raise CommandError(f'Background onboarding did not finish in time ({len(pending)} users left).')
+                    time.sleep(1)
+                    for user_id in pending:
+                        onboarding.ensure_ready(user_id)
+                timings, queries = measure_logins(users)
+                self.report('warm', timings, queries)
+            finally:
+                # Arka plan yazıcısı veritabanı silinmeden boşaltılır
+                flush_activity_logs()
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from core.export_jobs import process_pending, POLL_SECONDS
+
+class Command(BaseCommand):
+    help = 'Processes queued export jobs (ExportJob). Use --loop to run as a dedicated worker.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the queue instead of exiting when it is empty.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep between polls in --loop mode.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending()
+            if processed:
+                self.stdout.write(f"Processed {processed} export job(s).")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'] or POLL_SECONDS)
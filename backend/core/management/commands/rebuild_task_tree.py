@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.counters import rebuild_counters
+from core.task_tree import rebuild_tree_paths
+
+class Command(BaseCommand):
+    help = 'Recomputes Task.tree_path / tree_depth (the parent_task hierarchy index) and the task counters and subtree rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows per bulk UPDATE.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = rebuild_tree_paths(batch_size=options['batch_size'])
+            recounted = rebuild_counters(batch_size=options['batch_size'])
+        self.stdout.write(f"Rebuilt hierarchy paths for {updated} task(s), counters for {recounted} task(s).")
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.15 on 2026-10-17 20:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_change_counter(apps, schema_editor):
+    ChangeCounter = apps.get_model('core', 'ChangeCounter')
+    ChangeCounter.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_alter_device_options_alter_pipelinestage_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('pruned_through', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='change_version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='taskassignment',
+            name='change_version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='taskattachment',
+            name='change_version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='taskdependency',
+            name='change_version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tasknode',
+            name='change_version',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(choices=[('task', 'Görev'), ('assignment', 'Görev Ataması'), ('node', 'Görev Koordinatı'), ('attachment', 'Görev Eki'), ('dependency', 'Bağlılık')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('task_id', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('reason', models.CharField(choices=[('deleted', 'Silindi'), ('archived', 'Arşivlendi')], default='deleted', max_length=20)),
+                ('change_version', models.BigIntegerField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.tenant')),
+            ],
+        ),
+        migrations.RunPython(create_change_counter, migrations.RunPython.noop),
+    ]
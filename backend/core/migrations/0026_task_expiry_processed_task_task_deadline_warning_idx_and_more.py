@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-17 20:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_changecounter_task_change_version_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='expiry_processed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'warning_sent', 'due_date'], name='task_deadline_warning_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'expiry_processed', 'due_date'], name='task_deadline_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-17 20:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_alter_activitylog_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_watermarks', to='core.presentationperiod')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_watermarks', to='core.tenant')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('period', 'tenant'), name='unique_export_watermark')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.15 on 2026-10-17 20:45
+
+from django.db import migrations, models
+
+
+def alias_number(alias, prefix):
+    suffix = alias[len(prefix):]
+    return int(suffix) if alias.startswith(prefix) and suffix.isdigit() else 0
+
+
+def seed_alias_sequences(apps, schema_editor):
+    """
+    count() tabanlı eski ayırıcı eşzamanlı girişlerde aynı takma adı verebiliyordu.
+    Tekrarlanan takma adlar (ilk kayıt korunur) önekin sonuna yeniden numaralanır,
+    ardından önek sayaçları en büyük numaradan başlatılır.
+    """
+    ResearchUserAlias = apps.get_model('core', 'ResearchUserAlias')
+    ResearchAliasSequence = apps.get_model('core', 'ResearchAliasSequence')
+
+    aliases = list(ResearchUserAlias.objects.order_by('id'))
+    last_values = {}
+    for row in aliases:
+        prefix = row.alias[:1]
+        last_values[prefix] = max(last_values.get(prefix, 0), alias_number(row.alias, prefix))
+
+    seen = set()
+    for row in aliases:
+        if row.alias in seen:
+            prefix = row.alias[:1]
+            last_values[prefix] += 1
+            row.alias = f"{prefix}{last_values[prefix]}"
+            row.save(update_fields=['alias'])
+        seen.add(row.alias)
+
+    for prefix in ('A', 'B'):
+        last_values.setdefault(prefix, 0)
+    ResearchAliasSequence.objects.bulk_create([
+        ResearchAliasSequence(prefix=prefix, last_value=last_value)
+        for prefix, last_value in last_values.items() if prefix
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_assignment_completion_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResearchAliasSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=4, unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_alias_sequences, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='researchuseralias',
+            name='alias',
+            field=models.CharField(max_length=10, unique=True),
+        ),
+    ]
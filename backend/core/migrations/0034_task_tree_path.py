@@ -0,0 +1,53 @@
+# Generated by Django 5.1.15 on 2026-10-17 20:48
+
+from django.db import migrations, models
+
+
+def fill_tree_paths(apps, schema_editor):
+    Task = apps.get_model('core', 'Task')
+    parents = dict(Task.objects.values_list('id', 'parent_task_id'))
+    children = {}
+    for task_id, parent_id in parents.items():
+        children.setdefault(parent_id if parent_id in parents else None, []).append(task_id)
+
+    paths = {}
+    def walk(roots):
+        stack = [(task_id, '/', 0) for task_id in roots]
+        while stack:
+            task_id, parent_path, depth = stack.pop()
+            if task_id in paths:
+                continue
+            paths[task_id] = (f"{parent_path}{task_id}/", depth)
+            stack.extend((child, paths[task_id][0], depth + 1) for child in children.get(task_id, []))
+
+    walk(children.get(None, []))
+    # Döngüdeki görevler köke ulaşmaz; en küçük id kök sayılarak döngü kırılır
+    while len(paths) < len(parents):
+        walk([min(parents.keys() - paths.keys())])
+
+    Task.objects.bulk_update(
+        [Task(id=task_id, tree_path=path, tree_depth=depth) for task_id, (path, depth) in paths.items()],
+        ['tree_path', 'tree_depth'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_research_alias_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='tree_depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='tree_path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.RunPython(fill_tree_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.1.15 on 2026-10-17 20:50
+
+from collections import defaultdict
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_task_counters(apps, schema_editor):
+    Task = apps.get_model('core', 'Task')
+    TaskAssignment = apps.get_model('core', 'TaskAssignment')
+    TaskAttachment = apps.get_model('core', 'TaskAttachment')
+    Comment = apps.get_model('core', 'Comment')
+
+    counts = defaultdict(lambda: defaultdict(int))
+    for row in TaskAssignment.objects.values('task_id').annotate(
+        assigned=Count('id'),
+        completed=Count('id', filter=Q(is_completed=True)),
+        failed=Count('id', filter=Q(is_failed=True))
+    ).order_by():
+        counts[row['task_id']].update(
+            assignment_count=row['assigned'], completed_count=row['completed'], failed_count=row['failed']
+        )
+    for model, field in ((Comment, 'comment_count'), (TaskAttachment, 'attachment_count')):
+        for task_id, total in model.objects.values_list('task_id').annotate(total=Count('id')).order_by():
+            counts[task_id][field] = total
+
+    paths = dict(Task.objects.values_list('id', 'tree_path'))
+    for task_id, path in paths.items():
+        own = counts.get(task_id, {})
+        ancestors = [int(part) for part in path.strip('/').split('/') if part] or [task_id]
+        for ancestor_id in ancestors:
+            counts[ancestor_id]['subtree_assignment_count'] += own.get('assignment_count', 0)
+            counts[ancestor_id]['subtree_completed_count'] += own.get('completed_count', 0)
+
+    fields = [
+        'assignment_count', 'completed_count', 'failed_count', 'comment_count', 'attachment_count',
+        'subtree_assignment_count', 'subtree_completed_count'
+    ]
+    Task.objects.bulk_update(
+        [Task(id=task_id, **{field: values.get(field, 0) for field in fields}) for task_id, values in counts.items() if task_id in paths],
+        fields,
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_task_tree_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='assignment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='attachment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='failed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtree_assignment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtree_completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-17 20:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_dependency_tenants(apps, schema_editor):
+    TaskDependency = apps.get_model('core', 'TaskDependency')
+    UserProfile = apps.get_model('core', 'UserProfile')
+    profile_tenants = dict(UserProfile.objects.values_list('user_id', 'tenant_id'))
+    rows = []
+    for dependency_id, task_tenant_id, creator_id in TaskDependency.objects.values_list(
+        'id', 'source_task__tenant_id', 'source_task__created_by_id'
+    ):
+        tenant_id = task_tenant_id or profile_tenants.get(creator_id)
+        if tenant_id:
+            rows.append(TaskDependency(id=dependency_id, tenant_id=tenant_id))
+    TaskDependency.objects.bulk_update(rows, ['tenant'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskdependency',
+            name='tenant',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='dependencies', to='core.tenant'),
+        ),
+        migrations.RunPython(fill_dependency_tenants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+# next_change_version / current_change_cursor için PostgreSQL dizisi ve
+# fonksiyonları (core/models.py). (7001, 1) advisory kilidi yalnızca sürüm
+# alma anını imleç okumasından ayırır; commit'e kadar tutulmaz.
+
+CREATE_SEQUENCE_SQL = "CREATE SEQUENCE IF NOT EXISTS core_change_version_seq AS bigint START WITH %(start)s"
+
+NEXT_VERSION_SQL = """
+CREATE OR REPLACE FUNCTION core_next_change_version() RETURNS bigint AS $$
+DECLARE
+    version bigint;
+BEGIN
+    PERFORM pg_advisory_lock_shared(7001, 1);
+    BEGIN
+        version := nextval('core_change_version_seq');
+        PERFORM pg_advisory_xact_lock(version);
+    EXCEPTION WHEN OTHERS THEN
+        PERFORM pg_advisory_unlock_shared(7001, 1);
+        RAISE;
+    END;
+    PERFORM pg_advisory_unlock_shared(7001, 1);
+    RETURN version;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+CURSOR_SQL = """
+CREATE OR REPLACE FUNCTION core_change_cursor() RETURNS bigint AS $$
+DECLARE
+    latest bigint;
+    pending bigint;
+BEGIN
+    PERFORM pg_advisory_lock(7001, 1);
+    BEGIN
+        SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END INTO latest FROM core_change_version_seq;
+        SELECT min((classid::bigint << 32) | objid::bigint) INTO pending FROM pg_locks
+        WHERE locktype = 'advisory' AND objsubid = 1 AND granted
+            AND database = (SELECT oid FROM pg_database WHERE datname = current_database());
+    EXCEPTION WHEN OTHERS THEN
+        PERFORM pg_advisory_unlock(7001, 1);
+        RAISE;
+    END;
+    PERFORM pg_advisory_unlock(7001, 1);
+    RETURN LEAST(latest, pending - 1);
+END;
+$$ LANGUAGE plpgsql
+"""
+
+DROP_SQL = [
+    "DROP FUNCTION IF EXISTS core_change_cursor()",
+    "DROP FUNCTION IF EXISTS core_next_change_version()",
+    "DROP SEQUENCE IF EXISTS core_change_version_seq",
+]
+
+def create_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    ChangeCounter = apps.get_model('core', 'ChangeCounter')
+    counter, _ = ChangeCounter.objects.get_or_create(pk=1)
+    schema_editor.execute(CREATE_SEQUENCE_SQL % {'start': counter.value + 1})
+    schema_editor.execute(NEXT_VERSION_SQL)
+    schema_editor.execute(CURSOR_SQL)
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    ChangeCounter = apps.get_model('core', 'ChangeCounter')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM core_change_version_seq")
+        value = cursor.fetchone()[0]
+    ChangeCounter.objects.filter(pk=1).update(value=value)
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_exportjob_claim_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
@@ -1,7 +1,7 @@
-from django.db import models
+from django.db import connection, models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -87,8 +87,103 @@ class Device(models.Model):
     def __str__(self):
         return f"{self.name} ({self.tenant.name})"
 
+# --- DEĞİŞİKLİK SÜRÜMÜ (DELTA SENKRONİZASYONU) ---
+class ChangeCounter(models.Model):
+    """
+    Tek satırlık global sayaç. Sürümlenen her kayıt yazımında bir artar;
+    istemcilerin '?since=' imleci bu değerdir. PostgreSQL'de değer bu satırda
+    değil core_change_version_seq dizisinde tutulur; satır yalnızca
+    pruned_through için kullanılır.
+    """
+    value = models.BigIntegerField(default=0)
+    pruned_through = models.BigIntegerField(default=0)
+
+# PostgreSQL'de sürümler bir diziden (nextval) alınır; yazımlar ortak bir satır
+# kilidinde beklemez. Sürümü alan transaction o sürüm numarasıyla bir advisory
+# kilit tutar (commit/rollback'te bırakılır). İmleç, hâlâ açık transaction'lardaki
+# en küçük sürümün bir altıdır; böylece sonradan commit edilen küçük bir sürüm
+# okuyucu tarafından atlanmaz. Fonksiyonlar 0038 migration'ında tanımlıdır.
+# Diğer veritabanlarında (SQLite, tek yazıcı) sayaç satırı kullanılır.
+
+def next_change_version():
+    """
+    Bir sonraki sürümü döndürür. Çağıranın transaction'ı içinde çalışmalıdır;
+    sürüm, transaction bitene kadar imlecin önünde kalır.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT core_next_change_version()")
+            return cursor.fetchone()[0]
+    counter = ChangeCounter.objects.select_for_update().get(pk=1)
+    counter.value += 1
+    counter.save(update_fields=['value'])
+    return counter.value
+
+def current_change_cursor():
+    """Okuyuculara verilebilecek en büyük sürüm: bunun altındaki her sürüm commit edilmiş ya da geri alınmıştır."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT core_change_cursor()")
+            return cursor.fetchone()[0]
+    return ChangeCounter.objects.values_list('value', flat=True).get(pk=1)
+
+class VersionedModel(models.Model):
+    change_version = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            self.change_version = next_change_version()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'change_version'}
+            super().save(*args, **kwargs)
+
+class SyncTombstone(models.Model):
+    """Silinen/arşivlenen kayıtların iz kaydı; delta uç noktası bunları döndürür."""
+    MODEL_CHOICES = [
+        ('task', 'Görev'),
+        ('assignment', 'Görev Ataması'),
+        ('node', 'Görev Koordinatı'),
+        ('attachment', 'Görev Eki'),
+        ('dependency', 'Bağlılık'),
+    ]
+    REASON_CHOICES = [('deleted', 'Silindi'), ('archived', 'Arşivlendi')]
+
+    model_name = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    task_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    user_id = models.IntegerField(null=True, blank=True)
+    tenant = models.ForeignKey('Tenant', on_delete=models.CASCADE, null=True, blank=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default='deleted')
+    change_version = models.BigIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+def record_tombstone(model_name, object_id, task_id=None, user_id=None, tenant_id=None, reason='deleted'):
+    with transaction.atomic():
+        return SyncTombstone.objects.create(
+            model_name=model_name,
+            object_id=object_id,
+            task_id=task_id,
+            user_id=user_id,
+            tenant_id=tenant_id,
+            reason=reason,
+            change_version=next_change_version()
+        )
+
+def record_task_tombstone(task, user_ids, reason='deleted'):
+    """
+    Görev iz kaydı; görevi görebilen her kullanıcı için (user_id ile) bir
+    satır yazılır, delta yalnızca bu kitleye döner.
+    """
+    tenant_id = task_tombstone_tenant_id(task)
+    for user_id in sorted({user_id for user_id in user_ids if user_id}):
+        record_tombstone('task', task.id, task_id=task.id, user_id=user_id, tenant_id=tenant_id, reason=reason)
+
 # --- GÖREV ---
-class Task(models.Model):
+class Task(VersionedModel):
     STATUS_CHOICES = [('active', 'Aktif'), ('completed', 'Tamamlandı')]
     PRIORITY_CHOICES = [('low', 'Az'), ('normal', 'Normal'), ('urgent', 'Acil')]
 
@@ -101,18 +196,61 @@ class Task(models.Model):
     priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='normal')
     due_date = models.DateTimeField(null=True, blank=True)
     parent_task = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='subtasks')
+    # Hiyerarşi indeksi (core/task_tree.py): kökten göreve id yolu, ör. '/3/17/42/'
+    tree_path = models.CharField(max_length=1000, default='', blank=True, db_index=True, editable=False)
+    tree_depth = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     warning_sent = models.BooleanField(default=False)
+    expiry_processed = models.BooleanField(default=False)
 
     # --- PIPELINE FIELDS ---
     is_pipeline_task = models.BooleanField(default=False, verbose_name="Pipeline Görevi mi?")
     pipeline_stage = models.ForeignKey('PipelineStage', on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
 
+    # --- SAYAÇLAR (core/counters.py tarafından F-ifadeleriyle güncellenir) ---
+    assignment_count = models.PositiveIntegerField(default=0, editable=False)
+    completed_count = models.PositiveIntegerField(default=0, editable=False)
+    failed_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    attachment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Görev ve tüm alt görevlerinin toplamları (alt ağaç tamamlanma oranı için)
+    subtree_assignment_count = models.PositiveIntegerField(default=0, editable=False)
+    subtree_completed_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Süre motoru (core/deadlines.py) sıradaki uyarı/bitiş anını bu indekslerden okur
+            models.Index(fields=['status', 'warning_sent', 'due_date'], name='task_deadline_warning_idx'),
+            models.Index(fields=['status', 'expiry_processed', 'due_date'], name='task_deadline_expiry_idx'),
+        ]
+
+    # Sayaç ve hiyerarşi alanları yalnızca UPDATE ile yazılır (core/counters.py,
+    # core/task_tree.py); bellekteki eski bir örneğin kaydı onları geri almaz
+    DERIVED_FIELDS = frozenset({
+        'assignment_count', 'completed_count', 'failed_count', 'comment_count', 'attachment_count',
+        'subtree_assignment_count', 'subtree_completed_count', 'tree_path', 'tree_depth',
+    })
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in self.DERIVED_FIELDS and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def subtree_completion(self):
+        if not self.subtree_assignment_count:
+            return 0.0
+        return round(self.subtree_completed_count / self.subtree_assignment_count, 4)
+
     def __str__(self):
         return self.title
 
 # --- GÖREV EKİ (DOSYA) ---
-class TaskAttachment(models.Model):
+class TaskAttachment(VersionedModel):
     TYPE_CHOICES = [('instruction', 'Görev Dosyası'), ('delivery', 'Teslim Dosyası')]
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachments')
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -121,7 +259,7 @@ class TaskAttachment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 # --- GÖREV ATAMASI (KİM YAPIYOR?) ---
-class TaskAssignment(models.Model):
+class TaskAssignment(VersionedModel):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="assignments")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="task_assignments")
     is_completed = models.BooleanField(default=False)
@@ -129,11 +267,17 @@ class TaskAssignment(models.Model):
     is_read = models.BooleanField(default=False)
     is_failed = models.BooleanField(default=False) 
 
+    class Meta:
+        indexes = [
+            # /api/users/stats/ günlük tamamlanma özeti
+            models.Index(fields=['user', 'is_completed', 'completed_at'], name='assignment_completion_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} -> {self.task.title}"
 
 # --- GÖREV KOORDİNATI (KİŞİSEL UZAY) ---
-class TaskNode(models.Model):
+class TaskNode(VersionedModel):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='nodes')
     user = models.ForeignKey(User, on_delete=models.CASCADE) 
     position_x = models.FloatField(default=0)
@@ -144,9 +288,11 @@ class TaskNode(models.Model):
         unique_together = ('task', 'user')
 
 # --- BAĞLILIKLAR ---
-class TaskDependency(models.Model):
+class TaskDependency(VersionedModel):
     source_task = models.ForeignKey(Task, related_name='next_tasks', on_delete=models.CASCADE)
     target_task = models.ForeignKey(Task, related_name='prev_tasks', on_delete=models.CASCADE)
+    # Kaynak görevin grubu (core/dependency_index.py kaydederken doldurur)
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, null=True, blank=True, related_name='dependencies', editable=False)
 
 # --- BİLDİRİMLER ---
 class Notification(models.Model):
@@ -206,20 +352,45 @@ class ActivityLog(models.Model):
     session_id = models.CharField(max_length=255)
     event_type = models.CharField(max_length=50, choices=EVENT_CHOICES)
     metadata = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # auto_now_add değil: tamponlu yazımda olay anı, yazım anıyla aynı değildir
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         user_str = self.user.username if self.user else "Anonymous"
         return f"{user_str} - {self.event_type} ({self.created_at})"
 
+class InteractionBatch(models.Model):
+    """Toplu olay gönderimlerinin sıra numarası; tekrar gönderilen paketler yok sayılır."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='interaction_batches')
+    session_id = models.CharField(max_length=255)
+    seq = models.BigIntegerField()
+    event_count = models.IntegerField(default=0)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'session_id', 'seq'], name='unique_interaction_batch_seq'),
+        ]
+
 class ResearchUserAlias(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='research_alias')
-    alias = models.CharField(max_length=10)  # e.g. 'A1', 'B2'
+    alias = models.CharField(max_length=10, unique=True)  # e.g. 'A1', 'B2'
     anonymous_id = models.CharField(max_length=16)
 
     def __str__(self):
         return f"{self.user.username} -> {self.alias}"
 
+class ResearchAliasSequence(models.Model):
+    """
+    Önek başına (A: Spiral, B: Kanban) son verilen takma ad numarası.
+    Satır kilitlenerek artırılır (bkz. services.reserve_alias_numbers).
+    """
+    prefix = models.CharField(max_length=4, unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.prefix}{self.last_value}"
+
 class PresentationPeriod(models.Model):
     name = models.CharField(max_length=100, verbose_name="Dönem Adı")
     start_date = models.DateField(verbose_name="Başlangıç Tarihi")
@@ -233,6 +404,71 @@ class PresentationPeriod(models.Model):
     def __str__(self):
         return f"{self.name} ({self.start_date} - {self.end_date})"
 
+class ExportWatermark(models.Model):
+    """
+    auto_export_logs için dönem/grup bazında en son dışa aktarılan ActivityLog id'si.
+    Bir dönemin grup üyeliği bu kayıtlardaki gruplarla aynı değilse dışa aktarım
+    baştan oluşturulur.
+    """
+    period = models.ForeignKey(PresentationPeriod, on_delete=models.CASCADE, related_name='export_watermarks')
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='export_watermarks')
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'tenant'], name='unique_export_watermark'),
+        ]
+
+class ExportJob(models.Model):
+    """
+    Arka planda çalışan dışa aktarım işi (core/export_jobs.py). Aynı anahtarla
+    kuyrukta bekleyen en fazla bir iş olabilir; yeni istekler ona eklenir.
+    """
+    KIND_CHOICES = [
+        ('user_session', 'User Session Export'),
+        ('auto_export', 'Full Research Export'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    dedupe_key = models.CharField(max_length=100)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='export_jobs')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='requested_export_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    progress = models.FloatField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    request_count = models.PositiveIntegerField(default=1)
+    attempts = models.PositiveIntegerField(default=0)
+    # Çalıştıran worker'ın kiralama anahtarı; iş yeniden kuyruğa alınınca değişir
+    claim_token = models.CharField(max_length=32, blank=True, editable=False)
+    result_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status='queued'),
+                name='unique_queued_export_job'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='export_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
 # --- SURVEY (ANKET) ---
 class SurveyQuestion(models.Model):
     text = models.CharField(max_length=500, verbose_name="Soru Metni")
@@ -305,49 +541,31 @@ class PipelineStage(models.Model):
         return f"{self.template.name} - {self.title}"
 
 # --- SIGNALS ---
-@receiver(post_save, sender=UserProfile)
-def pipeline_onboarding_signal(sender, instance, **kwargs):
-    """
-    Kullanıcı onaylandığında (is_active) ve tenant atandığında 
-    Pipeline görevlerini otomatik oluşturur.
-    """
-    if instance.user.is_active and instance.tenant:
-        # Zaten görevleri var mı?
-        if Task.objects.filter(assignments__user=instance.user, is_pipeline_task=True).exists():
-            return
-
-        # Bu tenant'ın dahil olduğu aktif bir dönem bul
-        period = instance.tenant.presentation_periods.filter(
-            start_date__lte=timezone.now().date(),
-            end_date__gte=timezone.now().date()
-        ).first()
-        
-        if not period:
-            period = instance.tenant.presentation_periods.order_by('-start_date').first()
-
-        if period:
-            template = period.pipeline.first()
-            if template:
-                # Görevleri oluşturacak bir "Admin" bul (Şirket içindeki en yetkili kişi)
-                creator = User.objects.filter(profile__tenant=instance.tenant, is_superuser=True).first()
-                if not creator:
-                    creator = User.objects.filter(profile__tenant=instance.tenant, profile__rank=10).first()
-                if not creator:
-                    creator = User.objects.filter(is_superuser=True).first()
-
-                for stage in template.stages.all():
-                    task = Task.objects.create(
-                        title=stage.title,
-                        description=stage.description,
-                        created_by=creator,
-                        tenant=instance.tenant,
-                        is_pipeline_task=True,
-                        pipeline_stage=stage
-                    )
-                    # TaskAssignment modelini kullanıyoruz
-                    # TaskAssignment.objects.create uses task and user
-                    from .models import TaskAssignment
-                    TaskAssignment.objects.create(task=task, user=instance.user)
+def task_tombstone_tenant_id(task):
+    if task.tenant_id:
+        return task.tenant_id
+    return UserProfile.objects.filter(user_id=task.created_by_id).values_list('tenant_id', flat=True).first()
+
+@receiver(post_delete, sender=Task)
+def task_tombstone_signal(sender, instance, **kwargs):
+    # Atananlar kendi atama iz kayıtlarıyla bilgilenir (atamalar görevden önce silinir)
+    record_task_tombstone(instance, [instance.created_by_id])
+
+@receiver(post_delete, sender=TaskAssignment)
+def assignment_tombstone_signal(sender, instance, **kwargs):
+    record_tombstone('assignment', instance.id, task_id=instance.task_id, user_id=instance.user_id)
+
+@receiver(post_delete, sender=TaskNode)
+def node_tombstone_signal(sender, instance, **kwargs):
+    record_tombstone('node', instance.id, task_id=instance.task_id, user_id=instance.user_id)
+
+@receiver(post_delete, sender=TaskAttachment)
+def attachment_tombstone_signal(sender, instance, **kwargs):
+    record_tombstone('attachment', instance.id, task_id=instance.task_id)
+
+@receiver(post_delete, sender=TaskDependency)
+def dependency_tombstone_signal(sender, instance, **kwargs):
+    record_tombstone('dependency', instance.id, task_id=instance.source_task_id)
 
 class PipelineQualitativeQuestion(models.Model):
     stage = models.ForeignKey(PipelineStage, on_delete=models.CASCADE, related_name='qualitative_questions')
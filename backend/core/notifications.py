@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from .models import Notification, UserProfile
+from . import etags
+from . import push
+
+# Tüm bildirim üretimi buradan geçer: alıcıların tercihleri tek sorguda
+# okunur, bildirimler tek bulk_create ile yazılır. defer=True ise iş,
+# transaction commit edildikten sonra arka plan thread'inde yapılır.
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='notifications')
+
+def _deferred_enabled():
+    return getattr(settings, 'NOTIFICATIONS_DEFERRED', True)
+
+def pending(user_ids, setting_key=None, **fields):
+    """
+    Aynı bildirimi birden fazla kullanıcıya hazırlar.
+    setting_key: kullanıcının notification_settings içindeki tercih anahtarı
+    (None ise tercih kontrol edilmez).
+    """
+    return [(user_id, setting_key, fields) for user_id in dict.fromkeys(user_ids) if user_id is not None]
+
+def deliver(items):
+    """Hazırlanan bildirimleri tercihlere göre süzer ve toplu yazar."""
+    items = list(items)
+    if not items:
+        return []
+
+    user_ids = {user_id for user_id, setting_key, _ in items if setting_key}
+    preferences = dict(
+        UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'notification_settings')
+    ) if user_ids else {}
+
+    rows = []
+    for user_id, setting_key, fields in items:
+        if setting_key:
+            user_settings = preferences.get(user_id)
+            if user_settings and not user_settings.get(setting_key, True):
+                continue
+        rows.append(Notification(user_id=user_id, **fields))
+
+    notifications = Notification.objects.bulk_create(rows)
+    etags.bump('notifications', *{n.user_id for n in notifications})
+    for n in notifications:
+        push.publish('notification.created', {
+            'notification_id': n.id,
+            'task_id': n.task_id,
+            'notification_type': n.notification_type
+        }, user_ids=[n.user_id])
+    return notifications
+
+def _deliver_in_background(items):
+    try:
+        deliver(items)
+    except Exception as e:
+        print(f"Notification fan-out error: {e}")
+    finally:
+        connection.close()
+
+def dispatch(items, defer=True):
+    """
+    Bildirimleri gönderir. defer=True ise commit sonrası arka planda
+    çalışır ve isteği bekletmez.
+    """
+    items = list(items)
+    if not items:
+        return
+    if defer and _deferred_enabled():
+        transaction.on_commit(lambda: _executor.submit(_deliver_in_background, items))
+    else:
+        deliver(items)
+
+def notify(user_ids, setting_key=None, defer=True, **fields):
+    dispatch(pending(user_ids, setting_key, **fields), defer=defer)
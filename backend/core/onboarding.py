@@ -0,0 +1,268 @@
+import os
+import threading
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import (
+    PipelineStage, PipelineTemplate, PresentationPeriod, Task, TaskAssignment,
+    Tenant, UserProfile, next_change_version
+)
+from . import etags
+from . import push
+from . import task_tree
+from .services import get_user_alias
+
+# Pipeline (sunum takvimi) görevlerinin kullanıcıya kurulması.
+# Kurulum her profil kaydında değil, yalnızca geçişte çalışır: kullanıcı aktif
+# hale geldiğinde (tenant'ı varsa) ya da aktif kullanıcıya tenant atandığında.
+# Tenant'ın planı (dönem, taslak aşamaları, görevleri oluşturan kişi) önbellekte
+# tutulur; taslak/aşama/dönem değiştiğinde plan damgası artar ve plan yeniden
+# hesaplanır. Görevler ve atamalar iki bulk_create ile yazılır. Kullanıcı satırı
+# kilitlendiği için aynı anda gelen iki kurulum aynı görevleri iki kez oluşturmaz.
+#
+# Girişte kurulum yapılmaz: login yalnızca kullanıcı hazır mı diye önbelleğe
+# bakar, değilse kurulumu (takma ad + görevler) arka plan worker'ına bırakır.
+# Oluşan görevler 'task.created' push'uyla istemciye bildirilir.
+
+PLAN_CACHE_SECONDS = 300
+READY_CACHE_SECONDS = 24 * 60 * 60
+
+def _plan_stamp():
+    return etags.get_stamp('pipeline_plan', 'all')
+
+def _plan_creator_id(tenant_id):
+    # Görevleri oluşturacak bir "Admin" bul (Şirket içindeki en yetkili kişi)
+    for queryset in (
+        User.objects.filter(profile__tenant_id=tenant_id, is_superuser=True),
+        User.objects.filter(profile__tenant_id=tenant_id, profile__rank=10),
+        User.objects.filter(is_superuser=True),
+    ):
+        creator_id = queryset.order_by('id').values_list('id', flat=True).first()
+        if creator_id:
+            return creator_id
+    return None
+
+def _tenant_period_id(tenant_id, today):
+    # Tenant'ın aktif dönemi, yoksa son dönemi, o da yoksa en son dönem
+    periods = PresentationPeriod.objects.filter(tenants__id=tenant_id)
+    for queryset in (
+        periods.filter(start_date__lte=today, end_date__gte=today).order_by('start_date', 'id'),
+        periods.order_by('-start_date', '-id'),
+        PresentationPeriod.objects.order_by('-start_date', '-id'),
+    ):
+        period_id = queryset.values_list('id', flat=True).first()
+        if period_id:
+            return period_id
+    return None
+
+def compute_period_plan(period_id):
+    """Dönemin ilk taslağı ve sıralı aşamaları; taslak yoksa None."""
+    template = PipelineTemplate.objects.filter(presentation_period_id=period_id).order_by('id').first()
+    if not template:
+        return None
+    return {
+        'period_id': period_id,
+        'template_id': template.id,
+        'stages': list(PipelineStage.objects.filter(template=template).order_by('order', 'id').values_list(
+            'id', 'title', 'description'
+        ))
+    }
+
+def period_plan(period_id):
+    key = f"onboarding:period:{period_id}:{_plan_stamp()}"
+    plan = cache.get(key)
+    if plan is None:
+        # Plan yoksa da önbelleğe alınır; her kurulum denemesi sorgu yapmasın
+        plan = compute_period_plan(period_id) or {}
+        cache.set(key, plan, timeout=PLAN_CACHE_SECONDS)
+    return plan or None
+
+def tenant_plan(tenant_id):
+    """Tenant'a uygulanacak dönem planı ve görevleri oluşturacak kişi; yoksa None."""
+    today = timezone.localdate()
+    key = f"onboarding:tenant:{tenant_id}:{today.isoformat()}:{_plan_stamp()}"
+    target = cache.get(key)
+    if target is None:
+        target = (_tenant_period_id(tenant_id, today), _plan_creator_id(tenant_id))
+        cache.set(key, target, timeout=PLAN_CACHE_SECONDS)
+
+    period_id, creator_id = target
+    if not period_id or not creator_id:
+        return None
+    plan = period_plan(period_id)
+    if not plan:
+        return None
+    return {**plan, 'creator_id': creator_id}
+
+def precompute_plans():
+    """Tüm tenant planlarını önbelleğe alır (ör. dönem değişiminden sonra)."""
+    return sum(1 for tenant_id in Tenant.objects.values_list('id', flat=True) if tenant_plan(tenant_id))
+
+def has_pipeline(user_id):
+    return TaskAssignment.objects.filter(user_id=user_id, task__is_pipeline_task=True).exists()
+
+def provision_pipeline(user_id, tenant_id):
+    """
+    Kullanıcının pipeline görevlerini oluşturur. Görevleri zaten varsa (ya da
+    tenant'ın planı yoksa) hiçbir şey yapmaz; oluşturulan görevleri döndürür.
+    """
+    plan = tenant_plan(tenant_id)
+    if not plan or not plan['stages']:
+        return []
+
+    with transaction.atomic():
+        # Aynı kullanıcı için eşzamanlı kurulumlar burada sıraya girer
+        if not User.objects.select_for_update().filter(id=user_id).exists():
+            return []
+        if has_pipeline(user_id):
+            return []
+
+        version = next_change_version()
+        tasks = Task.objects.bulk_create([
+            Task(
+                title=title,
+                description=description,
+                created_by_id=plan['creator_id'],
+                tenant_id=tenant_id,
+                status='active',
+                is_pipeline_task=True,
+                pipeline_stage_id=stage_id,
+                assignment_count=1,
+                subtree_assignment_count=1,
+                change_version=version
+            )
+            for stage_id, title, description in plan['stages']
+        ])
+        task_tree.assign_root_paths([task.id for task in tasks])
+        TaskAssignment.objects.bulk_create([
+            TaskAssignment(task=task, user_id=user_id, change_version=version)
+            for task in tasks
+        ])
+
+        # bulk_create sinyal tetiklemez; sayaçlar yukarıda verildi, ETag ve push burada yapılır
+        etags.bump('tasks', user_id, plan['creator_id'])
+        for task in tasks:
+            push.publish('task.created', {'task_id': task.id}, tenant_id=tenant_id)
+    return tasks
+
+def invalidate_plans():
+    etags.bump('pipeline_plan', 'all')
+
+def _ready_key(user_id):
+    # Plan damgası anahtarda; taslak değişince kullanıcılar bir kez yeniden denetlenir
+    return f"onboarding:ready:{user_id}:{_plan_stamp()}"
+
+def setup_user(user_id):
+    """Kullanıcının araştırma takma adını ve pipeline görevlerini hazırlar (idempotent)."""
+    user = User.objects.select_related('profile').filter(id=user_id).first()
+    profile = getattr(user, 'profile', None) if user else None
+    if profile is None:
+        return
+    get_user_alias(user)
+    if user.is_active and profile.tenant_id:
+        provision_pipeline(user.id, profile.tenant_id)
+    cache.set(_ready_key(user_id), True, timeout=READY_CACHE_SECONDS)
+
+def is_ready(user_id):
+    return bool(cache.get(_ready_key(user_id)))
+
+def ensure_ready(user_id):
+    """
+    Giriş sonrası çağrılır: kullanıcı hazır değilse kurulumu commit sonrasında
+    worker'a bırakır. Hazır kullanıcı için yalnızca bir cache okuması yapar.
+    """
+    if is_ready(user_id):
+        return False
+    transaction.on_commit(lambda: worker.submit(user_id))
+    return True
+
+class OnboardingWorker:
+    """Kurulumları istek dışında yapan süreç içi thread; aynı kullanıcı kuyrukta bir kez tutulur."""
+    def __init__(self):
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def enabled(self):
+        return getattr(settings, 'ONBOARDING_IN_PROCESS', True)
+
+    def submit(self, user_id):
+        if not self.enabled():
+            setup_user(user_id)
+            return
+        with self._lock:
+            self._pending.add(user_id)
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def _ensure_thread(self):
+        # fork sonrası (ör. gunicorn) thread çocuk sürece taşınmaz, yeniden başlatılır
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='onboarding-worker', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                pending, self._pending = self._pending, set()
+            for user_id in pending:
+                try:
+                    setup_user(user_id)
+                except Exception as e:
+                    print(f"Onboarding error (user {user_id}): {e}")
+            connection.close()
+
+worker = OnboardingWorker()
+
+# --- SIGNALS ---
+@receiver(post_init, sender=User)
+def user_onboarding_snapshot(sender, instance, **kwargs):
+    # Ertelenmiş alanlara dokunmamak için __dict__ okunur
+    instance._onboarding_was_active = instance.__dict__.get('is_active')
+
+@receiver(post_init, sender=UserProfile)
+def profile_onboarding_snapshot(sender, instance, **kwargs):
+    instance._onboarding_tenant_id = instance.__dict__.get('tenant_id')
+
+@receiver(post_save, sender=User)
+def user_activation_onboarding(sender, instance, created, **kwargs):
+    was_active = instance._onboarding_was_active
+    instance._onboarding_was_active = instance.is_active
+    if created or was_active or not instance.is_active:
+        return
+    tenant_id = UserProfile.objects.filter(user_id=instance.id).values_list('tenant_id', flat=True).first()
+    if tenant_id:
+        provision_pipeline(instance.id, tenant_id)
+
+@receiver(post_save, sender=UserProfile)
+def profile_tenant_onboarding(sender, instance, **kwargs):
+    """Kullanıcı onaylandığında (is_active) ve tenant atandığında pipeline görevlerini oluşturur."""
+    previous = instance._onboarding_tenant_id
+    instance._onboarding_tenant_id = instance.tenant_id
+    if not instance.tenant_id or instance.tenant_id == previous:
+        return
+    if instance.user.is_active:
+        provision_pipeline(instance.user_id, instance.tenant_id)
+
+@receiver([post_save, post_delete], sender=PresentationPeriod)
+@receiver([post_save, post_delete], sender=PipelineTemplate)
+@receiver([post_save, post_delete], sender=PipelineStage)
+@receiver(post_delete, sender=User)
+def pipeline_plan_signal(sender, instance, **kwargs):
+    invalidate_plans()
+
+@receiver(m2m_changed, sender=PresentationPeriod.tenants.through)
+def period_tenants_plan_signal(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_plans()
@@ -0,0 +1,302 @@
+import atexit
+import copy
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, DateTimeField, Value, When
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .models import UserProfile
+from . import etags
+from . import push
+
+# Çevrimiçi durum servisi. Heartbeat'ler veritabanına değil presence
+# deposuna yazılır; aynı kullanıcıdan HEARTBEAT_COALESCE_SECONDS içinde gelen
+# heartbeat'ler birleştirilir. last_activity veritabanına FLUSH_INTERVAL_SECONDS
+# aralıkla toplu (tek UPDATE) yazılır. Depo varsayılan olarak süreç içidir;
+# birden fazla worker ile PRESENCE_BACKEND = 'core.presence.CachePresenceBackend'
+# (ortak bir CACHES backend'iyle) kullanılmalıdır.
+#
+# Grup (tenant) anlık görüntüsü her kullanıcının etkin durumunu (30 sn pencere
+# dahil) hesaplar, öncekiyle karşılaştırır ve değişenlere artan bir sürüm verir.
+# İstemci '?since=<cursor>' ile yalnızca değişen durumları alır. Anlık
+# görüntü güncellemesi grup başına sıraya girer (süreç içi kilit ya da cache
+# üzerinde add ile alınan kilit); her güncelleme durumun kopyası üzerinde
+# yapılır, böylece iki istek aynı sürüm numarasını dağıtamaz.
+
+ONLINE_WINDOW_SECONDS = 30
+HEARTBEAT_COALESCE_SECONDS = 5
+FLUSH_INTERVAL_SECONDS = 60
+MEMBERS_CACHE_SECONDS = 60
+RECORD_TTL_SECONDS = 24 * 60 * 60
+FLUSH_BATCH_SIZE = 500
+TENANT_LOCK_SECONDS = 5
+TENANT_LOCK_ATTEMPTS = 50
+
+class LocalPresenceBackend:
+    """Süreç içi depo: user_id -> (status, last_seen epoch)."""
+    def __init__(self):
+        self._users = {}
+        self._tenants = {}
+        self._tenant_locks = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, user_ids):
+        with self._lock:
+            return {user_id: self._users[user_id] for user_id in user_ids if user_id in self._users}
+
+    def set(self, user_id, record):
+        with self._lock:
+            self._users[user_id] = record
+
+    def get_tenant_state(self, tenant_id):
+        with self._lock:
+            return self._tenants.get(tenant_id)
+
+    def set_tenant_state(self, tenant_id, state):
+        with self._lock:
+            self._tenants[tenant_id] = state
+
+    def update_tenant_state(self, tenant_id, apply):
+        """
+        apply(durumun kopyası ya da None) -> (yeni durum ya da None, sonuç).
+        Grup kilidi altında çalışır; (güncel durum, sonuç) döndürür.
+        """
+        with self._lock:
+            tenant_lock = self._tenant_locks.setdefault(tenant_id, threading.Lock())
+        with tenant_lock:
+            state = copy.deepcopy(self.get_tenant_state(tenant_id))
+            new_state, result = apply(state)
+            if new_state is not None:
+                self.set_tenant_state(tenant_id, new_state)
+                state = new_state
+            return state, result
+
+class CachePresenceBackend:
+    """Django cache üzerinde ortak depo (Redis/Memcached ile tüm worker'lar aynı durumu görür)."""
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, 'PRESENCE_CACHE_ALIAS', 'default')]
+
+    def get_many(self, user_ids):
+        keys = {f"presence:user:{user_id}": user_id for user_id in user_ids}
+        return {keys[key]: tuple(record) for key, record in self.cache.get_many(list(keys)).items()}
+
+    def set(self, user_id, record):
+        self.cache.set(f"presence:user:{user_id}", record, timeout=RECORD_TTL_SECONDS)
+
+    def get_tenant_state(self, tenant_id):
+        return self.cache.get(f"presence:tenant:{tenant_id}")
+
+    def set_tenant_state(self, tenant_id, state):
+        self.cache.set(f"presence:tenant:{tenant_id}", state, timeout=RECORD_TTL_SECONDS)
+
+    def update_tenant_state(self, tenant_id, apply):
+        """
+        LocalPresenceBackend.update_tenant_state ile aynı; kilit cache.add ile
+        alınır (tüm worker'lar arasında). Kilit alınamazsa sonuç hesaplanır
+        ama kaydedilmez; sonuç None döner ve bir sonraki istek yeniden dener.
+        """
+        lock_key = f"presence:tenant-lock:{tenant_id}"
+        token = uuid.uuid4().hex
+        for _ in range(TENANT_LOCK_ATTEMPTS):
+            if self.cache.add(lock_key, token, timeout=TENANT_LOCK_SECONDS):
+                break
+            time.sleep(0.01)
+        else:
+            state = self.get_tenant_state(tenant_id)
+            new_state, _ = apply(copy.deepcopy(state))
+            return (new_state if new_state is not None else state), None
+
+        try:
+            state = self.get_tenant_state(tenant_id)
+            new_state, result = apply(copy.deepcopy(state))
+            if new_state is not None:
+                self.set_tenant_state(tenant_id, new_state)
+                state = new_state
+            return state, result
+        finally:
+            # Süresi dolup başka bir worker'a geçmiş kilit silinmez
+            if self.cache.get(lock_key) == token:
+                self.cache.delete(lock_key)
+
+_backend = None
+_lock = threading.Lock()
+_last_beat = {} # user_id -> epoch; süreç içi birleştirme
+_dirty = {} # user_id -> epoch; veritabanına yazılmayı bekleyen last_seen
+_last_flush = time.monotonic()
+
+def backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(getattr(settings, 'PRESENCE_BACKEND', 'core.presence.LocalPresenceBackend'))()
+    return _backend
+
+def profile_record(profile):
+    last_seen = profile.last_activity.timestamp() if profile.last_activity else None
+    return (profile.current_status, last_seen)
+
+def effective_status(record, now=None):
+    if not record:
+        return 'offline'
+    status, last_seen = record
+    now = now or time.time()
+    if status == 'offline' or last_seen is None or now - last_seen > ONLINE_WINDOW_SECONDS:
+        return 'offline'
+    return status
+
+def _touch(user_id, now):
+    global _last_flush
+    with _lock:
+        _last_beat[user_id] = now
+        _dirty[user_id] = now
+        due = time.monotonic() - _last_flush >= FLUSH_INTERVAL_SECONDS
+    if due:
+        flush_last_seen()
+
+def heartbeat(user):
+    """Kullanıcıyı görüldü olarak işaretler; birleştirilen heartbeat için False döner."""
+    now = time.time()
+    with _lock:
+        if now - _last_beat.get(user.id, 0) < HEARTBEAT_COALESCE_SECONDS:
+            return False
+
+    record = backend().get_many([user.id]).get(user.id)
+    if record and now - (record[1] or 0) < HEARTBEAT_COALESCE_SECONDS:
+        with _lock:
+            _last_beat[user.id] = record[1]
+        return False
+
+    status = record[0] if record else profile_record(user.profile)[0]
+    backend().set(user.id, (status, now))
+    _touch(user.id, now)
+    return True
+
+def set_status(user, status, tenant_id=None):
+    """Kullanıcının seçtiği durumu kaydeder (profil sinyallerini tetiklemeden)."""
+    now = time.time()
+    backend().set(user.id, (status, now))
+    _touch(user.id, now)
+    UserProfile.objects.filter(user=user).update(current_status=status)
+    etags.bump('users', tenant_id)
+
+def flush_last_seen():
+    """Biriken last_seen değerlerini tek UPDATE (parça başına) ile yazar."""
+    global _dirty, _last_flush
+    with _lock:
+        pending, _dirty = _dirty, {}
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    items = list(pending.items())
+    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+        batch = items[start:start + FLUSH_BATCH_SIZE]
+        UserProfile.objects.filter(user_id__in=[user_id for user_id, _ in batch]).update(last_activity=Case(
+            *[When(user_id=user_id, then=Value(datetime.fromtimestamp(seen, tz=dt_timezone.utc))) for user_id, seen in batch],
+            output_field=DateTimeField()
+        ))
+    return len(items)
+
+def _flush_at_exit():
+    try:
+        flush_last_seen()
+    except Exception as e:
+        print(f"Presence flush failed: {e}")
+
+atexit.register(_flush_at_exit)
+
+def tenant_members(tenant_id):
+    """[(user_id, fallback record)]; depoda kaydı olmayanlar için profil değerleri kullanılır."""
+    cache = caches['default']
+    key = f"presence:members:{tenant_id}"
+    members = cache.get(key)
+    if members is None:
+        members = [
+            (user_id, (status, last_activity.timestamp() if last_activity else None))
+            for user_id, status, last_activity in UserProfile.objects.filter(
+                tenant_id=tenant_id
+            ).values_list('user_id', 'current_status', 'last_activity')
+        ]
+        cache.set(key, members, timeout=MEMBERS_CACHE_SECONDS)
+    return members
+
+def current_statuses(tenant_id):
+    """Grup üyelerinin etkin durumları (user_id -> status) ve grup sürüm bilgisi."""
+    now = time.time()
+    members = tenant_members(tenant_id)
+    records = backend().get_many([user_id for user_id, _ in members])
+    current = {
+        user_id: effective_status(records.get(user_id) or fallback, now)
+        for user_id, fallback in members
+    }
+
+    def changed_in(state):
+        return [
+            user_id for user_id, status in current.items()
+            if (state['statuses'].get(user_id) or [None])[0] != status
+        ]
+
+    state = backend().get_tenant_state(tenant_id)
+    if state is not None and not changed_in(state):
+        return current, state
+
+    def apply(state):
+        # Kilit altında güncel durumun kopyası üzerinde çalışılır. Üyesi olmayan
+        # grubun boş durumu da kaydedilir; epoch her istekte yeniden üretilmez.
+        created = state is None
+        if created:
+            state = {'epoch': uuid.uuid4().hex[:8], 'version': 0, 'statuses': {}}
+        changed = []
+        user_ids = changed_in(state)
+        for user_id in user_ids:
+            previous = state['statuses'].get(user_id)
+            state['version'] += 1
+            state['statuses'][user_id] = [current[user_id], state['version']]
+            if previous is not None:
+                changed.append((user_id, current[user_id]))
+        return (state if user_ids or created else None), changed
+
+    state, changed = backend().update_tenant_state(tenant_id, apply)
+
+    # Zaman aşımıyla çevrimdışı olanlar da canlı istemcilere bildirilir
+    for user_id, status in changed or ():
+        push.publish('presence.changed', {'user_id': user_id, 'status': status}, tenant_id=tenant_id)
+    return current, state
+
+def tenant_cursor(tenant_id):
+    _, state = current_statuses(tenant_id)
+    return f"{state['epoch']}.{state['version']}"
+
+def snapshot(tenant_id, since=None):
+    """
+    Grup anlık görüntüsü. 'since' geçerli bir cursor ise yalnızca sonrasında
+    değişen durumlar döner; değilse (ilk istek, yeniden başlatma) tamamı döner.
+    """
+    current, state = current_statuses(tenant_id)
+    since_version = None
+    if since:
+        epoch, _, version = since.partition('.')
+        if epoch == state['epoch'] and version.isdigit() and int(version) <= state['version']:
+            since_version = int(version)
+
+    statuses = {
+        str(user_id): status
+        for user_id, status in current.items()
+        if since_version is None or state['statuses'][user_id][1] > since_version
+    }
+    return {
+        'cursor': f"{state['epoch']}.{state['version']}",
+        'full': since_version is None,
+        'statuses': statuses
+    }
+
+# --- SIGNALS ---
+@receiver(post_save, sender=UserProfile)
+def presence_members_signal(sender, instance, **kwargs):
+    # Gruba yeni katılan kullanıcı anlık görüntüde hemen görünsün
+    if instance.tenant_id:
+        caches['default'].delete(f"presence:members:{instance.tenant_id}")
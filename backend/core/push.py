@@ -0,0 +1,79 @@
+import secrets
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Notification
+
+# Sunucudan istemciye olay yayını (ASGI / WebSocket).
+# Olaylar yalnızca id taşır; istemci ilgili veriyi /api/tasks/changes/ ile çeker.
+# Varsayılan katman süreç içi (InMemoryChannelLayer); çok worker'lı kurulumda
+# settings.CHANNEL_LAYERS Redis gibi ortak bir backend'e çevrilmelidir.
+#
+# WebSocket bağlantısı API token'ı ile değil, /api/push/ticket/ ile alınan
+# kısa ömürlü ve tek kullanımlık bir bilet ile açılır (?ticket=...); böylece
+# sorgu dizesine düşen değer (proxy/erişim logları) tekrar kullanılamaz.
+
+TICKET_SECONDS = 30
+
+def tenant_group(tenant_id):
+    return f"tenant_{tenant_id}"
+
+def user_group(user_id):
+    return f"user_{user_id}"
+
+def tenant_of(user):
+    profile = getattr(user, 'profile', None)
+    return profile.tenant_id if profile else None
+
+def issue_ticket(user):
+    ticket = secrets.token_urlsafe(32)
+    cache.set(f"push:ticket:{ticket}", user.id, timeout=TICKET_SECONDS)
+    return ticket
+
+def redeem_ticket(ticket):
+    """Biletin kullanıcı id'si; bilet silinir, ikinci kullanımda (ve süresi dolunca) None."""
+    key = f"push:ticket:{ticket}"
+    user_id = cache.get(key)
+    # delete yalnızca bir çağrıda True döner; aynı bileti iki bağlantı kullanamaz
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+def _send(groups, message):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    for group in groups:
+        try:
+            async_to_sync(layer.group_send)(group, message)
+        except Exception as e:
+            print(f"Push error ({group}): {e}")
+
+def publish(event, payload, tenant_id=None, user_ids=()):
+    """
+    Olayı tenant grubuna ve/veya belirli kullanıcılara yayınlar.
+    Transaction commit edildikten sonra gönderilir, böylece istemci
+    olayı aldığında veri veritabanında görünür olur.
+    """
+    groups = []
+    if tenant_id is not None:
+        groups.append(tenant_group(tenant_id))
+    groups.extend(user_group(user_id) for user_id in set(user_ids) if user_id is not None)
+    if not groups:
+        return
+
+    message = {'type': 'push.event', 'event': event, 'payload': payload}
+    transaction.on_commit(lambda: _send(groups, message))
+
+# --- SIGNALS ---
+@receiver(post_save, sender=Notification)
+def notification_push_signal(sender, instance, created, **kwargs):
+    if created:
+        publish('notification.created', {
+            'notification_id': instance.id,
+            'task_id': instance.task_id,
+            'notification_type': instance.notification_type
+        }, user_ids=[instance.user_id])
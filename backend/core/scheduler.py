@@ -1,15 +1,86 @@
 from apscheduler.schedulers.background import BackgroundScheduler
-from django.core.management import call_command
-from datetime import datetime
+from django.utils import timezone
+from datetime import datetime, timedelta
+
+DEADLINE_JOB_ID = 'deadline_engine'
+# Başka süreçlerde oluşturulan görevleri de yakalamak için en uzun uyku süresi
+DEADLINE_MAX_SLEEP = timedelta(minutes=5)
+
+_scheduler = None
 
 def start():
+    global _scheduler
     scheduler = BackgroundScheduler()
     # Run the auto_export_logs command every 24 hours
     scheduler.add_job(call_auto_export, 'interval', hours=24, next_run_time=datetime.now())
+    scheduler.add_job(call_prune_tombstones, 'interval', hours=24)
+    # Backstop for export jobs queued by processes without a running worker
+    scheduler.add_job(call_export_jobs, 'interval', minutes=1)
+    # Write coalesced presence heartbeats (last_activity) to the database
+    scheduler.add_job(call_presence_flush, 'interval', seconds=60)
+    # Keep the onboarding plans (period template stages per tenant) warm for logins
+    scheduler.add_job(call_precompute_plans, 'interval', minutes=5, next_run_time=datetime.now())
+    # The deadline engine reschedules itself for the next warning/expiry boundary
+    scheduler.add_job(call_deadline_engine, 'date', run_date=timezone.now(), id=DEADLINE_JOB_ID)
     scheduler.start()
+    _scheduler = scheduler
 
 def call_auto_export():
     try:
-        call_command('auto_export_logs')
+        from .export_jobs import submit
+        submit('auto_export')
+    except Exception as e:
+        print(f"Error queueing auto_export_logs: {e}")
+
+def call_export_jobs():
+    try:
+        from .export_jobs import worker
+        worker.wake()
     except Exception as e:
-        print(f"Error running auto_export_logs: {e}")
+        print(f"Error waking export worker: {e}")
+
+def call_prune_tombstones():
+    try:
+        from .sync import prune_tombstones
+        prune_tombstones()
+    except Exception as e:
+        print(f"Error pruning sync tombstones: {e}")
+
+def call_presence_flush():
+    try:
+        from .presence import flush_last_seen
+        flush_last_seen()
+    except Exception as e:
+        print(f"Error flushing presence: {e}")
+
+def call_precompute_plans():
+    try:
+        from .onboarding import precompute_plans
+        precompute_plans()
+    except Exception as e:
+        print(f"Error precomputing onboarding plans: {e}")
+
+def call_deadline_engine():
+    wake = None
+    try:
+        from .deadlines import process_due_deadlines
+        wake = process_due_deadlines()
+    except Exception as e:
+        print(f"Error running deadline engine: {e}")
+    schedule_deadline_wake(wake, replace=True)
+
+def schedule_deadline_wake(when, replace=False):
+    """
+    Süre motorunu 'when' anında (en geç DEADLINE_MAX_SLEEP sonra) uyandırır.
+    replace=False iken yalnızca mevcut uyanmadan daha erkense günceller.
+    """
+    if _scheduler is None:
+        return
+    now = timezone.now()
+    run_at = min(when, now + DEADLINE_MAX_SLEEP) if when else now + DEADLINE_MAX_SLEEP
+    run_at = max(run_at, now)
+
+    job = _scheduler.get_job(DEADLINE_JOB_ID)
+    if job and not replace and job.next_run_time and job.next_run_time <= run_at:
+        return
+    _scheduler.add_job(call_deadline_engine, 'date', run_date=run_at, id=DEADLINE_JOB_ID, replace_existing=True)
@@ -2,10 +2,13 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import (
     Notification, Tenant, Device, Task, TaskNode, TaskDependency, 
-    TaskAssignment, TaskAttachment, UserProfile, Comment, SurveyQuestion, SurveyResponse
+    TaskAssignment, TaskAttachment, UserProfile, Comment, SurveyQuestion, SurveyResponse,
+    ExportJob
 )
 from django.utils import timezone
 from datetime import timedelta
+from . import presence
+from . import task_tree
 
 # --- 1. USER SERIALIZERS ---
 
@@ -54,12 +57,11 @@ class UserSerializer(serializers.ModelSerializer):
     def get_status(self, obj):
         if not hasattr(obj, 'profile'):
             return 'offline'
-        if obj.profile.current_status == 'offline':
-            return 'offline'
-        last_seen = obj.profile.last_activity
-        if not last_seen or (timezone.now() - last_seen) > timedelta(seconds=30):
-            return 'offline'
-        return obj.profile.current_status
+        statuses = self.context.get('presence_statuses')
+        if statuses is not None and obj.id in statuses:
+            return statuses[obj.id]
+        record = presence.backend().get_many([obj.id]).get(obj.id)
+        return presence.effective_status(record or presence.profile_record(obj.profile))
 
     def update(self, instance, validated_data):
         profile_data = validated_data.pop('profile', {})
@@ -113,11 +115,17 @@ class TaskDependencySerializer(serializers.ModelSerializer):
 
 # --- 3. TASK SERIALIZER (Ana Serializer) ---
 
+class TaskListSerializer(serializers.ListSerializer):
+    # Alt görevler görev başına değil, liste için bir kez çözülür (core/task_tree.py)
+    def to_representation(self, data):
+        tasks = data.all() if hasattr(data, 'all') else data
+        return task_tree.serialize_tasks(self.child, list(tasks))
+
 class TaskSerializer(serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     assignments = TaskAssignmentSerializer(many=True, read_only=True)
     attachments = TaskAttachmentSerializer(many=True, read_only=True)
-    subtasks = serializers.SerializerMethodField()
+    subtree_completion = serializers.FloatField(read_only=True)
     
     node_data = serializers.SerializerMethodField()
     
@@ -130,6 +138,7 @@ class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = '__all__' 
+        list_serializer_class = TaskListSerializer
         read_only_fields = [
             'created_by', 
             'status', 
@@ -138,6 +147,7 @@ class TaskSerializer(serializers.ModelSerializer):
             'node_data', 
             'subtasks',
             'warning_sent',
+            'expiry_processed',
             'created_at', 
             'updated_at'
         ]
@@ -145,7 +155,11 @@ class TaskSerializer(serializers.ModelSerializer):
     def get_node_data(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            node = obj.nodes.filter(user=request.user).first()
+            # TaskViewSet kullanıcının node'unu 'user_nodes' olarak önden yükler
+            if hasattr(obj, 'user_nodes'):
+                node = obj.user_nodes[0] if obj.user_nodes else None
+            else:
+                node = obj.nodes.filter(user=request.user).first()
             if node:
                 # Sadece koordinat gönderiyoruz, grup bilgisi yok.
                 return {
@@ -156,9 +170,17 @@ class TaskSerializer(serializers.ModelSerializer):
                 }
         return None
     
-    def get_subtasks(self, obj):
-        # Recursive serialization
-        return TaskSerializer(obj.subtasks.all(), many=True, context=self.context).data
+    def validate_parent_task(self, value):
+        if self.instance is not None and task_tree.would_create_cycle(self.instance, value):
+            raise serializers.ValidationError('Görev kendi alt görevinin altına taşınamaz.')
+        return value
+
+    def task_representation(self, instance):
+        # 'subtasks' hariç temsil; alt görevleri task_tree ekler
+        return super().to_representation(instance)
+
+    def to_representation(self, instance):
+        return task_tree.serialize_tasks(self, [instance])[0]
     
     def create(self, validated_data):
         assignee_ids = validated_data.pop('assignee_ids', [])
@@ -259,6 +281,15 @@ class CommentSerializer(serializers.ModelSerializer):
             return obj.user == request.user
         return False
 
+class ExportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'kind', 'status', 'progress', 'progress_message', 'request_count',
+            'attempts', 'error', 'result_path', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
 class SurveyQuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = SurveyQuestion
@@ -1,29 +1,103 @@
 import os
 import csv
+import gzip
+import json
+import zlib
 import hashlib
+import queue
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django import forms
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.conf import settings
 from .models import (
-    ActivityLog, ResearchUserAlias, PresentationPeriod, 
-    Task, TaskAssignment
+    ActivityLog, ResearchUserAlias, ResearchAliasSequence, PresentationPeriod, 
+    Task, TaskAssignment, InteractionBatch, UserProfile, Tenant
 )
+from .logging_utils import flush_activity_logs
+from . import columnar
+
+# Araştırma takma adları (A1, A2 ... Spiral; B1, B2 ... Kanban). Numara önek
+# başına ResearchAliasSequence satırından kilitlenerek alınır; tarama yapılmaz
+# ve eşzamanlı girişler aynı numarayı alamaz (alias ayrıca unique).
+
+def alias_prefix(tenant):
+    return 'B' if tenant is not None and tenant.is_kanban else 'A'
+
+def anonymous_id_for(user_id):
+    return hashlib.sha256(str(user_id).encode()).hexdigest()[0:16]
+
+def _lock_alias_sequence(prefix):
+    sequence = ResearchAliasSequence.objects.select_for_update().filter(prefix=prefix).first()
+    if sequence is None:
+        try:
+            with transaction.atomic():
+                ResearchAliasSequence.objects.create(prefix=prefix)
+        except IntegrityError:
+            pass # başka bir istek aynı anda oluşturdu
+        sequence = ResearchAliasSequence.objects.select_for_update().get(prefix=prefix)
+    return sequence
+
+def reserve_alias_numbers(sequence, count=1):
+    """Kilitli sayacı count kadar ilerletir ve ayrılan ilk numarayı döndürür."""
+    first = sequence.last_value + 1
+    sequence.last_value += count
+    sequence.save(update_fields=['last_value'])
+    return first
 
 def get_user_alias(user):
-    try:
-        return ResearchUserAlias.objects.get(user=user)
-    except ResearchUserAlias.DoesNotExist:
-        tenant = getattr(user.profile, 'tenant', None)
-        is_kanban = tenant.is_kanban if tenant else False
-        prefix = 'B' if is_kanban else 'A'
-        count = ResearchUserAlias.objects.filter(alias__startswith=prefix).count()
+    alias = ResearchUserAlias.objects.filter(user=user).first()
+    if alias:
+        return alias
+
+    profile = UserProfile.objects.select_related('tenant').filter(user=user).first()
+    prefix = alias_prefix(profile.tenant if profile else None)
+    with transaction.atomic():
+        sequence = _lock_alias_sequence(prefix)
+        # Kilit alındıktan sonra yeniden bakılır; aynı kullanıcı için ikinci numara harcanmaz
+        alias = ResearchUserAlias.objects.filter(user=user).first()
+        if alias:
+            return alias
+        number = reserve_alias_numbers(sequence)
         return ResearchUserAlias.objects.create(
             user=user,
-            alias=f"{prefix}{count + 1}",
-            anonymous_id=hashlib.sha256(str(user.id).encode()).hexdigest()[0:16]
+            alias=f"{prefix}{number}",
+            anonymous_id=anonymous_id_for(user.id)
         )
 
+def allocate_aliases(users):
+    """
+    Takma adı olmayan kullanıcılara (id sırasıyla) tek transaction'da takma ad
+    verir; önek başına bir kilit ve bir bulk_create. Oluşturulan kayıtları döndürür.
+    """
+    with transaction.atomic():
+        by_prefix = {}
+        for user_id, tenant_is_kanban in users.filter(research_alias__isnull=True).order_by('id').values_list(
+            'id', 'profile__tenant__is_kanban'
+        ):
+            by_prefix.setdefault('B' if tenant_is_kanban else 'A', []).append(user_id)
+
+        created = []
+        for prefix in sorted(by_prefix):
+            sequence = _lock_alias_sequence(prefix)
+            # Kilit beklenirken takma ad almış olanlar çıkarılır
+            taken = set(ResearchUserAlias.objects.filter(user_id__in=by_prefix[prefix]).values_list('user_id', flat=True))
+            user_ids = [user_id for user_id in by_prefix[prefix] if user_id not in taken]
+            if not user_ids:
+                continue
+            first = reserve_alias_numbers(sequence, len(user_ids))
+            created.extend(ResearchUserAlias.objects.bulk_create([
+                ResearchUserAlias(user_id=user_id, alias=f"{prefix}{first + offset}", anonymous_id=anonymous_id_for(user_id))
+                for offset, user_id in enumerate(user_ids)
+            ]))
+    return created
+
 def export_user_session_csv(user):
     alias_obj = get_user_alias(user)
     
@@ -46,6 +120,7 @@ def export_user_session_csv(user):
     os.makedirs(base_export_dir, exist_ok=True)
     session_file_path = os.path.join(base_export_dir, 'Session_Log.csv')
 
+    flush_activity_logs(user_id=user.id)
     all_logs = ActivityLog.objects.filter(user=user).order_by('created_at')
     
     with open(session_file_path, 'w', newline='', encoding='utf-8') as f:
@@ -56,59 +131,419 @@ def export_user_session_csv(user):
 
     return session_file_path
 
+GLOBAL_ACTIVITY_HEADERS = [
+    'session_id', 'event_type', 'group_code', 'task_id', 
+    'word_count', 'char_count', 'hour_of_day', 'day_of_week', 
+    'created_at', 'anonymous_user_id', 
+    'survey_suspicious_count', 'survey_avg_response_ms'
+]
+EXPORT_CHUNK_SIZE = 5000
+
+def build_export_user_map():
+    """user_id -> (anonymous_id, group_code); tek sorguda, satır başına hash/JOIN yerine."""
+    return {
+        user_id: (anonymous_id_for(user_id), group_code or "N/A")
+        for user_id, group_code in User.objects.values_list('id', 'profile__tenant__tenant_id')
+    }
+
+def iter_global_activity_rows(user_map=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """ActivityLog satırlarını model örneği oluşturmadan, parça parça okuyup CSV satırına çevirir."""
+    if user_map is None:
+        user_map = build_export_user_map()
+    logs = ActivityLog.objects.order_by('-created_at').values_list(
+        'session_id', 'event_type', 'user_id', 'metadata', 'created_at'
+    ).iterator(chunk_size=chunk_size)
+
+    for session_id, event_type, user_id, metadata, created_at in logs:
+        anon_user_id, group_code = user_map.get(user_id, ("", "N/A")) if user_id else ("", "N/A")
+        meta = metadata if isinstance(metadata, dict) else {}
+
+        raw_suspicious = meta.get('is_suspicious', '')
+        suspicious_count = 1 if raw_suspicious is True else (0 if raw_suspicious is False else '')
+
+        yield [
+            session_id, event_type, group_code, meta.get('task_id', ''),
+            meta.get('word_count', ''), meta.get('char_count', ''),
+            created_at.hour, created_at.strftime('%A'),
+            created_at.isoformat(), anon_user_id,
+            suspicious_count, meta.get('avg_response_ms', '')
+        ]
+
+class _Echo:
+    """csv.writer için satırı dosyaya değil doğrudan geri döndüren yazıcı."""
+    def write(self, value):
+        return value
+
+def iter_csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+STREAM_BATCH_BYTES = 256 * 1024
+
+def _take(iterator, batch_size, max_bytes):
+    batch, size = [], 0
+    for item in islice(iterator, batch_size):
+        batch.append(item)
+        size += len(item)
+        if size >= max_bytes:
+            break
+    return batch
+
+async def _aiter_in_thread(iterator, batch_size=1000, joiner='', max_bytes=STREAM_BATCH_BYTES):
+    # ASGI altında senkron iterator Django tarafından tamamen belleğe alınır;
+    # bunun yerine satırlar aynı thread'de parça parça çekilir. Parça hem satır
+    # sayısıyla hem bayt toplamıyla sınırlıdır (COPY parçaları zaten büyüktür).
+    iterator = iter(iterator)
+    next_batch = sync_to_async(lambda: _take(iterator, batch_size, max_bytes), thread_sensitive=True)
+    while True:
+        batch = await next_batch()
+        if not batch:
+            return
+        yield joiner.join(batch)
+
+def _streaming_response(request, filename, chunks, joiner=''):
+    content = chunks if 'wsgi.version' in request.META else _aiter_in_thread(chunks, joiner=joiner)
+    response = StreamingHttpResponse(content, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def streaming_csv_response(request, filename, headers, rows):
+    return _streaming_response(request, filename, iter_csv_lines(headers, rows))
+
+def global_activity_export_filename():
+    return f"export_{timezone.now().strftime('%Y-%m-%d_%H-%M')}.csv"
+
+def stream_global_activity_csv(request):
+    flush_activity_logs()
+    if copy_export_supported():
+        return _streaming_response(
+            request, global_activity_export_filename(), iter_copy_chunks(global_activity_copy_sql()), joiner=b''
+        )
+    return streaming_csv_response(
+        request, global_activity_export_filename(), GLOBAL_ACTIVITY_HEADERS, iter_global_activity_rows()
+    )
+
+
+# --- POSTGRES COPY HIZLI YOLU ---
+# PostgreSQL'de tam tablo dışa aktarımı ORM'den satır satır geçmez:
+# anonim kimlik (sha256), tenant JOIN'i ve metadata alanları SQL'de
+# hesaplanır, COPY ... TO STDOUT çıktısı olduğu gibi yanıta/dosyaya aktarılır.
+# Sütunlar ve değer biçimleri iter_global_activity_rows ile aynıdır
+# (satır sonu olarak yalnızca \n kullanılır). Diğer veritabanlarında ORM yolu kullanılır.
+
+COPY_CHUNK_BYTES = 256 * 1024
+COPY_QUEUE_CHUNKS = 16
+
+def copy_export_supported():
+    return connection.vendor == 'postgresql'
+
+def global_activity_copy_sql():
+    qn = connection.ops.quote_name
+    # created_at, ORM'in döndürdüğü gibi UTC olarak biçimlenir
+    ts = "(l.created_at AT TIME ZONE 'UTC')"
+    columns = [
+        "l.session_id",
+        "l.event_type",
+        "COALESCE(NULLIF(t.tenant_id, ''), 'N/A')",
+        "l.metadata ->> 'task_id'",
+        "l.metadata ->> 'word_count'",
+        "l.metadata ->> 'char_count'",
+        f"EXTRACT(HOUR FROM {ts})::int",
+        f"to_char({ts}, 'FMDay')",
+        f"to_char({ts}, 'YYYY-MM-DD\"T\"HH24:MI:SS')"
+        f" || CASE WHEN EXTRACT(MICROSECONDS FROM {ts})::bigint % 1000000 = 0 THEN '' ELSE to_char({ts}, '.US') END"
+        " || '+00:00'",
+        "CASE WHEN l.user_id IS NULL THEN NULL"
+        " ELSE left(encode(sha256(convert_to(l.user_id::text, 'UTF8')), 'hex'), 16) END",
+        "CASE WHEN jsonb_typeof(l.metadata -> 'is_suspicious') = 'boolean'"
+        " THEN CASE WHEN (l.metadata ->> 'is_suspicious')::boolean THEN 1 ELSE 0 END END",
+        "l.metadata ->> 'avg_response_ms'",
+    ]
+    select = ",\n    ".join(f"{expr} AS {qn(name)}" for expr, name in zip(columns, GLOBAL_ACTIVITY_HEADERS))
+    return (
+        f"COPY (\n  SELECT\n    {select}\n"
+        f"  FROM {qn(ActivityLog._meta.db_table)} l\n"
+        f"  LEFT JOIN {qn(UserProfile._meta.db_table)} p ON p.user_id = l.user_id\n"
+        f"  LEFT JOIN {qn(Tenant._meta.db_table)} t ON t.id = p.tenant_id\n"
+        f"  ORDER BY l.created_at DESC\n"
+        f") TO STDOUT WITH (FORMAT csv, HEADER)"
+    )
+
+def _copy_to(sql, stream):
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'): # psycopg2
+            raw.copy_expert(sql, stream)
+        else: # psycopg 3
+            with raw.copy(sql) as copy:
+                for data in copy:
+                    stream.write(bytes(data))
+
+class _CopyPipe:
+    """COPY çıktısını sınırlı bir kuyrukla tüketiciye aktarır (bellek sabit kalır)."""
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=COPY_QUEUE_CHUNKS)
+        self.cancelled = threading.Event()
+        self._parts = []
+        self._size = 0
+
+    def _put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                raise IOError('Export cancelled by client.')
+            try:
+                self.queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._parts.append(data)
+        self._size += len(data)
+        if self._size >= COPY_CHUNK_BYTES:
+            self._put(b''.join(self._parts))
+            self._parts, self._size = [], 0
+
+    def finish(self, error=None):
+        if self._parts and error is None:
+            self._put(b''.join(self._parts))
+        self._put(error)
+
+def _copy_worker(sql, pipe):
+    error = None
+    try:
+        _copy_to(sql, pipe)
+    except Exception as e:
+        error = e
+    finally:
+        connection.close()
+    try:
+        pipe.finish(error)
+    except IOError:
+        pass
+
+def iter_copy_chunks(sql):
+    """COPY'yi ayrı bir thread'de (kendi bağlantısıyla) çalıştırır ve bayt parçalarını üretir."""
+    pipe = _CopyPipe()
+    threading.Thread(target=_copy_worker, args=(sql, pipe), name='export-copy', daemon=True).start()
+    try:
+        while True:
+            item = pipe.queue.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        pipe.cancelled.set()
+
+def export_period_folder_name(period):
+    return f"{period.name}_{period.start_date.strftime('%b%y')}"
+
+def period_folder_resolver():
+    """created_at -> dönem klasör adı (dönem dışı için 'none'); gün başına bir kez hesaplanır."""
+    periods = list(PresentationPeriod.objects.order_by('start_date'))
+    by_date = {}
+
+    def resolve(created_at):
+        day = timezone.localtime(created_at).date()
+        name = by_date.get(day)
+        if name is None:
+            period = next((p for p in periods if p.start_date <= day <= p.end_date), None)
+            name = by_date[day] = export_period_folder_name(period) if period else 'none'
+        return name
+    return resolve
+
 def generate_global_activity_csv():
     backend_root = settings.BASE_DIR
     export_dir = os.path.join(backend_root, 'research_exports')
     os.makedirs(export_dir, exist_ok=True)
-    
-    timestamp = timezone.now().strftime('%Y-%m-%d_%H-%M')
-    filename = f"export_{timestamp}.csv"
+    filename = global_activity_export_filename()
     local_path = os.path.join(export_dir, filename)
 
-    headers = [
-        'session_id', 'event_type', 'group_code', 'task_id', 
-        'word_count', 'char_count', 'hour_of_day', 'day_of_week', 
-        'created_at', 'anonymous_user_id', 
-        'survey_suspicious_count', 'survey_avg_response_ms'
-    ]
+    flush_activity_logs()
+    # pyarrow kuruluysa aynı satırlar dönem/grup bölümlü Parquet olarak da yazılır
+    parquet = None
+    if columnar.parquet_enabled():
+        parquet = columnar.ParquetPartitionWriter(
+            os.path.join(export_dir, 'parquet', os.path.splitext(filename)[0]),
+            GLOBAL_ACTIVITY_HEADERS,
+            run_id='0'
+        )
+        resolve_period = period_folder_resolver()
 
-    with open(local_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-
-        logs = ActivityLog.objects.all().order_by('-created_at')
-        for log in logs:
-            anon_user_id = ""
-            group_code = "N/A"
-            
-            if log.user:
-                hash_obj = hashlib.sha256(str(log.user.id).encode())
-                anon_user_id = hash_obj.hexdigest()[0:16]
-                
-                try:
-                    if hasattr(log.user, 'profile') and log.user.profile.tenant:
-                        group_code = log.user.profile.tenant.tenant_id
-                except:
-                    pass
-            
-            meta = log.metadata if isinstance(log.metadata, dict) else {}
-            task_id = meta.get('task_id', '')
-            word_count = meta.get('word_count', '')
-            char_count = meta.get('char_count', '')
-            
-            raw_suspicious = meta.get('is_suspicious', '')
-            suspicious_count = 1 if raw_suspicious is True else (0 if raw_suspicious is False else '')
-            avg_response = meta.get('avg_response_ms', '')
-
-            hour_of_day = log.created_at.hour
-            day_of_week = log.created_at.strftime('%A')
-            
-            row = [
-                log.session_id, log.event_type, group_code, task_id,
-                word_count, char_count, hour_of_day, day_of_week,
-                log.created_at.isoformat(), anon_user_id,
-                suspicious_count, avg_response
-            ]
-            writer.writerow(row)
+    if copy_export_supported():
+        with open(local_path, 'wb') as f:
+            _copy_to(global_activity_copy_sql(), f)
+        if parquet:
+            # Parquet kopyası ORM'den değil, COPY'nin yazdığı dosyadan okunur
+            try:
+                with open(local_path, newline='', encoding='utf-8') as f:
+                    reader = csv.reader(f)
+                    next(reader, None)
+                    for row in reader:
+                        parquet.write(resolve_period(columnar.parse_timestamp(row[8])), row[2], row)
+            finally:
+                parquet.close()
+        return local_path
+
+    try:
+        with open(local_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(GLOBAL_ACTIVITY_HEADERS)
+            for row in iter_global_activity_rows():
+                writer.writerow(row)
+                if parquet:
+                    parquet.write(resolve_period(columnar.parse_timestamp(row[8])), row[2], row)
+    finally:
+        if parquet:
+            parquet.close()
 
     return local_path
+
+
+# --- TOPLU ETKİLEŞİM OLAYLARI ---
+INTERACTION_BATCH_MAX_EVENTS = 500
+INTERACTION_BATCH_MAX_BYTES = 5 * 1024 * 1024
+# Olayların client_ts'leri arasındaki fark en fazla bu kadar korunur
+INTERACTION_MAX_SPAN = timedelta(hours=24)
+
+class InteractionBatchError(Exception):
+    def __init__(self, detail):
+        super().__init__(str(detail))
+        self.detail = detail
+
+def _decompress(body):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = decompressor.decompress(body, INTERACTION_BATCH_MAX_BYTES)
+    if decompressor.unconsumed_tail:
+        raise InteractionBatchError('Paket çok büyük.')
+    return data
+
+def parse_interaction_batch(body, content_type, content_encoding=''):
+    """
+    JSON ({"seq": n, "events": [...]} ya da dizi) veya NDJSON gövdesini
+    (isteğe bağlı gzip) çözer. (seq, events) döndürür; seq gövdede yoksa None.
+    """
+    if 'gzip' in (content_encoding or '').lower():
+        try:
+            body = _decompress(body)
+        except (zlib.error, gzip.BadGzipFile):
+            raise InteractionBatchError('Geçersiz gzip verisi.')
+    if len(body) > INTERACTION_BATCH_MAX_BYTES:
+        raise InteractionBatchError('Paket çok büyük.')
+
+    try:
+        text = body.decode('utf-8')
+        if 'ndjson' in (content_type or ''):
+            return None, [json.loads(line) for line in text.splitlines() if line.strip()]
+        payload = json.loads(text)
+    except (UnicodeDecodeError, ValueError):
+        raise InteractionBatchError('Geçersiz JSON verisi.')
+
+    if isinstance(payload, list):
+        return None, payload
+    if isinstance(payload, dict) and isinstance(payload.get('events'), list):
+        return payload.get('seq'), payload['events']
+    raise InteractionBatchError("'events' listesi bekleniyor.")
+
+def _parse_client_ts(value):
+    """ISO 8601 metni ya da epoch (saniye veya milisaniye) -> aware datetime; geçersizse None."""
+    if isinstance(value, bool):
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            # 1e11'den büyük değerler milisaniyedir (JS Date.now())
+            seconds = value / 1000 if abs(value) > 1e11 else value
+            return datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+        parsed = parse_datetime(value)
+    except (ValueError, OverflowError, OSError):
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+def validate_interaction_events(events):
+    """
+    Tüm olayları tek geçişte doğrular; hatalar {index: mesaj} olarak döner.
+    (event_type, metadata, client_time) listesi döndürür; client_ts'in ham
+    değeri metadata'da kalır, client_time yoksa None.
+    """
+    if not events:
+        raise InteractionBatchError('Hiç olay gönderilmedi.')
+    if len(events) > INTERACTION_BATCH_MAX_EVENTS:
+        raise InteractionBatchError(f'Bir pakette en fazla {INTERACTION_BATCH_MAX_EVENTS} olay gönderilebilir.')
+
+    max_length = ActivityLog._meta.get_field('event_type').max_length
+    errors = {}
+    cleaned = []
+    for index, item in enumerate(events):
+        if not isinstance(item, dict):
+            errors[index] = 'Olay bir nesne olmalı.'
+            continue
+        event_type = item.get('event_type')
+        metadata = item.get('metadata', {})
+        client_ts = item.get('client_ts')
+        if not isinstance(event_type, str) or not event_type or len(event_type) > max_length:
+            errors[index] = 'Geçersiz event_type.'
+        elif not isinstance(metadata, dict):
+            errors[index] = 'metadata bir nesne olmalı.'
+        elif client_ts is not None and (
+            not isinstance(client_ts, (str, int, float)) or _parse_client_ts(client_ts) is None
+        ):
+            errors[index] = 'Geçersiz client_ts.'
+        elif client_ts is not None:
+            cleaned.append((event_type, {**metadata, 'client_ts': client_ts}, _parse_client_ts(client_ts)))
+        else:
+            cleaned.append((event_type, metadata, None))
+    if errors:
+        raise InteractionBatchError(errors)
+    return cleaned
+
+def interaction_times(client_times, now):
+    """
+    Olayların created_at değerleri. İstemci saati sunucuyla uyuşmayabileceği
+    için client_ts mutlak değil, paketin en yeni olayına göre fark olarak
+    kullanılır: en yeni olay 'now' alır, diğerleri aradaki fark kadar
+    (0 ile INTERACTION_MAX_SPAN arasına sıkıştırılarak) geriye konur.
+    client_ts'i olmayan olay bir önceki olayın zamanını alır.
+    """
+    known = [client_time for client_time in client_times if client_time is not None]
+    latest = max(known, default=None)
+    times = []
+    previous = None
+    for client_time in client_times:
+        if client_time is None:
+            created_at = previous
+        else:
+            offset = min(max(latest - client_time, timedelta(0)), INTERACTION_MAX_SPAN)
+            created_at = now - offset
+        times.append(created_at)
+        previous = created_at if created_at is not None else previous
+    # Baştaki zamansız olaylar paketin en eski zamanını alır
+    earliest = min((created_at for created_at in times if created_at is not None), default=now)
+    return [created_at or earliest for created_at in times]
+
+def ingest_interaction_batch(user, session_id, seq, events):
+    """
+    Doğrulanmış olayları tek bulk_create ile yazar. Aynı (kullanıcı, oturum,
+    seq) daha önce alındıysa hiçbir şey yazmaz ve False döner. Tamponda bu
+    oturuma ait (log_event ile gelen) olaylar önce yazılır, böylece oturum içi
+    sıra bu paketten önce gelenlerle bozulmaz; diğer oturumlar beklemez.
+    """
+    flush_activity_logs(user_id=user.id, session_id=session_id)
+    times = interaction_times([client_time for _, _, client_time in events], timezone.now())
+    try:
+        with transaction.atomic():
+            InteractionBatch.objects.create(user=user, session_id=session_id, seq=seq, event_count=len(events))
+            ActivityLog.objects.bulk_create([
+                ActivityLog(user=user, session_id=session_id, event_type=event_type, metadata=metadata, created_at=created_at)
+                for (event_type, metadata, _), created_at in zip(events, times)
+            ])
+    except IntegrityError:
+        return False
+    return True
@@ -0,0 +1,87 @@
+import calendar
+from datetime import datetime, time, timedelta
+from django.core.cache import cache
+from django.db.models import Count, F, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Task, TaskAssignment
+from . import etags
+
+# /api/users/stats/ özetleri. Toplamlar tek bir aggregate, haftalık puan ve
+# aylık histogram tek bir gün bazlı gruplu sorguyla hesaplanır (yerel saat).
+# Sonuç kullanıcı başına önbelleğe alınır; anahtar kullanıcının 'tasks'
+# ETag damgasını içerdiğinden görev/atama değişiklikleri önbelleği geçersiz
+# kılar. 'totalFailed' zamana bağlı olduğu için kayıt en geç sıradaki teslim
+# tarihi geçtiğinde düşer.
+
+STATS_CACHE_SECONDS = 300
+WEEK_DAYS = 6 # Pazartesi - Cumartesi
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def compute_user_stats(user, now=None):
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+
+    totals = TaskAssignment.objects.filter(user=user).aggregate(
+        total_assigned=Count('id'),
+        total_completed=Count('id', filter=Q(is_completed=True)),
+        failed_tasks=Count('task', distinct=True, filter=Q(is_completed=False, task__due_date__lt=now)),
+        next_due=Min('task__due_date', filter=Q(is_completed=False, task__due_date__gte=now))
+    )
+    total_created = Task.objects.filter(created_by=user).count()
+
+    # HAFTALIK + AYLIK GRAFİK: iki aralığı kapsayan günler tek sorguda gruplanır
+    start_of_week = today - timedelta(days=today.weekday())
+    end_of_week = start_of_week + timedelta(days=WEEK_DAYS - 1)
+    _, num_days = calendar.monthrange(today.year, today.month)
+    first_of_month = today.replace(day=1)
+    last_of_month = today.replace(day=num_days)
+    range_start = min(start_of_week, first_of_month)
+    range_end = max(end_of_week, last_of_month)
+
+    # Zamanında: teslim tarihi yok ya da tamamlanma günü <= teslim günü (yerel)
+    on_time = Q(task__due_date__isnull=True) | Q(task__due_date__date__gte=F('day'))
+    daily = TaskAssignment.objects.filter(
+        user=user,
+        is_completed=True,
+        completed_at__gte=_local_midnight(range_start),
+        completed_at__lt=_local_midnight(range_end + timedelta(days=1))
+    ).annotate(day=TruncDate('completed_at')).values('day').annotate(
+        completed=Count('id'),
+        on_time=Count('id', filter=on_time)
+    ).order_by()
+
+    weekly_stats = [0] * WEEK_DAYS
+    monthly_stats = [0] * num_days
+    for row in daily:
+        day = row['day']
+        if start_of_week <= day <= end_of_week:
+            # zamanında +1, geç -1
+            weekly_stats[(day - start_of_week).days] = 2 * row['on_time'] - row['completed']
+        if day.year == today.year and day.month == today.month:
+            monthly_stats[day.day - 1] = row['completed']
+
+    return {
+        'totalCreated': total_created,
+        'totalAssigned': totals['total_assigned'],
+        'totalCompleted': totals['total_completed'],
+        'totalFailed': totals['failed_tasks'],
+        'weeklyData': weekly_stats,
+        'monthlyData': monthly_stats
+    }, totals['next_due']
+
+def user_stats(user):
+    now = timezone.now()
+    key = f"user_stats:{user.id}:{etags.get_stamp('tasks', user.id)}:{timezone.localdate(now).isoformat()}"
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    data, next_due = compute_user_stats(user, now)
+    timeout = STATS_CACHE_SECONDS
+    if next_due is not None:
+        timeout = max(1, min(timeout, int((next_due - now).total_seconds()) + 1))
+    cache.set(key, data, timeout=timeout)
+    return data
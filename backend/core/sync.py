@@ -0,0 +1,93 @@
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+from .models import (
+    ChangeCounter, SyncTombstone, Task, TaskAssignment, TaskAttachment,
+    TaskNode, TaskDependency, current_change_cursor
+)
+
+# Bu süreden eski iz kayıtları silinir; daha eski imleçle gelen istemci tam senkron alır.
+TOMBSTONE_RETENTION_DAYS = 14
+
+def cursor_state():
+    """(güncel sürüm, budanmış iz kayıtlarının üst sınırı)"""
+    pruned_through = ChangeCounter.objects.values_list('pruned_through', flat=True).get(pk=1)
+    return current_change_cursor(), pruned_through
+
+def parse_cursor(raw):
+    try:
+        cursor = int(raw)
+    except (TypeError, ValueError):
+        return None
+    return cursor if cursor > 0 else None
+
+def visible_tasks(user):
+    return Task.objects.filter(Q(created_by=user) | Q(assignments__user=user))
+
+def changed_task_ids(user, since):
+    """
+    Kullanıcının görebildiği ve kendisi, ataması, eki, kullanıcının node'u
+    ya da alt görevi 'since' sürümünden sonra değişen görevlerin id'leri.
+    """
+    changed = (
+        Q(change_version__gt=since)
+        | Q(id__in=TaskAssignment.objects.filter(change_version__gt=since).values('task_id'))
+        | Q(id__in=TaskAttachment.objects.filter(change_version__gt=since).values('task_id'))
+        | Q(id__in=TaskNode.objects.filter(user=user, change_version__gt=since).values('task_id'))
+        | Q(id__in=Task.objects.filter(change_version__gt=since, parent_task__isnull=False).values('parent_task_id'))
+        | Q(id__in=SyncTombstone.objects.filter(change_version__gt=since, task_id__isnull=False).values('task_id'))
+    )
+    return visible_tasks(user).filter(changed).values('id').distinct()
+
+def changed_dependencies(user, since):
+    task_ids = visible_tasks(user).values('id')
+    queryset = TaskDependency.objects.filter(Q(source_task__in=task_ids) | Q(target_task__in=task_ids))
+    if since is not None:
+        queryset = queryset.filter(change_version__gt=since)
+    return queryset
+
+def deleted_since(user, since):
+    """
+    İmleçten sonra silinen/arşivlenen ve kullanıcıyı ilgilendiren kayıtlar.
+    Görev iz kayıtları görevi gören kullanıcılar adına yazılır (user_id);
+    grubun diğer üyeleri başkasının görevinin silindiğini görmez. İz
+    kaydından sonra yeniden değişen görev silinmiş sayılmaz.
+    """
+    visible_ids = set(visible_tasks(user).values_list('id', flat=True))
+
+    tombstones = SyncTombstone.objects.filter(change_version__gt=since).filter(
+        Q(user_id=user.id)
+        | Q(task_id__in=visible_ids)
+    ).order_by('change_version')
+    revived = dict(Task.objects.filter(
+        id__in={tomb.task_id for tomb in tombstones if tomb.model_name == 'task'}
+    ).values_list('id', 'change_version'))
+
+    deleted = []
+    seen = set()
+    for tomb in tombstones:
+        model_name, object_id = tomb.model_name, tomb.object_id
+        # Kullanıcının ataması kalktıysa görev artık listesinde değildir
+        if model_name == 'assignment' and tomb.user_id == user.id and tomb.task_id not in visible_ids:
+            model_name, object_id = 'task', tomb.task_id
+        if tomb.model_name == 'task' and revived.get(object_id, 0) > tomb.change_version:
+            continue
+        if (model_name, object_id) in seen:
+            continue
+        seen.add((model_name, object_id))
+        deleted.append({
+            'model': model_name,
+            'id': object_id,
+            'task': tomb.task_id,
+            'reason': tomb.reason
+        })
+    return deleted
+
+def prune_tombstones(days=TOMBSTONE_RETENTION_DAYS):
+    cutoff = timezone.now() - timedelta(days=days)
+    horizon = SyncTombstone.objects.filter(created_at__lt=cutoff).order_by('-change_version').values_list('change_version', flat=True).first()
+    if horizon is None:
+        return 0
+    ChangeCounter.objects.filter(pk=1, pruned_through__lt=horizon).update(pruned_through=horizon)
+    deleted, _ = SyncTombstone.objects.filter(change_version__lte=horizon).delete()
+    return deleted
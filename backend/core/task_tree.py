@@ -0,0 +1,231 @@
+from django.db import transaction
+from django.db.models import CharField, F, Prefetch, Value
+from django.db.models.functions import Cast, Concat, Greatest, Substr
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from .models import Task, TaskAssignment, TaskAttachment, TaskNode, next_change_version
+from . import etags
+
+# Görev listesi ve alt görev ağacı. Her görev tek kez serialize edilir;
+# 'subtasks' alanı varsayılan olarak alt görev id'lerinin düz listesidir
+# (istemci ağacı 'parent_task' ile kurar). '?subtask_depth=N' ile en fazla
+# MAX_SUBTASK_DEPTH seviyelik iç içe görünüm istenebilir; her seviye için
+# bir alt görev sorgusu yapılır ve listede zaten olan görevler yeniden
+# sorgulanmaz/serialize edilmez. Maliyet görev sayısıyla doğrusaldır.
+#
+# Hiyerarşi indeksi: her görev kökten kendisine kadar id yolunu (tree_path,
+# ör. '/3/17/42/') ve derinliğini tutar. Alt ağaç tek bir indeksli
+# 'tree_path LIKE yol%' sorgusu, üst zincir yoldaki id'lerle tek sorgudur.
+# Yol görev oluşturulduğunda ve üst görev değiştiğinde sinyalle güncellenir;
+# taşınan alt ağacın yolları tek UPDATE ile yeniden yazılır. Silmede bakım
+# gerekmez (alt görevler CASCADE ile silinir).
+
+MAX_SUBTASK_DEPTH = 5
+
+def task_queryset_plan(queryset, user):
+    """
+    TaskSerializer'ın dokunduğu tüm ilişkileri (oluşturan, atamalar, ekler ve
+    kullanıcıya ait node) önden yükler. Böylece liste sorgu sayısı
+    görev/atama/ek sayısından bağımsız kalır.
+    """
+    user_path = '__profile__department'
+    return queryset.select_related('created_by' + user_path).prefetch_related(
+        Prefetch('assignments', queryset=TaskAssignment.objects.select_related('user' + user_path)),
+        Prefetch('attachments', queryset=TaskAttachment.objects.select_related('uploaded_by' + user_path)),
+        Prefetch('nodes', queryset=TaskNode.objects.filter(user=user), to_attr='user_nodes'),
+    )
+
+def subtask_depth(context):
+    request = context.get('request')
+    raw = context.get('subtask_depth')
+    if raw is None and request is not None:
+        raw = getattr(request, 'query_params', {}).get('subtask_depth')
+    try:
+        return max(0, min(int(raw), MAX_SUBTASK_DEPTH))
+    except (TypeError, ValueError):
+        return 0
+
+def child_ids(parent_ids):
+    """parent_id -> [alt görev id'leri] (id sırasıyla), tek sorgu."""
+    children = {}
+    if parent_ids:
+        for parent_id, task_id in Task.objects.filter(parent_task_id__in=parent_ids).order_by('id').values_list(
+            'parent_task_id', 'id'
+        ):
+            children.setdefault(parent_id, []).append(task_id)
+    return children
+
+def serialize_tasks(serializer, tasks):
+    """
+    'tasks' sırasıyla temsiller döndürür. 'serializer.task_representation'
+    alt görevler hariç tek görevi serialize eder.
+    """
+    depth = subtask_depth(serializer.context)
+    request = serializer.context.get('request')
+    user = getattr(request, 'user', None)
+    if user is not None and not user.is_authenticated:
+        user = None
+
+    base = {task.id: serializer.task_representation(task) for task in tasks}
+    children = {}
+    frontier = list(base)
+    for level in range(depth + 1):
+        level_children = child_ids([task_id for task_id in frontier if task_id not in children])
+        for task_id in frontier:
+            children.setdefault(task_id, level_children.get(task_id, []))
+        if level == depth:
+            break
+
+        # Bir sonraki seviye: listede olmayan alt görevler tek sorguda yüklenir
+        next_ids = {child for task_id in frontier for child in children[task_id]}
+        missing = next_ids - base.keys()
+        if missing:
+            for task in task_queryset_plan(Task.objects.filter(id__in=missing), user):
+                base[task.id] = serializer.task_representation(task)
+        frontier = [task_id for task_id in next_ids if task_id in base]
+        if not frontier:
+            break
+
+    def nested(task_id, remaining):
+        data = dict(base[task_id])
+        kids = children.get(task_id, [])
+        if remaining > 0:
+            data['subtasks'] = [nested(child, remaining - 1) for child in kids if child in base]
+        else:
+            data['subtasks'] = kids
+        return data
+
+    if depth == 0:
+        for task_id, data in base.items():
+            data['subtasks'] = children.get(task_id, [])
+        return [base[task.id] for task in tasks]
+    return [nested(task.id, depth) for task in tasks]
+
+# --- HİYERARŞİ İNDEKSİ ---
+class TaskTreeCycleError(ValueError):
+    pass
+
+def path_ids(path):
+    return [int(part) for part in path.strip('/').split('/') if part]
+
+def subtree_queryset(task, max_depth=None):
+    """Görev ve tüm alt görevleri (tek indeksli sorgu)."""
+    queryset = Task.objects.filter(tree_path__startswith=task.tree_path)
+    if max_depth is not None:
+        queryset = queryset.filter(tree_depth__lte=task.tree_depth + max_depth)
+    return queryset
+
+def ancestor_ids(task):
+    """Kökten üst göreve kadar id'ler (görevin kendisi hariç)."""
+    return path_ids(task.tree_path)[:-1]
+
+def would_create_cycle(task, parent):
+    if parent is None or task.pk is None:
+        return False
+    return parent.pk == task.pk or task.pk in path_ids(parent.tree_path)
+
+def _shift_rollups(task_ids, assigned, completed):
+    if task_ids:
+        Task.objects.filter(id__in=task_ids).update(
+            subtree_assignment_count=Greatest(F('subtree_assignment_count') + assigned, Value(0)),
+            subtree_completed_count=Greatest(F('subtree_completed_count') + completed, Value(0)),
+            change_version=next_change_version()
+        )
+
+def update_tree_path(task):
+    """Görevin (ve varsa alt ağacının) yolunu üst görevine göre yeniden yazar."""
+    with transaction.atomic():
+        parent_path = '/'
+        if task.parent_task_id:
+            parent_path = Task.objects.filter(id=task.parent_task_id).values_list('tree_path', flat=True).first() or '/'
+            if task.id in path_ids(parent_path):
+                raise TaskTreeCycleError(f"Task {task.id} cannot be moved under its own subtree.")
+
+        new_path = f"{parent_path}{task.id}/"
+        new_depth = len(path_ids(parent_path))
+        old = Task.objects.filter(id=task.id).values_list('tree_path', 'tree_depth').first()
+        old_path, old_depth = old if old else ('', 0)
+        if old_path == new_path:
+            return
+
+        if not old_path:
+            Task.objects.filter(id=task.id).update(tree_path=new_path, tree_depth=new_depth)
+        else:
+            # Alt ağaç: önek değiştirilir, derinlik farkı eklenir (tek UPDATE)
+            moved = Task.objects.filter(tree_path__startswith=old_path)
+            moved_ids = list(moved.exclude(id=task.id).values_list('id', flat=True))
+            moved.update(
+                tree_path=Concat(Value(new_path), Substr('tree_path', len(old_path) + 1)),
+                tree_depth=F('tree_depth') + (new_depth - old_depth),
+                change_version=next_change_version()
+            )
+            # Alt ağaç toplamları eski üst zincirden düşülür, yenisine eklenir
+            totals = Task.objects.filter(id=task.id).values_list(
+                'subtree_assignment_count', 'subtree_completed_count'
+            ).first()
+            if totals and any(totals):
+                _shift_rollups(path_ids(old_path)[:-1], -totals[0], -totals[1])
+                _shift_rollups(path_ids(parent_path), totals[0], totals[1])
+            if moved_ids:
+                audience = set(Task.objects.filter(id__in=moved_ids).values_list('created_by_id', flat=True))
+                audience.update(TaskAssignment.objects.filter(task_id__in=moved_ids).values_list('user_id', flat=True))
+                etags.bump('tasks', *audience)
+        task.tree_path = new_path
+        task.tree_depth = new_depth
+
+def assign_root_paths(task_ids):
+    """bulk_create ile oluşturulan kök görevlerin yolları (sinyal çalışmaz)."""
+    Task.objects.filter(id__in=task_ids).update(
+        tree_path=Concat(Value('/'), Cast('id', output_field=CharField()), Value('/')),
+        tree_depth=0
+    )
+
+def build_tree_paths(parents):
+    """{id: parent_id} -> {id: (tree_path, tree_depth)}; döngüler en küçük id'den kırılır."""
+    children = {}
+    for task_id, parent_id in parents.items():
+        children.setdefault(parent_id if parent_id in parents else None, []).append(task_id)
+
+    paths = {}
+    def walk(roots):
+        stack = [(task_id, '/', 0) for task_id in roots]
+        while stack:
+            task_id, parent_path, depth = stack.pop()
+            if task_id in paths:
+                continue
+            paths[task_id] = (f"{parent_path}{task_id}/", depth)
+            stack.extend((child, paths[task_id][0], depth + 1) for child in children.get(task_id, []))
+
+    walk(children.get(None, []))
+    while len(paths) < len(parents):
+        walk([min(parents.keys() - paths.keys())])
+    return paths
+
+def rebuild_tree_paths(batch_size=500):
+    """Tüm görevlerin yollarını parent_task'tan yeniden hesaplar; değişen kayıt sayısını döndürür."""
+    current = {task_id: (parent_id, path, depth) for task_id, parent_id, path, depth in Task.objects.values_list(
+        'id', 'parent_task_id', 'tree_path', 'tree_depth'
+    )}
+    paths = build_tree_paths({task_id: row[0] for task_id, row in current.items()})
+    stale = [
+        Task(id=task_id, tree_path=path, tree_depth=depth)
+        for task_id, (path, depth) in paths.items()
+        if current[task_id][1:] != (path, depth)
+    ]
+    Task.objects.bulk_update(stale, ['tree_path', 'tree_depth'], batch_size=batch_size)
+    return len(stale)
+
+# --- SIGNALS ---
+@receiver(post_init, sender=Task)
+def task_tree_snapshot(sender, instance, **kwargs):
+    # Ertelenmiş alanlara dokunmamak için __dict__ okunur
+    instance._tree_parent_id = instance.__dict__.get('parent_task_id')
+
+@receiver(post_save, sender=Task)
+def task_tree_signal(sender, instance, created, **kwargs):
+    if 'parent_task_id' not in instance.__dict__:
+        return
+    previous = instance._tree_parent_id
+    instance._tree_parent_id = instance.parent_task_id
+    if created or previous != instance.parent_task_id or not instance.__dict__.get('tree_path', True):
+        update_tree_path(instance)
@@ -0,0 +1,532 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from . import checks
+from . import counters
+from . import deadlines
+from . import dependency_index
+from . import etags
+from . import logging_utils
+from . import onboarding
+from . import presence
+from . import push
+from .consumers import EventConsumer
+from .models import (
+    ActivityLog, ChangeCounter, Comment, Department, ExportJob, ExportWatermark, PipelineStage,
+    PipelineTemplate, PresentationPeriod, Task, TaskAssignment, TaskDependency, TaskAttachment, Tenant, UserProfile, current_change_cursor, next_change_version
+)
+from .services import export_period_folder_name, ingest_interaction_batch
+
+# /api/tasks/ sorgu bütçesi: görev, atama ve ek sayısından bağımsız sabit
+# (core/task_tree.py task_queryset_plan + tek seferlik alt görev çözümü +
+# soğuk önbellekte grup üyeleri, core/presence.py tenant_members).
+TASK_LIST_QUERY_BUDGET = 6
+
+class TaskListQueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name='Grup', tenant_id='QB1')
+        department = Department.objects.create(name='Ar-Ge', tenant=cls.tenant)
+        cls.users = []
+        for i in range(4):
+            user = User.objects.create(username=f'budget{i}', first_name=f'Ad{i}')
+            UserProfile.objects.create(user=user, tenant=cls.tenant, department=department, gender='female')
+            cls.users.append(user)
+        cls.owner = cls.users[0]
+
+    def setUp(self):
+        # Her test aynı (soğuk) presence önbelleğiyle başlar
+        caches['default'].clear()
+
+    def create_tasks(self, count):
+        # Sinyaller atlanır; yalnızca liste uç noktasının okuduğu ilişkiler kurulur
+        tasks = Task.objects.bulk_create([
+            Task(title=f'Görev {i}', created_by=self.owner, tenant=self.tenant) for i in range(count)
+        ])
+        parents = {task.id: (tasks[i - 1].id if i % 3 == 0 and i else None) for i, task in enumerate(tasks)}
+        for task in tasks:
+            task.parent_task_id = parents[task.id]
+        Task.objects.bulk_update(tasks, ['parent_task'])
+        TaskAssignment.objects.bulk_create([
+            TaskAssignment(task=task, user=user) for task in tasks for user in self.users[1:]
+        ])
+        TaskAttachment.objects.bulk_create([
+            TaskAttachment(task=task, uploaded_by=user, file=f'task_files/{task.id}_{user.id}.txt', file_type='instruction')
+            for task in tasks for user in self.users[:2]
+        ])
+
+    def assert_list_budget(self, count):
+        self.create_tasks(count)
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        with self.assertNumQueries(TASK_LIST_QUERY_BUDGET):
+            response = client.get('/api/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), count)
+        self.assertEqual(len(response.json()[0]['assignments']), 3)
+
+    def test_10_tasks(self):
+        self.assert_list_budget(10)
+
+    def test_100_tasks(self):
+        self.assert_list_budget(100)
+
+    def test_1000_tasks(self):
+        self.assert_list_budget(1000)
+
+
+def in_thread(target, *args):
+    """target'ı kendi veritabanı bağlantısıyla ayrı bir thread'de başlatır."""
+    def run():
+        try:
+            target(*args)
+        finally:
+            connection.close()
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+class ChangeVersionTests(TransactionTestCase):
+    def setUp(self):
+        ChangeCounter.objects.get_or_create(pk=1)
+
+    def test_cursor_advances_after_commit(self):
+        before = current_change_cursor()
+        with transaction.atomic():
+            version = next_change_version()
+        self.assertGreater(version, before)
+        self.assertEqual(current_change_cursor(), version)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Eşzamanlı transaction gerektirir')
+    def test_open_transaction_holds_cursor_without_blocking_writers(self):
+        allocated, release = threading.Event(), threading.Event()
+        versions = {}
+
+        def slow_writer():
+            with transaction.atomic():
+                versions['slow'] = next_change_version()
+                allocated.set()
+                release.wait(10)
+
+        def fast_writer():
+            with transaction.atomic():
+                versions['fast'] = next_change_version()
+
+        slow = in_thread(slow_writer)
+        self.assertTrue(allocated.wait(10))
+        fast = in_thread(fast_writer)
+        fast.join(5)
+        # Ortak sayaç kilidi yok: açık transaction diğer yazıcıyı bekletmez
+        self.assertFalse(fast.is_alive())
+        self.assertGreater(versions['fast'], versions['slow'])
+        # Açık transaction'ın sürümü commit edilene kadar imleç onun altında kalır
+        self.assertEqual(current_change_cursor(), versions['slow'] - 1)
+
+        release.set()
+        slow.join(10)
+        self.assertGreaterEqual(current_change_cursor(), versions['fast'])
+
+@skipUnless(connection.vendor == 'postgresql', 'Satır kilitleri PostgreSQL gerektirir')
+class CounterLockOrderTests(TransactionTestCase):
+    ROUNDS = 25
+
+    def setUp(self):
+        ChangeCounter.objects.get_or_create(pk=1)
+        self.tenant = Tenant.objects.create(name='Kilit', tenant_id='LOCK1')
+        self.owner = User.objects.create(username='lock_owner')
+        self.worker = User.objects.create(username='lock_worker')
+        for user in (self.owner, self.worker):
+            UserProfile.objects.create(user=user, tenant=self.tenant)
+        self.parent = Task.objects.create(title='Üst', created_by=self.owner, tenant=self.tenant)
+        self.child = Task.objects.create(title='Alt', created_by=self.owner, tenant=self.tenant, parent_task=self.parent)
+        self.assignment = TaskAssignment.objects.create(task=self.child, user=self.worker)
+
+    def run_all(self, *workers):
+        errors = []
+        def guarded(worker):
+            try:
+                for round in range(self.ROUNDS):
+                    worker(round)
+            except Exception as e:
+                errors.append(e)
+        threads = [in_thread(guarded, worker) for worker in workers]
+        for thread in threads:
+            thread.join(60)
+        return errors
+
+    def test_assignment_comment_and_expiry_writes_do_not_deadlock(self):
+        def toggle_assignment(round):
+            with transaction.atomic():
+                assignment = TaskAssignment.objects.get(pk=self.assignment.pk)
+                assignment.is_completed = not assignment.is_completed
+                assignment.save()
+
+        def comment(round):
+            Comment.objects.create(task=self.child, user=self.owner, content=f'Yorum {round}')
+
+        def expire(round):
+            task = Task.objects.create(
+                title=f'Süreli {round}', created_by=self.owner, tenant=self.tenant,
+                parent_task=self.child, due_date=timezone.now() - timedelta(minutes=1)
+            )
+            TaskAssignment.objects.create(task=task, user=self.worker)
+            deadlines.process_expiries(timezone.now())
+
+        self.assertEqual(self.run_all(toggle_assignment, comment, expire), [])
+        self.assertEqual(counters.rebuild_counters(), 0)
+
+class AutoExportWatermarkMixin:
+    workers = 1
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name='Dışa aktarım', tenant_id='EXP1')
+        self.user = User.objects.create(username='export_user')
+        UserProfile.objects.create(user=self.user, tenant=self.tenant)
+        today = timezone.localdate()
+        self.period = PresentationPeriod.objects.create(
+            name='Dönem', start_date=today - timedelta(days=2), end_date=today + timedelta(days=1)
+        )
+        self.period.tenants.add(self.tenant)
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
+
+    def export(self, **options):
+        with override_settings(BASE_DIR=self.export_dir):
+            call_command('auto_export_logs', workers=self.workers, stdout=io.StringIO(), **options)
+
+    def exported_sessions(self):
+        path = os.path.join(self.export_dir, 'research_exports', export_period_folder_name(self.period), 'ALL_combined.csv')
+        if not os.path.exists(path):
+            return []
+        with open(path, newline='', encoding='utf-8') as f:
+            return [row['session_id'] for row in csv.DictReader(f)]
+
+    def log(self, session_id, created_at):
+        return ActivityLog.objects.create(user=self.user, session_id=session_id, event_type='task_moved', created_at=created_at)
+
+    def test_backdated_row_does_not_carry_watermark_past_settling_row(self):
+        self.export()
+        now = timezone.now()
+        # Daha küçük id'li satır henüz bekleme süresinde; daha büyük id'li satır geriye tarihli
+        settling = self.log('settling', now)
+        self.log('backdated', now - timedelta(hours=2))
+
+        self.export(settle_seconds=60)
+        self.assertEqual(self.exported_sessions(), [])
+        self.assertLess(ExportWatermark.objects.get(period=self.period, tenant=self.tenant).last_log_id, settling.id)
+
+        ActivityLog.objects.filter(id=settling.id).update(created_at=now - timedelta(minutes=5))
+        self.export(settle_seconds=60)
+        self.assertEqual(self.exported_sessions(), ['settling', 'backdated'])
+
+        self.export(settle_seconds=60)
+        self.assertEqual(self.exported_sessions(), ['settling', 'backdated'])
+
+class AutoExportWatermarkTests(AutoExportWatermarkMixin, TestCase):
+    pass
+
+@skipUnless(connection.vendor == 'postgresql', 'Worker süreçleri commit edilmiş veriyi okur')
+class ParallelAutoExportWatermarkTests(AutoExportWatermarkMixin, TransactionTestCase):
+    workers = 2
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'checks'}}
+
+class SharedStateCheckTests(TestCase):
+    def error_ids(self):
+        return [error.id for error in checks.shared_state_check(None)]
+
+    @override_settings(WEB_WORKERS=1, CACHES=LOCMEM, PRESENCE_BACKEND='core.presence.LocalPresenceBackend')
+    def test_single_worker_may_use_process_local_state(self):
+        self.assertEqual(self.error_ids(), [])
+
+    @override_settings(WEB_WORKERS=4, CACHES=LOCMEM, PRESENCE_BACKEND='core.presence.LocalPresenceBackend')
+    def test_multiple_workers_require_shared_cache_and_presence(self):
+        self.assertEqual(self.error_ids(), ['core.E002', 'core.E003'])
+
+class UserEtagSignalTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.tenant = Tenant.objects.create(name='Grup', tenant_id='ET1')
+        self.user = User.objects.create(username='etag', first_name='Ada')
+        UserProfile.objects.create(user=self.user, tenant=self.tenant, gender='female')
+        self.stamp = etags.get_stamp('users', self.tenant.id)
+
+    def test_login_does_not_bump_users_stamp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, User.objects.get(pk=self.user.pk))
+            user = User.objects.get(pk=self.user.pk)
+            user.is_staff = True
+            user.save()
+        self.assertEqual(etags.get_stamp('users', self.tenant.id), self.stamp)
+
+    def test_serialized_field_change_bumps_users_stamp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.get(pk=self.user.pk)
+            user.first_name = 'Grace'
+            user.save()
+        self.assertNotEqual(etags.get_stamp('users', self.tenant.id), self.stamp)
+
+class InteractionBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='researcher')
+        self.other = User.objects.create(username='other')
+        # Arka plan yazıcısı başlatılmaz; tampon yalnızca açık flush ile yazılır
+        self.buffer = logging_utils.ActivityLogBuffer(flush_interval=3600)
+        patches = [
+            mock.patch.object(logging_utils, 'buffer', self.buffer),
+            mock.patch.object(self.buffer, '_ensure_thread'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def enqueue(self, user, session_id, event_type):
+        self.buffer.enqueue(ActivityLog(user=user, session_id=session_id, event_type=event_type, created_at=timezone.now()))
+
+    def test_batch_flushes_only_its_own_session(self):
+        self.enqueue(self.user, 's1', 'before_batch')
+        self.enqueue(self.user, 's2', 'other_session')
+        self.enqueue(self.other, 's1', 'other_user')
+
+        self.assertTrue(ingest_interaction_batch(self.user, 's1', 1, [('click', {}, None)]))
+        self.assertEqual(
+            list(ActivityLog.objects.order_by('id').values_list('event_type', flat=True)), ['before_batch', 'click']
+        )
+        self.assertEqual([log.event_type for log in self.buffer._queue], ['other_session', 'other_user'])
+
+    def test_duplicate_seq_is_ignored(self):
+        self.assertTrue(ingest_interaction_batch(self.user, 's1', 1, [('click', {}, None)]))
+        self.assertFalse(ingest_interaction_batch(self.user, 's1', 1, [('click', {}, None)]))
+        self.assertTrue(ingest_interaction_batch(self.user, 's2', 1, [('click', {}, None)]))
+        self.assertEqual(ActivityLog.objects.filter(event_type='click').count(), 2)
+
+class ExportJobStatusTests(TestCase):
+    def setUp(self):
+        self.requester = User.objects.create(username='requester')
+        self.other = User.objects.create(username='other')
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.job = ExportJob.objects.create(kind='auto_export', dedupe_key='auto_export', requested_by=self.requester)
+
+    def status_of(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(f'/api/research/exports/{self.job.id}/')
+
+    def test_full_export_job_is_private_to_requester_and_staff(self):
+        self.assertEqual(self.status_of(self.other).status_code, 404)
+
+        response = self.status_of(self.requester)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('result_path', response.data)
+        self.assertIn('result_path', self.status_of(self.staff).data)
+
+class PresenceSnapshotTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.tenant = Tenant.objects.create(name='Boş', tenant_id='PR1')
+
+    def assert_stable_empty_cursor(self):
+        first = presence.snapshot(self.tenant.id)
+        self.assertEqual(first['statuses'], {})
+        self.assertTrue(first['cursor'].endswith('.0'))
+        again = presence.snapshot(self.tenant.id, since=first['cursor'])
+        self.assertEqual(again, {'cursor': first['cursor'], 'full': False, 'statuses': {}})
+        self.assertEqual(presence.tenant_cursor(self.tenant.id), first['cursor'])
+
+    def test_tenant_without_members_has_stable_cursor(self):
+        with mock.patch.object(presence, '_backend', presence.LocalPresenceBackend()):
+            self.assert_stable_empty_cursor()
+
+    def test_tenant_without_members_has_stable_cursor_in_cache_backend(self):
+        with mock.patch.object(presence, '_backend', presence.CachePresenceBackend()):
+            self.assert_stable_empty_cursor()
+
+    def test_since_cursor_returns_only_changed_statuses(self):
+        users = [User.objects.create(username=f'presence{i}') for i in range(2)]
+        for user in users:
+            UserProfile.objects.create(user=user, tenant=self.tenant, gender='female')
+        with mock.patch.object(presence, '_backend', presence.LocalPresenceBackend()):
+            first = presence.snapshot(self.tenant.id)
+            self.assertEqual(first['statuses'], {str(users[0].id): 'offline', str(users[1].id): 'offline'})
+            presence.backend().set(users[1].id, ('online', time.time()))
+            delta = presence.snapshot(self.tenant.id, since=first['cursor'])
+            self.assertEqual(delta['statuses'], {str(users[1].id): 'online'})
+            self.assertFalse(delta['full'])
+            self.assertTrue(presence.snapshot(self.tenant.id, since='stale.1')['full'])
+
+class PushTicketTests(TransactionTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create(username='pushed')
+
+    def connect(self, query):
+        async def attempt():
+            communicator = WebsocketCommunicator(EventConsumer.as_asgi(), f'/ws/events/?{query}')
+            connected, code = await communicator.connect()
+            await communicator.disconnect()
+            return connected, code
+        return async_to_sync(attempt)()
+
+    def test_ticket_is_single_use_and_token_is_refused(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ticket = client.post('/api/push/ticket/').data['ticket']
+
+        self.assertEqual(self.connect(f'ticket={ticket}'), (True, None))
+        self.assertEqual(self.connect(f'ticket={ticket}'), (False, 4401))
+        token = Token.objects.create(user=self.user)
+        self.assertEqual(self.connect(f'token={token.key}'), (False, 4401))
+
+    def test_ticket_of_deactivated_user_is_refused(self):
+        ticket = push.issue_ticket(self.user)
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.connect(f'ticket={ticket}'), (False, 4401))
+
+class CounterRollupTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create(username='owner')
+        self.member = User.objects.create(username='member')
+        self.root = Task.objects.create(title='Kök', created_by=self.owner)
+        self.child = Task.objects.create(title='Alt', created_by=self.owner, parent_task=self.root)
+        self.leaf = Task.objects.create(title='Yaprak', created_by=self.owner, parent_task=self.child)
+
+    def counts(self, task):
+        task.refresh_from_db()
+        return (
+            task.assignment_count, task.completed_count,
+            task.subtree_assignment_count, task.subtree_completed_count
+        )
+
+    def test_assignment_changes_roll_up_to_ancestors(self):
+        assignment = TaskAssignment.objects.create(task=self.leaf, user=self.member)
+        TaskAssignment.objects.create(task=self.child, user=self.owner)
+        self.assertEqual(self.counts(self.root), (0, 0, 2, 0))
+
+        assignment.is_completed = True
+        assignment.save()
+        # Aynı durumla yeniden kaydetmek sayacı ikinci kez artırmaz
+        assignment.save()
+        self.assertEqual(self.counts(self.leaf), (1, 1, 1, 1))
+        self.assertEqual(self.counts(self.root), (0, 0, 2, 1))
+
+        assignment.delete()
+        self.assertEqual(self.counts(self.child), (1, 0, 1, 0))
+        self.assertEqual(self.counts(self.root), (0, 0, 1, 0))
+        self.assertEqual(counters.rebuild_counters(), 0)
+
+    def test_moving_a_subtree_moves_its_totals(self):
+        TaskAssignment.objects.create(task=self.leaf, user=self.member, is_completed=True)
+        other_root = Task.objects.create(title='Diğer', created_by=self.owner)
+        self.child.parent_task = other_root
+        self.child.save()
+        self.assertEqual(self.counts(self.root)[2:], (0, 0))
+        self.assertEqual(self.counts(other_root)[2:], (1, 1))
+        self.assertEqual(counters.rebuild_counters(), 0)
+
+class DeltaSyncTests(TransactionTestCase):
+    # Her istek kendi transaction'ını commit eder; imleç commit edilmiş sürümleri izler
+    def setUp(self):
+        ChangeCounter.objects.get_or_create(pk=1)
+        self.owner = User.objects.create(username='owner')
+        self.member = User.objects.create(username='member')
+        self.outsider = User.objects.create(username='outsider')
+        self.task = Task.objects.create(title='Arşivlenecek', created_by=self.owner)
+        TaskAssignment.objects.create(task=self.task, user=self.member)
+        self.kept = Task.objects.create(title='Kalan', created_by=self.owner)
+        TaskAssignment.objects.create(task=self.kept, user=self.member)
+
+    def changes(self, user, since):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/tasks/changes/', {'since': since}).data
+
+    def test_archived_task_is_reported_as_deleted_to_its_audience_only(self):
+        cursor = self.changes(self.member, '')['cursor']
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.post(f'/api/tasks/{self.task.id}/archive_task/').status_code, 200)
+        self.kept.title = 'Kalan (güncel)'
+        self.kept.save()
+
+        data = self.changes(self.member, cursor)
+        self.assertFalse(data['full'])
+        self.assertGreater(data['cursor'], cursor)
+        self.assertEqual([item['id'] for item in data['deleted'] if item['model'] == 'task'], [self.task.id])
+        self.assertEqual([task['id'] for task in data['tasks']], [self.kept.id])
+
+        self.assertEqual(self.changes(self.outsider, cursor)['deleted'], [])
+        self.assertEqual(self.changes(self.member, data['cursor'])['deleted'], [])
+
+    def test_unassigned_member_sees_the_task_removed(self):
+        cursor = self.changes(self.member, '')['cursor']
+        TaskAssignment.objects.filter(task=self.kept, user=self.member).get().delete()
+        deleted = self.changes(self.member, cursor)['deleted']
+        self.assertIn(self.kept.id, [item['id'] for item in deleted if item['model'] == 'task'])
+
+class DependencyCycleTests(TestCase):
+    def setUp(self):
+        dependency_index.index.invalidate()
+        self.owner = User.objects.create(username='owner')
+        self.tasks = [Task.objects.create(title=f'T{i}', created_by=self.owner) for i in range(3)]
+
+    def link(self, source, target):
+        return dependency_index.save_dependency(
+            source, target, lambda tenant_id: TaskDependency.objects.create(source_task=source, target_task=target)
+        )
+
+    def test_edge_closing_a_cycle_is_rejected(self):
+        a, b, c = self.tasks
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link(a, b)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link(b, c)
+        with self.assertRaises(dependency_index.DependencyCycleError):
+            self.link(c, a)
+        with self.assertRaises(dependency_index.DependencyCycleError):
+            self.link(a, a)
+        self.assertEqual(TaskDependency.objects.count(), 2)
+        self.assertEqual(dependency_index.topological_order(self.owner, None), ([a.id, b.id, c.id], []))
+
+class OnboardingTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.tenant = Tenant.objects.create(name='Grup', tenant_id='ON1')
+        admin = User.objects.create(username='admin', is_superuser=True)
+        UserProfile.objects.create(user=admin, tenant=self.tenant, gender='female')
+        today = timezone.localdate()
+        period = PresentationPeriod.objects.create(
+            name='Dönem', start_date=today - timedelta(days=1), end_date=today + timedelta(days=1)
+        )
+        period.tenants.add(self.tenant)
+        template = PipelineTemplate.objects.create(name='Taslak', presentation_period=period)
+        for i in range(3):
+            PipelineStage.objects.create(template=template, title=f'Aşama {i}', order=i)
+        self.user = User.objects.create(username='newcomer')
+        UserProfile.objects.create(user=self.user, tenant=self.tenant, gender='female')
+
+    def test_setup_is_idempotent(self):
+        onboarding.setup_user(self.user.id)
+        onboarding.setup_user(self.user.id)
+        self.assertEqual(onboarding.provision_pipeline(self.user.id, self.tenant.id), [])
+
+        tasks = Task.objects.filter(assignments__user=self.user, is_pipeline_task=True)
+        self.assertEqual(sorted(tasks.values_list('title', flat=True)), ['Aşama 0', 'Aşama 1', 'Aşama 2'])
+        self.assertTrue(onboarding.is_ready(self.user.id))
+        self.assertFalse(onboarding.ensure_ready(self.user.id))
+        self.assertEqual(counters.rebuild_counters(), 0)
@@ -1,6 +1,5 @@
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import viewsets, status
-from django.core.management import call_command
 from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
@@ -11,15 +10,35 @@ from .models import (
     Task, Device, TaskNode, Tenant, UserProfile, TaskAssignment, 
     TaskDependency, TaskAttachment, Notification, Comment, PresentationPeriod,
     SurveyQuestion, SurveyResponse, PipelineTemplate, PipelineStage,
-    ActivityLog, ResearchUserAlias, PipelineQualitativeQuestion, PipelineQualitativeResponse
+    ActivityLog, PipelineQualitativeQuestion, PipelineQualitativeResponse,
+    ExportJob, record_task_tombstone
 )
 from .serializers import (
     TaskSerializer, DeviceSerializer, TaskNodeSerializer, UserSerializer, 
     TaskDependencySerializer, TaskAttachmentSerializer, UserRegistrationSerializer, 
-    NotificationSerializer, CommentSerializer, SurveyQuestionSerializer
+    NotificationSerializer, CommentSerializer, SurveyQuestionSerializer, ExportJobSerializer
 )
-from .logging_utils import log_event
-from .services import export_user_session_csv, generate_global_activity_csv
+from .logging_utils import log_event, buffer as activity_log_buffer
+from .services import (
+    stream_global_activity_csv,
+    parse_interaction_batch, validate_interaction_events, ingest_interaction_batch,
+    InteractionBatchError
+)
+from . import sync
+from . import etags
+from . import push
+from . import deadlines
+from . import notifications
+from . import export_jobs
+from . import presence
+from . import graph
+from . import counters
+from . import task_tree
+from .task_tree import task_queryset_plan
+from . import onboarding
+from . import dependency_index
+from .stats import user_stats
+from .etags import ConditionalListMixin
 
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
@@ -28,9 +47,7 @@ from django.db.models import Count, Q, Max
 from django.db.models.functions import TruncDate
 from datetime import timedelta
 from django.db import transaction
-import calendar
 import csv
-import hashlib
 import os
 from django.http import HttpResponse
 from rest_framework.permissions import IsAdminUser
@@ -55,9 +72,28 @@ def current_presentation(request):
     except:
         return Response({'error': 'Hata'}, status=400)
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    etag_resource = 'users'
+
+    def etag_scope_id(self, request):
+        profile = getattr(request.user, 'profile', None)
+        return profile.tenant_id if profile else None
+
+    def etag_extra(self, request):
+        # Çevrimiçi durumları zamana bağlı (30 sn pencere); grup presence sürümü
+        # yalnızca bir durum gerçekten değiştiğinde artar
+        tenant_id = self.etag_scope_id(request)
+        return presence.tenant_cursor(tenant_id) if tenant_id else ''
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        profile = getattr(self.request.user, 'profile', None) if self.request.user.is_authenticated else None
+        if self.action == 'list' and profile and profile.tenant_id:
+            context['presence_statuses'], _ = presence.current_statuses(profile.tenant_id)
+        return context
+
     def get_queryset(self):
         if not self.request.user.is_authenticated: 
             return User.objects.none()
@@ -79,79 +115,41 @@ class UserViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Kullanıcı profili bulunamadı.'}, status=404)
         
             profile = request.user.profile
-            profile.current_status = status
-            profile.save()
+            presence.set_status(request.user, status, profile.tenant_id)
+            push.publish('presence.changed', {'user_id': request.user.id, 'status': status}, tenant_id=profile.tenant_id)
 
+            data = {'status': 'Durum güncellendi', 'current': status}
             if status == 'offline':
-                    export_user_session_csv(request.user)
-                    print(f"Logout export error: {e}")
+                # Oturum dışa aktarımı arka planda; çıkış isteği beklemez
+                job = export_jobs.submit('user_session', user=request.user, requested_by=request.user)
+                data['export_job_id'] = job.id
 
-            return Response({'status': 'Durum güncellendi', 'current': status})
+            return Response(data)
         except Exception as e:
             return Response({'error': str(e)}, status=500)
     
     def list(self, request, *args, **kwargs):
         if request.user.is_authenticated and hasattr(request.user, 'profile'):
-            UserProfile.objects.filter(user=request.user).update(last_activity=timezone.now())
+            presence.heartbeat(request.user)
         return super().list(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post'])
+    def heartbeat(self, request):
+        if hasattr(request.user, 'profile'):
+            presence.heartbeat(request.user)
+        return Response(status=204)
+
     @action(detail=False, methods=['get'])
-    def stats(self, request):
-        user = request.user
-        today = timezone.localdate()
-
-        total_created = Task.objects.filter(created_by=user).count()
-        my_assignments = TaskAssignment.objects.filter(user=user)
-        total_assigned = my_assignments.count()
-        completed_assignments = my_assignments.filter(is_completed=True)
-        total_completed = completed_assignments.count()
-        total_failed = TaskAssignment.objects.filter(user=user, is_failed=True).count()
-
-        failed_tasks = Task.objects.filter(
-            assignments__user=user,
-            assignments__is_completed=False,
-            due_date__lt=timezone.now()
-        ).count()
-
-        # HAFTALIK GRAFİK
-        start_of_week = today - timedelta(days=today.weekday())
-        weekly_stats = []
-        for i in range(6): 
-            target_date = start_of_week + timedelta(days=i)
-            completed_on_day = completed_assignments.filter(completed_at__date=target_date)
-            daily_score = 0
-            for assign in completed_on_day:
-                task = assign.task
-                if task.due_date:
-                    d_date = timezone.localtime(task.due_date).date()
-                    if target_date <= d_date:
-                        daily_score += 1
-                    else:
-                        daily_score -= 1
-                else:
-                    daily_score += 1
-            weekly_stats.append(daily_score)
-
-        # AYLIK GRAFİK
-        import calendar
-        _, num_days = calendar.monthrange(today.year, today.month)
-        monthly_stats = [0] * num_days
-        this_month_completed = completed_assignments.filter(
-            completed_at__year=today.year,
-            completed_at__month=today.month
-        )
-        for assign in this_month_completed:
-            c_day = timezone.localtime(assign.completed_at).day
-            monthly_stats[c_day - 1] += 1
+    def presence(self, request):
+        profile = getattr(request.user, 'profile', None)
+        if not profile or not profile.tenant_id:
+            return Response({'error': 'Kullanıcı bir gruba atanmamış.'}, status=404)
+        presence.heartbeat(request.user)
+        return Response(presence.snapshot(profile.tenant_id, request.query_params.get('since')))
 
-        return Response({
-            'totalCreated': total_created,
-            'totalAssigned': total_assigned,
-            'totalCompleted': total_completed,
-            'totalFailed': failed_tasks,
-            'weeklyData': weekly_stats,
-            'monthlyData': monthly_stats
-        })
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        return Response(user_stats(request.user))
     
     @action(detail=False, methods=['get', 'patch'])
     def me(self, request):
@@ -197,6 +195,8 @@ class UserViewSet(viewsets.ModelViewSet):
         user = request.user
         session_id = request.headers.get('X-Session-ID', 'unknown')
 
+        # Oturumun tampondaki olayları, tamamlanma kaydından önce (transaction dışında) yazılır
+        activity_log_buffer.flush()
         with transaction.atomic():
             already_logged = ActivityLog.objects.select_for_update().filter(
                 user=user,
@@ -210,59 +210,129 @@ class UserViewSet(viewsets.ModelViewSet):
             log_event(user, session_id, 'experiment_completed', {
                 'username': user.username,
                 'deactivated_at': timezone.now().isoformat()
-            })
+            }, immediate=True)
 
-        # 2. Export user CSV
-            export_user_session_csv(user)
-            print(f"Deactivation export error: {e}")
-
-        # 3. Set inactive
+        # 2. Set inactive
         user.is_active = False
         user.save()
-        
-        # 4. Trigger final export
-        try:
-            call_command('auto_export_logs')
-        except Exception as e:
-            print(f"Final export error: {e}")
-            
-        return Response({'status': 'success', 'message': 'Hesabınız pasif hale getirildi ve verileriniz dışa aktarıldı.'})
+
+        # 3. Queue user CSV + final export (aynı anda gelen deaktivasyonlar tek tam dışa aktarımda birleşir)
+        jobs = [
+            export_jobs.submit('user_session', user=user, requested_by=user),
+            export_jobs.submit('auto_export', requested_by=user),
+        ]
+
+        return Response({
+            'status': 'success',
+            'message': 'Hesabınız pasif hale getirildi, verileriniz dışa aktarılıyor.',
+            'export_job_ids': [job.id for job in jobs]
+        })
         
 @method_decorator(csrf_exempt, name='dispatch')
 class TaskNodeViewSet(viewsets.ModelViewSet):
     queryset = TaskNode.objects.all()
     serializer_class = TaskNodeSerializer
 
-class TaskDependencyViewSet(viewsets.ModelViewSet):
+class TaskDependencyViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = TaskDependency.objects.all()
     serializer_class = TaskDependencySerializer
+    etag_resource = 'dependencies'
+
+    def get_queryset(self):
+        if not self.request.user.is_authenticated:
+            return TaskDependency.objects.none()
+        return dependency_index.visible_dependencies(self.request.user)
+
+    def etag_scope_id(self, request):
+        return push.tenant_of(request.user)
+
+    def etag_extra(self, request):
+        # Görünen kenarlar kullanıcının görev kümesine de bağlı
+        return etags.get_stamp('tasks', request.user.id)
 
     def perform_create(self, serializer):
+        from rest_framework.exceptions import ValidationError
         source_task = serializer.validated_data.get('source_task')
         target_task = serializer.validated_data.get('target_task')
 
         if not (source_task.is_pipeline_task or target_task.is_pipeline_task):
             if source_task.due_date and target_task.due_date:
                 if source_task.due_date > target_task.due_date:
-                    from rest_framework.exceptions import ValidationError
                     raise ValidationError("Kaynak görevin süresi, hedef görevden sonra bitemez!")
 
-        serializer.save()
+        try:
+            dependency = dependency_index.save_dependency(
+                source_task, target_task, lambda tenant_id: serializer.save(tenant_id=tenant_id)
+            )
+        except dependency_index.DependencyCycleError:
+            raise ValidationError("Bu bağlantı görevler arasında döngü oluşturur!")
+        push.publish('dependency.created', {
+            'dependency_id': dependency.id,
+            'source_task': dependency.source_task_id,
+            'target_task': dependency.target_task_id
+        }, tenant_id=push.tenant_of(self.request.user))
+
+    def perform_update(self, serializer):
+        from rest_framework.exceptions import ValidationError
+        source_task = serializer.validated_data.get('source_task', serializer.instance.source_task)
+        target_task = serializer.validated_data.get('target_task', serializer.instance.target_task)
+        try:
+            # Kenarın eski hali döngü kontrolünde yok sayılır
+            dependency = dependency_index.save_dependency(
+                source_task, target_task, lambda tenant_id: serializer.save(tenant_id=tenant_id),
+                dependency=serializer.instance
+            )
+        except dependency_index.DependencyCycleError:
+            raise ValidationError("Bu bağlantı görevler arasında döngü oluşturur!")
+        push.publish('dependency.updated', {
+            'dependency_id': dependency.id,
+            'source_task': dependency.source_task_id,
+            'target_task': dependency.target_task_id
+        }, tenant_id=push.tenant_of(self.request.user))
+
+    @action(detail=False, methods=['get'])
+    def order(self, request):
+        """Grubun görevleri bağlılık sırasıyla (topolojik); döngüdekiler ayrıca."""
+        order, cyclic = dependency_index.topological_order(request.user, push.tenant_of(request.user))
+        return Response({'order': order, 'cyclic': cyclic})
+
+    def perform_destroy(self, instance):
+        payload = {'dependency_id': instance.id}
+        instance.delete()
+        push.publish('dependency.deleted', payload, tenant_id=push.tenant_of(self.request.user))
 
 @method_decorator(csrf_exempt, name='dispatch')
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     parser_classes = (MultiPartParser, FormParser, JSONParser)
+    etag_resource = 'tasks'
+
+    def etag_extra(self, request):
+        # Yanıt atanan kişilerin profilini ve çevrimiçi durumunu da içerir;
+        # grubun kullanıcı damgası ve presence sürümü ETag'e katılır
+        tenant_id = push.tenant_of(request.user)
+        if not tenant_id:
+            return ''
+        return f"{etags.get_stamp('users', tenant_id)}:{presence.tenant_cursor(tenant_id)}"
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        tenant_id = push.tenant_of(self.request.user) if self.request.user.is_authenticated else None
+        if self.action == 'list' and tenant_id:
+            # ETag'deki presence sürümüyle aynı anlık görüntü; kullanıcı başına okuma yapılmaz
+            context['presence_statuses'], _ = presence.current_statuses(tenant_id)
+        return context
 
     def get_queryset(self):
         if not self.request.user.is_authenticated:
             return Task.objects.none()
         
         user = self.request.user
-        return Task.objects.filter(
+        queryset = Task.objects.filter(
             Q(created_by=user) | Q(assignments__user=user)
         ).distinct()
+        return task_queryset_plan(queryset, user)
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -299,6 +369,7 @@ class TaskViewSet(viewsets.ModelViewSet):
             node.position_x = x
             node.position_y = y
             node.save()
+            push.publish('node.moved', {'task_id': task.id, 'node_id': node.id}, user_ids=[request.user.id])
 
             return Response({'status': 'Yörünge sabitlendi', 'id': node.id, 'pos': {'x': x, 'y': y}})
             
@@ -306,54 +377,67 @@ class TaskViewSet(viewsets.ModelViewSet):
             print(f"💥 Backend Hatası: {e}")
             return Response({'error': str(e)}, status=500)
 
-    @action(detail=False, methods=['post'])
-    def check_deadlines(self, request):
+    @action(detail=True, methods=['get'])
+    def subtree(self, request, pk=None):
+        """Görev ve tüm alt görevleri düz liste olarak; '?max_depth=N' ile sınırlanabilir."""
+        task = self.get_object()
         try:
-            now = timezone.now()
-            
-            warning_time = now + timedelta(hours=1)
-            tasks_near_deadline = Task.objects.filter(
-                status='active', 
-                warning_sent=False, 
-                due_date__lte=warning_time, 
-                due_date__gt=now
+            max_depth = int(request.query_params['max_depth']) if 'max_depth' in request.query_params else None
+        except ValueError:
+            return Response({'error': 'max_depth sayı olmalıdır.'}, status=400)
+        tasks = task_queryset_plan(task_tree.subtree_queryset(task, max_depth).order_by('tree_depth', 'id'), request.user)
+        return Response(self.get_serializer(tasks, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def ancestors(self, request, pk=None):
+        """Kökten üst göreve kadar zincir (görevin kendisi hariç)."""
+        task = self.get_object()
+        chain = Task.objects.filter(id__in=task_tree.ancestor_ids(task)).order_by('tree_depth').values(
+            'id', 'title', 'status', 'parent_task', 'tree_depth'
+        )
+        return Response(list(chain))
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta senkronizasyonu: '?since=<cursor>' sonrasında değişen görevleri,
+        bağlılıkları ve silinen kayıtları döndürür. İmleç yoksa ya da iz
+        kayıtları budanmışsa tam liste döner ('full': True).
+        """
+        user = request.user
+        next_cursor, pruned_through = sync.cursor_state()
+        since = sync.parse_cursor(request.query_params.get('since'))
+        full = since is None or since < pruned_through
+
+        if full:
+            tasks = self.get_queryset()
+            deleted = []
+        else:
+            deleted = sync.deleted_since(user, since)
+            # Silinen/arşivlenen görev aynı yanıtta 'tasks' içinde de dönmez
+            removed_ids = [item['id'] for item in deleted if item['model'] == 'task']
+            tasks = task_queryset_plan(
+                Task.objects.filter(id__in=sync.changed_task_ids(user, since)).exclude(id__in=removed_ids), user
             )
 
-            for task in tasks_near_deadline:
-                for assignment in task.assignments.all():
-                    if not assignment.is_completed:
-                        user_settings = getattr(assignment.user, 'profile', None) and assignment.user.profile.notification_settings
-                        if not user_settings or user_settings.get('deadline_warning', True):
-                            Notification.objects.create(
-                                user=assignment.user,
-                                title="⏳ Son 1 Saat!",
-                                message=f"'{task.title}' görevi için son 1 saatin kaldı!",
-                                notification_type="deadline",
-                                task=task
-                            )
-                task.warning_sent = True
-                task.save()
-
-            expired_tasks = Task.objects.filter(status='active', due_date__lte=now)
-
-            for task in expired_tasks:
-                for assignment in task.assignments.all():
-                    if not assignment.is_completed and not assignment.is_failed:
-                        assignment.is_failed = True 
-                        assignment.save()
-                        
-                        user_settings = getattr(assignment.user, 'profile', None) and assignment.user.profile.notification_settings
-                        if not user_settings or user_settings.get('deadline', True):
-                            Notification.objects.create(
-                                user=assignment.user,
-                                title="❌ Süre Doldu",
-                                message=f"'{task.title}' görevinin süresi doldu ve erişim kapatıldı.",
-                                notification_type="deadline",
-                                task=task
-                            )
-
-            return Response({"status": "Deadlines checked"})
-            
+        return Response({
+            'cursor': next_cursor,
+            'full': full,
+            'tasks': self.get_serializer(tasks, many=True).data,
+            'dependencies': TaskDependencySerializer(sync.changed_dependencies(user, None if full else since), many=True).data,
+            'deleted': deleted
+        })
+
+    @action(detail=False, methods=['post'])
+    def check_deadlines(self, request):
+        # Uyarı/bitiş işlemleri core/deadlines.py'de sunucu tarafında yapılır;
+        # bu çağrı yalnızca sıradaki sınır geçtiyse motoru bir kez tetikler.
+        try:
+            next_check = deadlines.run_if_due()
+            return Response({
+                "status": "Deadlines checked",
+                "next_check": next_check.isoformat() if next_check else None
+            })
         except Exception as e:
             print(f"Deadline Check Hatası: {e}")
             return Response({"status": "Error", "detail": str(e)}, status=500)
@@ -366,39 +450,42 @@ class TaskViewSet(viewsets.ModelViewSet):
             'task_id': task.id,
             'parent_task_id': task.parent_task.id if task.parent_task else None
         })
+        push.publish('task.created', {'task_id': task.id}, tenant_id=push.tenant_of(self.request.user))
 
-        for assignment in task.assignments.all():
-            user = assignment.user
-            if user == self.request.user: continue
-            
-            user_settings = getattr(user, 'profile', None) and user.profile.notification_settings
-            if not user_settings or user_settings.get('assignment', True):
-                Notification.objects.create(
-                    user=user,
-                    task=task,
-                    title="Yeni Görev",
-                    message=f"{self.request.user.first_name or self.request.user.username} sana '{task.title}' görevini atadı.",
-                    notification_type="assignment" 
-                )
+        recipients = task.assignments.exclude(user=self.request.user).values_list('user_id', flat=True)
+        notifications.notify(
+            recipients, 'assignment',
+            task=task,
+            title="Yeni Görev",
+            message=f"{self.request.user.first_name or self.request.user.username} sana '{task.title}' görevini atadı.",
+            notification_type="assignment"
+        )
 
     def perform_update(self, serializer):
         instance = self.get_object()
         old_priority = instance.priority
+        old_due_date = instance.due_date
         task = serializer.save()
+
+        # Süre uzatıldıysa uyarı ve bitiş yeniden planlanır
+        if task.due_date != old_due_date and task.due_date and task.due_date > timezone.now() \
+                and (task.warning_sent or task.expiry_processed):
+            task.warning_sent = False
+            task.expiry_processed = False
+            task.save(update_fields=['warning_sent', 'expiry_processed'])
+        push.publish('task.updated', {'task_id': task.id}, tenant_id=push.tenant_of(self.request.user))
         
         if old_priority != task.priority:
-            recipients = [a.user for a in task.assignments.all()]
-            if task.created_by not in recipients: recipients.append(task.created_by)
-            
-            for user in recipients:
-                if user != self.request.user:
-                    Notification.objects.create(
-                        user=user,
-                        task=task,
-                        title="Öncelik Değişti",
-                        message=f"'{task.title}' görevinin önceliği '{task.get_priority_display()}' olarak güncellendi.",
-                        notification_type='priority_changed'
-                    )
+            recipients = {a.user_id for a in task.assignments.all()}
+            recipients.add(task.created_by_id)
+            recipients.discard(self.request.user.id)
+            notifications.notify(
+                recipients,
+                task=task,
+                title="Öncelik Değişti",
+                message=f"'{task.title}' görevinin önceliği '{task.get_priority_display()}' olarak güncellendi.",
+                notification_type='priority_changed'
+            )
 
     @action(detail=True, methods=['post'], parser_classes=[MultiPartParser, FormParser])
     def upload_file(self, request, pk=None):
@@ -412,23 +499,19 @@ class TaskViewSet(viewsets.ModelViewSet):
             file_type=file_type,
             uploaded_by=request.user
         )
+        push.publish('attachment.created', {'task_id': task.id, 'attachment_id': attachment.id}, tenant_id=push.tenant_of(request.user))
 
-        recipients = []
         if request.user == task.created_by:
-            for assignment in task.assignments.all():
-                recipients.append(assignment.user)
+            recipients = [a.user_id for a in task.assignments.all()]
         else:
-            recipients.append(task.created_by)
-
-        for recipient in recipients:
-            user_settings = getattr(recipient, 'profile', None) and recipient.profile.notification_settings
-            if not user_settings or user_settings.get('file_upload', True):
-                Notification.objects.create(
-                    user=recipient,
-                    title="Dosya Eklendi",
-                    message=f"{request.user.first_name or request.user.username}, '{task.title}' görevine yeni bir dosya ekledi.",
-                    notification_type="file",
-                )
+            recipients = [task.created_by_id]
+
+        notifications.notify(
+            recipients, 'file_upload',
+            title="Dosya Eklendi",
+            message=f"{request.user.first_name or request.user.username}, '{task.title}' görevine yeni bir dosya ekledi.",
+            notification_type="file"
+        )
 
         return Response(TaskAttachmentSerializer(attachment).data, status=201)
 
@@ -437,41 +520,48 @@ class TaskViewSet(viewsets.ModelViewSet):
         task = self.get_object()
         user = request.user
         try:
-            assignment = TaskAssignment.objects.filter(task=task, user=user).first()
-            if not assignment:
-                return Response({'error': 'Bu görev sana atanmamış.'}, status=403)
-
-            assignment.is_completed = True
-            assignment.completed_at = timezone.now()
-            assignment.save()
+            with transaction.atomic():
+                # Kilit sırası counters.lock_tasks'teki gibi: önce görev zinciri, sonra atama.
+                # Çift tıklamada ikinci istek tamamlanmış kaydı görür
+                counters.lock_tasks({task.id})
+                assignment = TaskAssignment.objects.select_for_update().filter(task=task, user=user).first()
+                if not assignment:
+                    return Response({'error': 'Bu görev sana atanmamış.'}, status=403)
+                if assignment.is_completed:
+                    return Response({'status': 'Görevi tamamladın!'})
+
+                assignment.is_completed = True
+                assignment.completed_at = timezone.now()
+                assignment.save()
             
             session_id = request.headers.get('X-Session-ID', 'unknown_session')
             log_event(user, session_id, 'task_completed', {'task_id': task.id})
+            push.publish('assignment.completed', {
+                'task_id': task.id,
+                'assignment_id': assignment.id,
+                'user_id': user.id
+            }, tenant_id=push.tenant_of(user))
 
-            creator = task.created_by
-            creator_settings = getattr(creator, 'profile', None) and creator.profile.notification_settings
-
-            if creator != user:
-                if not creator_settings or creator_settings.get('task_complete', True):
-                    Notification.objects.create(
-                        user=creator,
+            if task.created_by_id != user.id:
+                pending = notifications.pending(
+                    [task.created_by_id], 'task_complete',
+                    task=task,
+                    title="Bölüm Tamamlandı",
+                    message=f"{user.first_name or user.username}, '{task.title}' görevindeki payını tamamladı.",
+                    notification_type='task_completed'
+                )
+                # Sayaçlar tamamlanma sinyaliyle güncellendi; prefetch önbelleği değil satır okunur
+                task.refresh_from_db(fields=['assignment_count', 'completed_count'])
+                all_done = task.completed_count >= task.assignment_count
+                if all_done:
+                    pending += notifications.pending(
+                        [task.created_by_id], 'task_complete',
                         task=task,
-                        title="Bölüm Tamamlandı",
-                        message=f"{user.first_name or user.username}, '{task.title}' görevindeki payını tamamladı.",
-                        notification_type='task_completed'
+                        title="🎉 Görev Hazır!",
+                        message=f"'{task.title}' görevi tüm ekip tarafından tamamlandı. Arşivleyebilirsiniz.",
+                        notification_type='all_completed'
                     )
-            
-            all_done = task.assignments.all().count() > 0 and all(a.is_completed for a in task.assignments.all())
-            if all_done:
-                if creator != user:
-                    if not creator_settings or creator_settings.get('task_complete', True):
-                        Notification.objects.create(
-                            user=creator,
-                            task=task,
-                            title="🎉 Görev Hazır!",
-                            message=f"'{task.title}' görevi tüm ekip tarafından tamamlandı. Arşivleyebilirsiniz.",
-                            notification_type='all_completed'
-                        )
+                notifications.dispatch(pending)
 
             return Response({'status': 'Görevi tamamladın!'})
         except Exception as e:
@@ -503,6 +593,10 @@ class TaskViewSet(viewsets.ModelViewSet):
             
         task.status = 'completed'
         task.save()
+        record_task_tombstone(
+            task, [task.created_by_id, *task.assignments.values_list('user_id', flat=True)], reason='archived'
+        )
+        push.publish('task.archived', {'task_id': task.id}, tenant_id=push.tenant_of(request.user))
         return Response({'status': 'Görev kapatıldı.'})
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -523,12 +617,12 @@ class DeviceViewSet(viewsets.ModelViewSet):
 
         login(request, user)
 
-        try:
-            user_tenant = user.profile.tenant
-            if user_tenant is None:
-                return Response({'error': 'Hesabınız onaylandı ancak henüz bir Şirkete atanmadı.'}, status=403)
-        except UserProfile.DoesNotExist:
+        profile = UserProfile.objects.select_related('tenant').filter(user=user).first()
+        if profile is None:
             return Response({'error': 'Profil hatası! Şirket kaydı yok.'}, status=403)
+        user_tenant = profile.tenant
+        if user_tenant is None:
+            return Response({'error': 'Hesabınız onaylandı ancak henüz bir Şirkete atanmadı.'}, status=403)
 
         if str(user_tenant.tenant_id).strip() != str(tenant_code_input).strip():
             return Response({'error': 'Girdiğiniz Şirket Kodu bu kullanıcıya ait değil!'}, status=403)
@@ -539,46 +633,8 @@ class DeviceViewSet(viewsets.ModelViewSet):
         session_id = request.headers.get('X-Session-ID', 'unknown_session')
         log_event(user, session_id, 'login', {'timestamp': timezone.now().isoformat()})
 
-        # Generate Alias if not exists
-        if not ResearchUserAlias.objects.filter(user=user).exists():
-            is_kanban = user_tenant.is_kanban
-            prefix = 'B' if is_kanban else 'A'
-            count = ResearchUserAlias.objects.filter(alias__startswith=prefix).count()
-            alias = f"{prefix}{count + 1}"
-            
-            hash_obj = hashlib.sha256(str(user.id).encode())
-            anonymous_id = hash_obj.hexdigest()[0:16]
-            
-            ResearchUserAlias.objects.create(
-                user=user,
-                alias=alias,
-                anonymous_id=anonymous_id
-            )
-
-        # Auto-create pipeline tasks if missing
-        from .models import Task, TaskAssignment, PipelineTemplate, PresentationPeriod
-        has_pipeline = TaskAssignment.objects.filter(
-            user=user,
-            task__is_pipeline_task=True
-        ).exists()
-
-        if not has_pipeline:
-            period = PresentationPeriod.objects.order_by('-start_date').first()
-            if period:
-                template = period.pipeline.first()
-                if template:
-                    superuser = User.objects.filter(is_superuser=True).first()
-                    for stage in template.stages.all().order_by('order'):
-                        task = Task.objects.create(
-                            title=stage.title,
-                            description=stage.description or '',
-                            created_by=superuser,
-                            tenant=user.profile.tenant,
-                            is_pipeline_task=True,
-                            pipeline_stage=stage,
-                            status='active'
-                        )
-                        TaskAssignment.objects.create(task=task, user=user)
+        # Takma ad ve pipeline görevleri giriş yolunda değil, arka planda hazırlanır
+        onboarding.ensure_ready(user.id)
 
         return Response({
             'status': 'approved', 
@@ -598,9 +654,10 @@ def register_user(request):
         return Response({'status': 'Kayıt başarılı! Lütfen IT departmanının şirket ataması yapmasını bekleyin.'}, status=201)
     return Response(serializer.errors, status=400)
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
+    etag_resource = 'notifications'
 
     def get_queryset(self):
         if not self.request.user.is_authenticated: return Notification.objects.none()
@@ -609,6 +666,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         self.get_queryset().update(is_read=True)
+        etags.bump('notifications', request.user.id)
         session_id = request.headers.get('X-Session-ID', 'system')
         log_event(request.user, session_id, 'notification_seen', {})
         return Response({'status': 'Hepsi okundu'})
@@ -661,38 +719,71 @@ class CommentViewSet(viewsets.ModelViewSet):
             'word_count': word_count,
             'char_count': char_count
         })
-
-        recipients = set([a.user for a in task.assignments.all()])
-        recipients.add(task.created_by)
-        
-        if self.request.user in recipients:
-            recipients.remove(self.request.user)
-
-        for recipient in recipients:
-            user_settings = getattr(recipient, 'profile', None) and recipient.profile.notification_settings
-            if not user_settings or user_settings.get('comments', True):
-                Notification.objects.create(
-                    user=recipient,
-                    title="Yeni Yorum",
-                    message=f"{self.request.user.first_name or self.request.user.username}, '{task.title}' görevine yorum yaptı.",
-                    notification_type="comment",
-                    task=task
-                )
+        push.publish('comment.created', {'task_id': task.id, 'comment_id': comment.id}, tenant_id=push.tenant_of(self.request.user))
+
+        recipients = set(task.assignments.values_list('user_id', flat=True))
+        recipients.add(task.created_by_id)
+        recipients.discard(self.request.user.id)
+
+        notifications.notify(
+            recipients, 'comments',
+            title="Yeni Yorum",
+            message=f"{self.request.user.first_name or self.request.user.username}, '{task.title}' görevine yorum yaptı.",
+            notification_type="comment",
+            task=task
+        )
 
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def export_activity_logs(request):
     try:
-        local_path = generate_global_activity_csv()
-        with open(local_path, 'r', encoding='utf-8') as f:
-            response = HttpResponse(f.read(), content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="{os.path.basename(local_path)}"'
-            return response
+        return stream_global_activity_csv(request)
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
 # export_user_csv function removed and replaced by service calls
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_job_status(request, job_id):
+    job = ExportJob.objects.filter(id=job_id).first()
+    # Yönetici dışındakiler yalnızca kendi istedikleri ya da kendileri için açılan işi görür
+    allowed = job and (request.user.is_staff or request.user.id in (job.requested_by_id, job.user_id))
+    if not allowed:
+        return Response({'error': 'Dışa aktarım işi bulunamadı.'}, status=404)
+    data = ExportJobSerializer(job).data
+    if not request.user.is_staff:
+        data.pop('result_path')
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def graph_snapshot(request):
+    """Spiral tuvali için görevler, atamalar, node'lar, bağlılıklar ve kullanıcılar tek yanıtta (core/graph.py)."""
+    profile = getattr(request.user, 'profile', None)
+    tenant_id = profile.tenant_id if profile else None
+    etag = graph.snapshot_etag(request.user, tenant_id)
+    client_etags = [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]
+    if etag in client_etags:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return Response(graph.build_snapshot(request.user, tenant_id), headers={'ETag': etag})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def push_ticket(request):
+    """/ws/events/ için tek kullanımlık bilet (core/push.py)."""
+    return Response({'ticket': push.issue_ticket(request.user), 'expires_in': push.TICKET_SECONDS})
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def poll_cache_stats(request):
+    return Response(etags.hit_rate_stats())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def activity_log_stats(request):
+    return Response(activity_log_buffer.snapshot())
+
 class SurveyViewSet(viewsets.ViewSet):
     def get_permissions(self):
         if self.action == 'questions':
@@ -893,4 +984,33 @@ def log_interaction(request):
     event_type = request.data.get('event_type', 'unknown')
     metadata = {k: v for k, v in request.data.items() if k != 'event_type'}
     log_event(request.user, session_id, event_type, metadata)
-    return Response({'status': 'logged'})
\ No newline at end of file
+    return Response({'status': 'logged'})
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def log_interaction_batch(request):
+    """
+    Birden fazla {event_type, metadata, client_ts} olayını tek istekte alır.
+    Gövde JSON ({"seq": n, "events": [...]}) veya NDJSON olabilir, gzip ile
+    sıkıştırılabilir. seq (gövdede ya da X-Batch-Seq başlığında) oturum
+    içinde benzersizdir; tekrar gönderilen paketler yeniden yazılmaz.
+    """
+    session_id = request.headers.get('X-Session-ID', 'unknown')
+    try:
+        seq, events = parse_interaction_batch(
+            request.body,
+            request.content_type,
+            request.headers.get('Content-Encoding', '')
+        )
+        seq = request.headers.get('X-Batch-Seq', seq)
+        try:
+            seq = int(seq)
+        except (TypeError, ValueError):
+            return Response({'error': 'Geçerli bir seq zorunludur.'}, status=400)
+        cleaned = validate_interaction_events(events)
+    except InteractionBatchError as e:
+        return Response({'error': e.detail}, status=400)
+
+    if not ingest_interaction_batch(request.user, session_id, seq, cleaned):
+        return Response({'status': 'duplicate', 'seq': seq, 'count': 0})
+    return Response({'status': 'logged', 'seq': seq, 'count': len(cleaned)})
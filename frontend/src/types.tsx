@@ -50,7 +50,8 @@ export interface TaskData {
     attachments: Attachment[];
     node_data: { id: number; position_x: number; position_y: number; is_pinned?: boolean; } | null;
     parent_task: number | null;
-    subtasks: TaskData[];
+    // Alt görev id'leri; '?subtask_depth=N' ile istenirse iç içe görevler
+    subtasks: Array<number | TaskData>;
     is_pipeline_task?: boolean;
 }
 